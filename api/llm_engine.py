@@ -1,12 +1,13 @@
 import os
-import json
+import time
 import logging
 import httpx
-import google.generativeai as genai
-from openai import OpenAI
-from anthropic import Anthropic
 from typing import Dict, Any, List, Optional
 
+from core.metrics import LLM_LATENCY, LLM_ERRORS, PARSE_FAILURES, PARSE_REPAIRS
+from core.codec import parse_lenient, DecodeError
+from core.tracing import span
+
 log = logging.getLogger("octopus.llm")
 
 SYSTEM_PROMPT = """
@@ -24,11 +25,30 @@ Available Action Types:
 8. file.read(path)
 9. system.sleep(seconds)
 10. system.screen_size()
+11. network.get(url, headers) / network.post(url, data, headers) / network.put|patch|delete|head|options(...)
+    network.batch(requests=[url or {method, url, data, headers}, ...]) fetches many URLs in parallel
+    network.download(url, path, sha256) saves a file into the workspace (resumes if interrupted)
+    Add "cache": true to GETs of URLs you fetch repeatedly (status pages, JSON APIs)
+12. process.list(name, user, regex, sort='cpu'|'memory', limit, offset, attrs) / process.find(name) / process.kill(pid or name)
+13. hardware.usage() / hardware.specs()
+14. clipboard.read() / clipboard.write(text) / clipboard.clear()
 
 Rules:
 - You MUST respond ONLY with a JSON object.
 - The JSON must have an 'intent' (brief description) and 'actions' (list of action objects).
 - Each action object must have 'type' (e.g., 'mouse.move') and 'params' (dictionary of arguments).
+- An action may add 'timeout' (seconds) to cap how long it may run (not mouse, keyboard or system actions).
+- Use control flow instead of repeating actions. Give an action an "id" to reuse its result:
+  {"$ref": "id.field"} inserts a value, "${id.field}" inserts it into a string.
+  Only ${...} starting with an id, a loop variable or 'last' is replaced; other text such as
+  ${HOME} is kept as is. Write $${ for a literal ${.
+  {"type": "control.repeat", "params": {"times": 3, "actions": [...]}}  (loop variable: index)
+  {"type": "control.for_each", "params": {"items": {"$ref": "ls.files"}, "as": "f", "actions": [...]}}
+  {"type": "control.if", "params": {"value": {"$ref": "chk.exists"}, "equals": true, "then": [...], "else": [...]}}
+  Conditions: equals, not_equals, contains, gt, gte, lt, lte (none = truthy).
+- Independent actions can run in parallel: give actions an "id" and list prerequisites in
+  "depends_on" (e.g. fetch two URLs, then write a summary with "depends_on": ["a", "b"]).
+  If a prerequisite fails, its dependents are skipped. Do not mix depends_on with control nodes.
 
 Example Response:
 {
@@ -54,18 +74,35 @@ class LLMEngine:
         self._model_name = model_name
         self._base_url = base_url
         
+        # Provider SDKs are imported on demand so only the configured one must be installed
         if provider == "gemini":
+            import google.generativeai as genai
             genai.configure(api_key=api_key)
         elif provider == "anthropic":
+            from anthropic import Anthropic
             self._anthropic_client = Anthropic(api_key=api_key, base_url=base_url)
         elif provider == "deepseek":
+            from openai import OpenAI
             # DeepSeek uses OpenAI protocol but with a specific endpoint if not provided
             ds_url = base_url or "https://api.deepseek.com/v1"
             self._client = OpenAI(api_key=api_key, base_url=ds_url)
         elif provider in ["openai", "local", "custom"]:
+            from openai import OpenAI
             self._client = OpenAI(api_key=api_key or "no-key", base_url=base_url)
 
     async def generate_actions(self, prompt: str) -> Dict[str, Any]:
+        model = self._model_name or "default"
+        started = time.perf_counter()
+        with span("llm.generate", provider=self._provider, model=model) as sp:
+            result = await self._generate(prompt)
+            if sp and "error" in result:
+                sp.set("error", result["error"])
+        LLM_LATENCY.observe(time.perf_counter() - started, self._provider, model)
+        if "error" in result:
+            LLM_ERRORS.inc(self._provider, model)
+        return result
+
+    async def _generate(self, prompt: str) -> Dict[str, Any]:
         if self._provider == "gemini":
             return await self._call_gemini(prompt)
         elif self._provider == "anthropic":
@@ -79,6 +116,7 @@ class LLMEngine:
 
     async def _call_gemini(self, prompt: str) -> Dict[str, Any]:
         try:
+            import google.generativeai as genai
             model = genai.GenerativeModel(
                 model_name=self._model_name or "gemini-1.5-flash",
                 system_instruction=SYSTEM_PROMPT
@@ -110,7 +148,7 @@ class LLMEngine:
                 ],
                 response_format={"type": "json_object"}
             )
-            return json.loads(response.choices[0].message.content)
+            return self._parse_json(response.choices[0].message.content)
         except Exception as e:
             return {"intent": "Error", "actions": [], "error": str(e)}
 
@@ -135,10 +173,16 @@ class LLMEngine:
 
     def _parse_json(self, text: str) -> Dict[str, Any]:
         try:
-            start = text.find("{")
-            end = text.rfind("}") + 1
-            if start != -1 and end != 0:
-                return json.loads(text[start:end])
-            return json.loads(text)
-        except:
+            data, repaired = parse_lenient(text)
+        except DecodeError:
+            data, repaired = None, False
+        if isinstance(data, list):
+            # A bare action list
+            data = {"intent": "", "actions": data}
+        if not isinstance(data, dict):
+            PARSE_FAILURES.inc(self._provider)
             return {"intent": "Error", "actions": [], "error": "Failed to parse AI response as JSON"}
+        if repaired:
+            log.warning(f"Repaired malformed {self._provider} reply")
+            PARSE_REPAIRS.inc(self._provider)
+        return data
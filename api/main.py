@@ -2,19 +2,37 @@ import subprocess
 import json
 import sys
 import os
+import time
 import queue
+import asyncio
 import logging
-from fastapi import FastAPI, HTTPException
+import threading
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse, Response, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Dict, Any, List, Optional
 
 # Standard Octopus imports
 from core.agent import Agent
+from core.history import HistoryStore
+from core.metrics import REGISTRY, CLI_ACTION_LATENCY
+from core.tracing import TRACER, span
+from core.profiler import SamplingProfiler
+from core.plan import uses_plan_features
+from core.blobs import BlobStore, blob_dir
+from core import codec
+from core.jobs import (JobManager, Job, QueueFull, CANCELLED, FAILED,
+                       DEFAULT_WORKERS, DEFAULT_MAX_QUEUED, DEFAULT_MAX_PER_SESSION)
+from core.scheduler import SessionScheduler, LeaseCancelled, uses_input, parse_weights, DEFAULT_SESSION
 from api.llm_engine import LLMEngine
 
-# Setup FastAPI
-app = FastAPI(title="Octopus Dashboard API")
+# Setup FastAPI (responses are encoded with orjson when it is installed)
+if codec.BACKEND == "orjson":
+    from fastapi.responses import ORJSONResponse as DefaultResponse
+else:
+    DefaultResponse = JSONResponse
+app = FastAPI(title="Octopus Dashboard API", default_response_class=DefaultResponse)
 
 # Enable CORS
 app.add_middleware(
@@ -24,19 +42,61 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Tracing (enabled by OCTOPUS_TRACE_FILE)
+TRACER.configure_from_env(service="octopus-api")
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    if not TRACER.enabled:
+        return await call_next(request)
+    TRACER.attach(request.headers.get("traceparent"))
+    with span(f"http {request.method} {request.url.path}", method=request.method,
+              path=request.url.path) as sp:
+        response = await call_next(request)
+        sp.set("status_code", response.status_code)
+        response.headers["traceparent"] = sp.traceparent
+        return response
+
 # Shared state
 agent_instance = None
+history_store = None
 llm_engine = LLMEngine()
+profiler = SamplingProfiler()
 
 # Use absolute paths rooted at project directory
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 config = {
     "workspace": os.path.join(PROJECT_ROOT, "workspace"),
     "log_file": os.path.join(PROJECT_ROOT, "logs", "actions.log"),
+    "history_db": os.path.join(PROJECT_ROOT, "logs", "history.db"),
     "llm_config": os.path.join(PROJECT_ROOT, "config", "llm_config.json"),
     "guide_file": os.path.join(PROJECT_ROOT, "docs", "GUIDE.md")
 }
 
+# Large result fields written by the CLI (see core.blobs)
+blob_store = BlobStore(blob_dir(config))
+
+# Exclusive mouse/keyboard lease shared fairly between sessions (see core.scheduler)
+scheduler = SessionScheduler(parse_weights(os.environ.get("OCTOPUS_SESSION_WEIGHTS", "")))
+SESSION_HEADER = "X-Octopus-Session"
+
+# Bounded per-session queues for /chat, /action and /jobs, served with the same weights (see core.jobs)
+job_manager = JobManager(
+    workers=int(os.environ.get("OCTOPUS_JOB_WORKERS") or DEFAULT_WORKERS),
+    max_queued=int(os.environ.get("OCTOPUS_JOB_QUEUE") or DEFAULT_MAX_QUEUED),
+    max_per_session=int(os.environ.get("OCTOPUS_JOB_SESSION_QUEUE") or DEFAULT_MAX_PER_SESSION),
+    weight=scheduler.weight,
+)
+# How often a running CLI subprocess checks for cancellation (seconds)
+CANCEL_POLL_INTERVAL = 0.1
+
+def session_of(request: Request) -> str:
+    """Session of a request: the X-Octopus-Session header, else the client address."""
+    session = request.headers.get(SESSION_HEADER)
+    if session:
+        return session[:64]
+    return request.client.host if request.client else DEFAULT_SESSION
+
 class ActionRequest(BaseModel):
     type: str
     params: Dict[str, Any] = {}
@@ -50,9 +110,14 @@ class LLMConfigRequest(BaseModel):
 class ChatRequest(BaseModel):
     prompt: str
 
+class JobRequest(BaseModel):
+    prompt: Optional[str] = None
+    intent: Optional[str] = None
+    actions: Optional[List[Dict[str, Any]]] = None
+
 @app.on_event("startup")
 async def startup_event():
-    global agent_instance
+    global agent_instance, history_store
     os.makedirs(config["workspace"], exist_ok=True)
     os.makedirs(os.path.dirname(config["llm_config"]), exist_ok=True)
     os.makedirs(os.path.dirname(config["log_file"]), exist_ok=True)
@@ -63,29 +128,93 @@ async def startup_event():
             llm_engine.configure(c["provider"], c["api_key"], c["model"], c.get("base_url"))
 
     agent_instance = Agent(config)
-    import threading
+    history_store = HistoryStore(config["history_db"])
+    try:
+        from skills.hardware import get_sampler
+        get_sampler()
+    except ImportError as e:
+        logging.getLogger("octopus.api").warning(f"Hardware sampler disabled: {e}")
     threading.Thread(target=agent_instance.start, daemon=True).start()
 
-def run_cli_action(action_data: Dict[str, Any]):
-    """Execute action through the exact same logic path as CLI"""
+def run_cli_action(action_data: Dict[str, Any], cancel: Optional[threading.Event] = None):
+    """
+    Execute action through the exact same logic path as CLI.
+
+    If `cancel` is set while the CLI runs, the subprocess is terminated.
+    """
     cli_path = os.path.join(PROJECT_ROOT, "cli", "main.py")
-    json_str = json.dumps(action_data)
+    json_str = codec.dumps(action_data)
+    started = time.perf_counter()
     
-    try:
-        result = subprocess.run(
+    with span("cli.subprocess", type=str(action_data.get("type", "batch"))):
+        proc = subprocess.Popen(
             [sys.executable, cli_path, "run", json_str],
-            capture_output=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
             text=True,
-            check=True
+            env={**os.environ, **TRACER.child_env()},
         )
-        return {"status": "ok", "output": result.stdout}
-    except subprocess.CalledProcessError as e:
-        return {"status": "error", "message": e.stderr or str(e)}
+        cancelled = False
+        while True:
+            try:
+                stdout, stderr = proc.communicate(timeout=None if cancel is None else CANCEL_POLL_INTERVAL)
+                break
+            except subprocess.TimeoutExpired:
+                if cancel.is_set() and not cancelled:
+                    cancelled = True
+                    proc.terminate()
+        if cancelled:
+            outcome = {"status": "cancelled", "message": "Cancelled while running", "output": stdout}
+        elif proc.returncode == 0:
+            outcome = {"status": "ok", "output": stdout}
+        else:
+            outcome = {"status": "error", "message": stderr or f"CLI exited with status {proc.returncode}"}
+
+    CLI_ACTION_LATENCY.observe(
+        time.perf_counter() - started, str(action_data.get("type", "batch")), outcome["status"]
+    )
+    return outcome
 
 @app.get("/status")
 async def get_status():
     return {"status": "ready", "version": "0.2.1"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus text exposition of in-process counters and histograms."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.post("/profile", response_class=PlainTextResponse)
+async def profile(seconds: float = 10.0, interval_ms: float = 10.0):
+    """Sample all threads for N seconds and return collapsed stacks."""
+    if profiler.running:
+        raise HTTPException(status_code=409, detail="Profiler already running")
+    if not 0 < seconds <= 300:
+        raise HTTPException(status_code=400, detail="seconds must be in (0, 300]")
+    profiler.interval = max(interval_ms, 1.0) / 1000.0
+    collapsed = await asyncio.to_thread(profiler.profile_for, seconds)
+    stats = profiler.stats()
+    return PlainTextResponse(collapsed, headers={
+        "X-Profile-Samples": str(stats["samples"]),
+        "X-Profile-Overhead-Percent": str(stats["overhead_percent"]),
+    })
+
+@app.post("/profile/start")
+async def profile_start(interval_ms: float = 10.0):
+    """Start open-ended sampling; fetch results with /profile/stop."""
+    if profiler.running:
+        raise HTTPException(status_code=409, detail="Profiler already running")
+    profiler.reset()
+    profiler.interval = max(interval_ms, 1.0) / 1000.0
+    profiler.start()
+    return {"status": "profiling", **profiler.stats()}
+
+@app.post("/profile/stop", response_class=PlainTextResponse)
+async def profile_stop():
+    """Stop sampling and return collapsed stacks."""
+    profiler.stop()
+    return PlainTextResponse(profiler.collapsed())
+
 @app.get("/guide")
 async def get_guide():
     if not os.path.exists(config["guide_file"]):
@@ -100,28 +229,138 @@ async def save_config(req: LLMConfigRequest):
         json.dump(req.dict(), f)
     return {"status": "configured"}
 
-@app.post("/chat")
-async def chat(req: ChatRequest):
-    # LLM translates prompt to actions
-    result = await llm_engine.generate_actions(req.prompt)
-    if "error" in result:
-        return {"status": "error", "message": result["error"]}
+def with_lease(session: str, actions: List[Dict[str, Any]], cancel: Optional[threading.Event], fn):
+    """Call fn holding the session's lease: exclusive if the batch uses mouse, keyboard or clipboard."""
+    try:
+        # While blocked on the input lease, another job worker takes over the slot
+        with scheduler.lease(session, uses_input(actions), cancel, job_manager.waiting):
+            return fn()
+    except LeaseCancelled as e:
+        return {"status": "cancelled", "message": str(e)}
 
-    # Unified execution path
-    outputs = []
-    for action in result.get("actions", []):
-        res = run_cli_action(action)
-        outputs.append(res)
-    
+def run_actions(intent: Optional[str], actions: List[Dict[str, Any]],
+                cancel: Optional[threading.Event] = None, session: str = DEFAULT_SESSION) -> Dict[str, Any]:
+    """Run an action list through the CLI as one leased batch, stopping early if `cancel` is set."""
+    return with_lease(session, actions, cancel, lambda: _run_batch(intent, actions, cancel))
+
+def _run_batch(intent: Optional[str], actions: List[Dict[str, Any]],
+               cancel: Optional[threading.Event]) -> Dict[str, Any]:
+    if uses_plan_features(actions):
+        # Loops and references need one shared scope: run the plan in a single CLI call
+        outputs = [run_cli_action({"intent": intent, "actions": actions}, cancel)]
+    else:
+        outputs = []
+        for action in actions:
+            if cancel is not None and cancel.is_set():
+                break
+            outputs.append(run_cli_action(action, cancel))
+    cancelled = cancel is not None and cancel.is_set()
     return {
-        "status": "completed", 
-        "intent": result.get("intent", "Executed"),
+        "status": "cancelled" if cancelled else "completed",
+        "intent": intent or "Executed",
         "results": outputs
     }
 
+def run_prompt(prompt: str, cancel: Optional[threading.Event] = None,
+               session: str = DEFAULT_SESSION) -> Dict[str, Any]:
+    """LLM translates prompt to actions, then the unified execution path runs them."""
+    # Generated before taking the lease: other sessions keep the screen meanwhile
+    result = asyncio.run(llm_engine.generate_actions(prompt))
+    if "error" in result:
+        return {"status": "error", "message": result["error"]}
+    return run_actions(result.get("intent"), result.get("actions", []), cancel, session)
+
+def submit_job(kind: str, fn, session: str, actions: Optional[List[Dict[str, Any]]] = None) -> Job:
+    """Queue a job, answering 429 with Retry-After when the queue (or the session's share) is full."""
+    try:
+        return job_manager.submit(kind, fn, session, exclusive=uses_input(actions or []))
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e),
+                            headers={"Retry-After": str(e.retry_after)})
+
+async def wait_job(job: Job, timeout: Optional[float] = None) -> bool:
+    """Wait for a job without blocking the event loop. Returns True once it is done."""
+    deadline = None if timeout is None else time.monotonic() + timeout
+    delay = 0.005
+    while not job.done.is_set():
+        if deadline is not None and time.monotonic() >= deadline:
+            return False
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 0.1)
+    return True
+
+def job_response(job: Job):
+    """Result of a finished job; cancelled (409) and failed (500) jobs answer as errors, like /jobs/{id}."""
+    if job.state == CANCELLED:
+        return JSONResponse(status_code=409, content={
+            "status": "error", "message": job.error or "Job cancelled", "job_id": job.id})
+    if job.state == FAILED:
+        return JSONResponse(status_code=500, content={
+            "status": "error", "message": job.error or "Job failed", "job_id": job.id})
+    return job.result
+
+@app.post("/chat")
+async def chat(req: ChatRequest, request: Request):
+    # Runs as a job, so concurrent requests queue instead of driving the desktop at once
+    session = session_of(request)
+    job = submit_job("chat", lambda j: run_prompt(req.prompt, j.cancelled, session), session)
+    await wait_job(job)
+    return job_response(job)
+
 @app.post("/action")
-async def execute_action(action: ActionRequest):
-    return run_cli_action(action.dict())
+async def execute_action(action: ActionRequest, request: Request):
+    session, data = session_of(request), action.dict()
+    job = submit_job("action", lambda j: with_lease(session, [data], j.cancelled,
+                                                    lambda: run_cli_action(data, j.cancelled)), session, [data])
+    await wait_job(job)
+    return job_response(job)
+
+@app.post("/jobs", status_code=202)
+async def create_job(req: JobRequest, request: Request):
+    """Submit a prompt or an action list; returns the job id immediately."""
+    if bool(req.prompt) == bool(req.actions):
+        raise HTTPException(status_code=400, detail="Provide either 'prompt' or 'actions'")
+    session = session_of(request)
+    if req.prompt:
+        job = submit_job("chat", lambda j: run_prompt(req.prompt, j.cancelled, session), session)
+    else:
+        job = submit_job("actions", lambda j: run_actions(req.intent, req.actions, j.cancelled, session),
+                         session, req.actions)
+    return dict(job.to_dict(), position=job_manager.position(job))
+
+@app.get("/jobs")
+async def list_jobs(state: Optional[str] = None, limit: int = 50, session: Optional[str] = None):
+    return {"jobs": [j.to_dict() for j in job_manager.list(state, limit, session)],
+            "stats": job_manager.stats()}
+
+@app.get("/sessions")
+async def get_sessions():
+    """Input lease holder, waiting batches and per-session wait statistics."""
+    return scheduler.snapshot()
+
+def _job(job_id: str) -> Job:
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return job
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = _job(job_id)
+    return dict(job.to_dict(), position=job_manager.position(job))
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str, wait: float = 0.0):
+    """Job result; `wait` long-polls up to that many seconds (max 60) for it to finish."""
+    job = _job(job_id)
+    if not await wait_job(job, min(max(wait, 0.0), 60.0)):
+        return JSONResponse(status_code=202, content=job.to_dict(), headers={"Retry-After": "1"})
+    return job.to_dict(result=True)
+
+@app.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    _job(job_id)
+    return job_manager.cancel(job_id).to_dict()
 
 @app.post("/terminal")
 async def execute_terminal(command: Dict[str, str]):
@@ -144,11 +383,92 @@ async def execute_terminal(command: Dict[str, str]):
         return {"status": "error", "message": str(e)}
 
 @app.get("/logs")
-async def get_logs(limit: int = 50):
+async def get_logs(limit: int = 50, type: Optional[str] = None, status: Optional[str] = None,
+                   since: Optional[str] = None, until: Optional[str] = None,
+                   batch: Optional[str] = None, cursor: Optional[int] = None):
+    """
+    Without filters: last `limit` raw lines of the text log.
+    With any filter or a cursor: paginated records from the action history.
+    """
+    if any(v is not None for v in (type, status, since, until, batch, cursor)):
+        try:
+            return history_store.query(type, status, since, until, batch, cursor, limit)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
     if not os.path.exists(config["log_file"]): return {"logs": []}
     with open(config["log_file"], "r", encoding="utf-8") as f:
         return {"logs": f.readlines()[-limit:]}
 
+@app.get("/logs/stats")
+async def get_log_stats(since: Optional[str] = None, until: Optional[str] = None,
+                        type: Optional[str] = None):
+    try:
+        return history_store.stats(since, until, type)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _byte_range(header: str, size: int):
+    """(start, end) inclusive for a single-range 'bytes=' header, or None if unsatisfiable."""
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    try:
+        if not first:
+            length = int(last)
+            start, end = max(0, size - length), size - 1
+        else:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        return None
+    if start > end or start >= size:
+        return None
+    return start, end
+
+@app.get("/results/{blob_id}")
+async def get_result_blob(blob_id: str, request: Request):
+    """Stream a stored result field; supports a single HTTP Range."""
+    try:
+        size = blob_store.size(blob_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if size is None:
+        raise HTTPException(status_code=404, detail="No such result")
+
+    headers = {"Accept-Ranges": "bytes", "ETag": f'"{blob_id}"',
+               "Cache-Control": "private, max-age=31536000, immutable"}
+    range_header = request.headers.get("range")
+    if not range_header:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(blob_store.read(blob_id), media_type="text/plain; charset=utf-8",
+                                 headers=headers)
+    byte_range = _byte_range(range_header, size)
+    if byte_range is None:
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(blob_store.read(blob_id, start, end), status_code=206,
+                             media_type="text/plain; charset=utf-8", headers=headers)
+
+@app.get("/hardware")
+async def get_hardware(seconds: float = 300.0, per_core: bool = False):
+    """Hardware time series from the background sampler, with window summaries."""
+    try:
+        from skills.hardware import get_sampler, DEFAULT_WINDOWS
+    except ImportError as e:
+        raise HTTPException(status_code=503, detail=f"Hardware sampling unavailable: {e}")
+    if seconds <= 0:
+        raise HTTPException(status_code=400, detail="seconds must be positive")
+    sampler = get_sampler()
+    return {
+        "latest": sampler.latest(),
+        "windows": sampler.stats(DEFAULT_WINDOWS),
+        "series": sampler.series(seconds, per_core=per_core),
+    }
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -11,8 +11,12 @@ License: MIT
 import os
 import sys
 import json
+import time
+import shutil
+import tempfile
 import logging
 import subprocess
+from datetime import datetime
 from typing import Optional
 
 # Add project root to path
@@ -25,6 +29,18 @@ import yaml
 from core.agent import Agent
 from core.executor.human_executor import HumanExecutor
 from core.dispatcher import Dispatcher
+from core.daemon import ActionDaemon, DaemonClient, resolve_address, is_daemon_running
+from core.action_stream import iter_actions, Checkpoint, StreamFormatError
+from core.history import HistoryStore, RunHistory
+from core.tracing import TRACER, TRACE_FILE_ENV, span
+from core.profiler import SamplingProfiler
+from core.recording import RunRecorder, RunReplayer
+from core.macro import MacroLog, MacroRecorder, compile_macro
+from core.plan import PlanRunner, PlanError, as_plan, uses_plan_features, validate_plan, DEFAULT_MAX_STEPS
+from core.dag import DEFAULT_MAX_WORKERS
+from core.memo import DEFAULT_MAX_ENTRIES
+from core.blobs import BlobStore, blob_dir, is_handle, DEFAULT_THRESHOLD
+from core import codec
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Configuration
@@ -80,6 +96,25 @@ def echo_header(title: str) -> None:
     click.echo(click.style(f"  {title}", fg="cyan", bold=True))
     click.echo(click.style(f"{'='*60}", fg="cyan"))
 
+def echo_result(result: dict, blobs: Optional[BlobStore] = None) -> None:
+    """Print a dispatch result: message line followed by extra fields.
+
+    With a blob store, large fields are printed as handles (see core.blobs).
+    """
+    if blobs:
+        result = blobs.externalize(result)
+    if result.get("status") == "ok":
+        msg = result.pop("message", "Done")
+        result.pop("status", None)
+        echo_ok(msg)
+        if result:
+            for k, v in result.items():
+                if is_handle(v):
+                    v = f"<blob {v['$blob']} {v['size']} bytes, GET /results/{v['$blob']}> {v['preview']!r}"
+                click.echo(f"  {k}: {v}")
+    else:
+        echo_err(result.get("message", "Failed"))
+
 
 # ─────────────────────────────────────────────────────────────────────────────
 # CLI Commands
@@ -139,7 +174,25 @@ def cmd_status():
 @cli.command("run")
 @click.argument("action_json", required=False)
 @click.option("--debug", is_flag=True, help="Enable debug logging")
-def cmd_run(action_json: Optional[str], debug: bool):
+@click.option("--daemon", "use_daemon", is_flag=True, help="Forward actions to a running daemon")
+@click.option("-f", "--file", "action_file", type=click.Path(dir_okay=False, allow_dash=True),
+              help="Stream actions from a JSON array / NDJSON file ('-' for stdin)")
+@click.option("--checkpoint", "checkpoint_path", type=click.Path(dir_okay=False),
+              help="Checkpoint file (default: <file>.ckpt)")
+@click.option("--resume", is_flag=True, help="Skip actions completed in a previous run")
+@click.option("-q", "--quiet", is_flag=True, help="Only print failures and a final summary")
+@click.option("--trace", "trace_file", type=click.Path(dir_okay=False),
+              help="Write Chrome trace spans to this file")
+@click.option("--profile", "profile_file", type=click.Path(dir_okay=False),
+              help="Sample thread stacks and write collapsed stacks to this file")
+@click.option("--profile-interval", default=10.0, help="Profiler sampling interval in ms")
+@click.option("--record", "record_file", type=click.Path(dir_okay=False),
+              help="Record actions and results for 'agent replay' (.gz to compress)")
+def cmd_run(action_json: Optional[str], debug: bool, use_daemon: bool = False,
+            action_file: Optional[str] = None, checkpoint_path: Optional[str] = None,
+            resume: bool = False, quiet: bool = False, trace_file: Optional[str] = None,
+            profile_file: Optional[str] = None, profile_interval: float = 10.0,
+            record_file: Optional[str] = None):
     """
     Run agent or execute a single action.
 
@@ -147,62 +200,253 @@ def cmd_run(action_json: Optional[str], debug: bool):
     Examples:
       agent run                              # Start agent loop
       agent run '{"type":"mouse.move"}'      # Execute single action
+      agent run --daemon '{"type":"..."}'    # Execute via 'agent daemon start'
+      agent run --file plan.jsonl --resume   # Stream a large plan, resumable
+      agent run --record run.jsonl.gz        # Record the agent loop for replay
     """
     if debug:
         logging.getLogger().setLevel(logging.DEBUG)
 
+    if trace_file:
+        os.environ[TRACE_FILE_ENV] = os.path.abspath(trace_file)
+        TRACER.configure(trace_file, service="octopus-cli")
+    else:
+        TRACER.configure_from_env(service="octopus-cli")
+
+    profiler = SamplingProfiler(interval=profile_interval / 1000.0) if profile_file else None
+    if profiler:
+        profiler.start()
+
+    try:
+        if action_json or action_file:
+            with span("cli.run", mode="file" if action_file else "json"):
+                _run(action_json, use_daemon, action_file, checkpoint_path, resume, quiet,
+                     record_file)
+        else:
+            # Agent mode runs indefinitely; each action is its own trace root
+            _run(action_json, use_daemon, action_file, checkpoint_path, resume, quiet,
+                 record_file)
+    finally:
+        if profiler:
+            profiler.stop()
+            profiler.write(profile_file)
+            stats = profiler.stats()
+            echo_info(f"Profile written to {profile_file} "
+                      f"({stats['samples']} samples, {stats['overhead_percent']}% overhead)")
+
+
+def _dispatch_recorded(dispatch, action: dict, recorder: Optional[RunRecorder],
+                       history: Optional[RunHistory] = None) -> dict:
+    """Call dispatch(action), adding the action to the recording and history."""
+    if recorder is None and history is None:
+        return dispatch(action)
+    started = time.perf_counter()
+    offset = recorder.offset() if recorder else 0.0
+    result = dispatch(action)
+    if recorder:
+        recorder.record_action(action, result, offset, recorder.offset() - offset)
+    if history:
+        history.record(action, result, time.perf_counter() - started)
+    return result
+
+
+def _history_path(config: dict) -> Optional[str]:
+    """Action history database the agent and the API use (None when disabled)."""
+    log_file = config.get("log_file", "logs/actions.log")
+    history_db = config.get("history_db", os.path.join(os.path.dirname(log_file), "history.db"))
+    return os.path.join(PROJECT_ROOT, history_db) if history_db else None
+
+
+def _run_history(config: dict) -> Optional[RunHistory]:
+    """History for this run, in the database the agent and the API use."""
+    history_db = _history_path(config)
+    if not history_db:
+        return None
+    try:
+        return RunHistory(HistoryStore(history_db))
+    except Exception as e:
+        echo_err(f"Action history disabled: {e}")
+        return None
+
+
+def _run(action_json: Optional[str], use_daemon: bool, action_file: Optional[str],
+         checkpoint_path: Optional[str], resume: bool, quiet: bool,
+         record_file: Optional[str] = None) -> None:
+    """Body of 'agent run' (see cmd_run)."""
     config = load_config()
     
     # Override paths to absolute to ensure consistency
     config["workspace"] = os.path.abspath(os.path.join(PROJECT_ROOT, config.get("workspace", "workspace")))
     config["log_file"] = os.path.abspath(os.path.join(PROJECT_ROOT, config.get("log_file", "logs/actions.log")))
 
-    if action_json:
+    if not (action_file or action_json):
+        if record_file:
+            config["record_file"] = os.path.abspath(record_file)
+        _run_agent(config)
+        return
+
+    recorder = RunRecorder(record_file, source="cli") if record_file else None
+    history = _run_history(config)
+    try:
+        _run_actions(config, action_json, use_daemon, action_file, checkpoint_path,
+                     resume, quiet, recorder, history)
+    finally:
+        if history:
+            history.close()
+        if recorder:
+            recorder.close()
+            echo_info(f"Recording written to {recorder.path}")
+
+
+def _run_actions(config: dict, action_json: Optional[str], use_daemon: bool,
+                 action_file: Optional[str], checkpoint_path: Optional[str],
+                 resume: bool, quiet: bool, recorder: Optional[RunRecorder],
+                 history: Optional[RunHistory] = None) -> None:
+    """Execute actions given inline or streamed from a file."""
+    if action_file:
+        run_stream(config, action_file, checkpoint_path, resume, quiet, recorder, history)
+    elif action_json:
         # Execute single action mode
         try:
-            data = json.loads(action_json)
+            data = codec.loads(action_json)
             # Support both list of actions and single action dict
             actions = data.get("actions", [data] if "type" in data else [])
-        except json.JSONDecodeError as e:
+        except codec.DecodeError as e:
             echo_err(f"Invalid JSON: {e}")
             return
 
         if not actions:
             echo_err("No valid actions found in JSON")
             return
+        if history:
+            history.intent = data.get("intent")
+
+        max_steps = int(config.get("plan_max_steps", DEFAULT_MAX_STEPS))
+        is_plan = uses_plan_features(actions)
+        if is_plan:
+            actions = as_plan(actions)
+            try:
+                validate_plan(actions, max_steps)
+            except PlanError as e:
+                echo_err(f"Invalid plan: {e}")
+                return
+
+        if use_daemon:
+            address = resolve_address(config, PROJECT_ROOT)
+            try:
+                with DaemonClient(address) as client:
+                    # One connection carries one request at a time
+                    _execute_actions(actions, client.dispatch, recorder, is_plan, max_steps, 1,
+                                     blobs=_blob_store(config), history=history)
+            except OSError as e:
+                echo_err(f"Daemon not reachable at {address}: {e}")
+            return
 
         echo_info(f"Initializing executor in {config['workspace']}...")
         executor = HumanExecutor(config["workspace"])
-        dispatcher = Dispatcher(executor)
-
+        dispatcher = Dispatcher(executor, config.get("action_timeouts"),
+                                int(config.get("memo_entries", DEFAULT_MAX_ENTRIES)))
+        _execute_actions(actions, dispatcher.dispatch, recorder, is_plan, max_steps,
+                         int(config.get("dag_max_workers", DEFAULT_MAX_WORKERS)),
+                         blobs=_blob_store(config), history=history)
+
+
+def _blob_store(config: dict) -> Optional[BlobStore]:
+    """Store for large result fields, shared with the API's /results endpoint."""
+    threshold = int(config.get("blob_threshold", DEFAULT_THRESHOLD))
+    if threshold <= 0:
+        return None
+    return BlobStore(os.path.join(PROJECT_ROOT, blob_dir(config)), threshold)
+
+
+def _execute_actions(actions: list, dispatch, recorder: Optional[RunRecorder],
+                     is_plan: bool, max_steps: int, max_workers: int = DEFAULT_MAX_WORKERS,
+                     blobs: Optional[BlobStore] = None, history: Optional[RunHistory] = None) -> None:
+    """Run a batch in order, through the PlanRunner if it uses control flow."""
+    def run_one(action: dict) -> dict:
+        echo_info(f"Executing: {action.get('type', 'unknown')}")
+        result = _dispatch_recorded(dispatch, action, recorder, history)
+        echo_result(dict(result), blobs)
+        return result
+
+    if not is_plan:
         for action in actions:
-            action_type = action.get("type", "unknown")
-            echo_info(f"Executing: {action_type}")
-            result = dispatcher.dispatch(action)
-            
-            if result.get("status") == "ok":
-                msg = result.pop("message", "Done")
-                result.pop("status", None)
-                echo_ok(msg)
-                if result:
-                    for k, v in result.items():
-                        click.echo(f"  {k}: {v}")
-            else:
-                echo_err(result.get("message", "Failed"))
-    else:
-        # Start Agent Loop
-        echo_header("Starting Octopus Agent")
-        click.echo("  Press Ctrl+Alt+Q for emergency stop")
-        click.echo(f"  Listening for actions from '{config.get('adapter')}' adapter...")
-        click.echo()
+            run_one(action)
+        return
+    summary = PlanRunner(run_one, max_steps, max_workers=max_workers).run(actions)
+    (echo_ok if summary["status"] == "ok" else echo_err)(summary["message"])
+
+
+def _run_agent(config: dict) -> None:
+    """Start the agent loop."""
+    echo_header("Starting Octopus Agent")
+    click.echo("  Press Ctrl+Alt+Q for emergency stop")
+    click.echo(f"  Listening for actions from '{config.get('adapter')}' adapter...")
+    if config.get("record_file"):
+        click.echo(f"  Recording to {config['record_file']}")
+    click.echo()
+
+    agent = None
+    try:
+        agent = Agent(config)
+        agent.start()
+    except KeyboardInterrupt:
+        echo_info("Stopped by user")
+    except Exception as e:
+        echo_err(f"Agent error: {e}")
+    finally:
+        if agent:
+            agent.close()
+
+
+def run_stream(config: dict, action_file: str, checkpoint_path: Optional[str],
+               resume: bool, quiet: bool, recorder: Optional[RunRecorder] = None,
+               history: Optional[RunHistory] = None) -> None:
+    """Execute actions streamed from a file or stdin, one at a time."""
+    from_stdin = action_file == "-"
+    source = "-" if from_stdin else os.path.abspath(action_file)
+    if checkpoint_path is None:
+        checkpoint_path = os.path.join(os.getcwd(), "stdin.ckpt") if from_stdin else f"{source}.ckpt"
+    checkpoint = Checkpoint(checkpoint_path, source)
+    skip = checkpoint.load() if resume else 0
+    if skip:
+        echo_info(f"Resuming after {skip} completed actions ({checkpoint_path})")
+
+    echo_info(f"Initializing executor in {config['workspace']}...")
+    dispatcher = Dispatcher(HumanExecutor(config["workspace"]), config.get("action_timeouts"),
+                            int(config.get("memo_entries", DEFAULT_MAX_ENTRIES)))
+
+    stream = click.get_text_stream("stdin") if from_stdin else open(action_file, "r", encoding="utf-8")
+    blobs = _blob_store(config)
+    executed = failed = 0
+    try:
+        for index, action in enumerate(iter_actions(stream)):
+            if index < skip:
+                continue
+            result = _dispatch_recorded(dispatcher.dispatch, action, recorder, history)
+            executed += 1
+            if result.get("status") != "ok":
+                failed += 1
+                echo_err(f"[{index}] {result.get('message', 'Failed')}")
+            elif not quiet:
+                echo_info(f"[{index}] {action.get('type')}")
+                echo_result(result, blobs)
+            checkpoint.update(index + 1)
+    except StreamFormatError as e:
+        checkpoint.save()
+        echo_err(f"Invalid action stream: {e}")
+        return
+    except KeyboardInterrupt:
+        checkpoint.save()
+        echo_info(f"Interrupted; resume with --resume ({checkpoint.offset} actions done)")
+        return
+    finally:
+        if not from_stdin:
+            stream.close()
+
+    checkpoint.clear()
+    echo_ok(f"Stream complete: {executed} executed, {failed} failed")
 
-        try:
-            agent = Agent(config)
-            agent.start()
-        except KeyboardInterrupt:
-            echo_info("Stopped by user")
-        except Exception as e:
-            echo_err(f"Agent error: {e}")
 
 @cli.command("shell")
 def cmd_shell():
@@ -210,6 +454,9 @@ def cmd_shell():
     echo_header("Octopus Interactive Shell")
     click.echo("  Type your instruction in natural language or PowerShell.")
     click.echo("  Commands: 'exit', 'clear', 'status'")
+    daemon_up = is_daemon_running(resolve_address(load_config(), PROJECT_ROOT))
+    if daemon_up:
+        click.echo("  Actions are forwarded to the running daemon.")
     click.echo()
     
     while True:
@@ -226,9 +473,9 @@ def cmd_shell():
             
             # Execute logic: Treat as action if it looks like JSON, else pass to PowerShell
             if cmd.strip().startswith("{"):
-                # Action execution
+                # Action execution (reuse warm daemon state when available)
                 ctx = click.get_current_context()
-                ctx.invoke(cmd_run, action_json=cmd)
+                ctx.invoke(cmd_run, action_json=cmd, use_daemon=daemon_up)
             else:
                 # PowerShell execution
                 echo_info(f"Running via PowerShell: {cmd}")
@@ -239,6 +486,126 @@ def cmd_shell():
             break
     echo_info("Shell closed")
 
+# ─────────────────────────────────────────────────────────────────────────────
+# Daemon Management
+# ─────────────────────────────────────────────────────────────────────────────
+
+@cli.group("daemon")
+def daemon_group():
+    """Run a persistent action server for fast repeated actions."""
+    pass
+
+@daemon_group.command("start")
+def daemon_start():
+    """Start the daemon in the foreground (Ctrl+C to stop)."""
+    config = load_config()
+    workspace = os.path.abspath(os.path.join(PROJECT_ROOT, config.get("workspace", "workspace")))
+    address = resolve_address(config, PROJECT_ROOT)
+
+    if is_daemon_running(address):
+        echo_err(f"Daemon already running at {address}")
+        return
+
+    echo_header("Octopus Daemon")
+    click.echo(f"  Listening on: {address}")
+    click.echo(f"  Workspace:    {workspace}")
+    click.echo()
+    try:
+        ActionDaemon(workspace, address, config.get("action_timeouts")).serve_forever()
+    except KeyboardInterrupt:
+        echo_info("Daemon stopped by user")
+
+@daemon_group.command("stop")
+def daemon_stop():
+    """Stop a running daemon."""
+    address = resolve_address(load_config(), PROJECT_ROOT)
+    try:
+        with DaemonClient(address, timeout=5.0) as client:
+            client.shutdown()
+        echo_ok("Daemon stopped")
+    except OSError:
+        echo_info("Daemon is not running")
+
+@daemon_group.command("status")
+def daemon_status():
+    """Check whether the daemon is running."""
+    address = resolve_address(load_config(), PROJECT_ROOT)
+    if is_daemon_running(address):
+        echo_ok(f"Daemon running at {address}")
+    else:
+        echo_info("Daemon is not running")
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Macros
+# ─────────────────────────────────────────────────────────────────────────────
+
+@cli.group("macro")
+def macro_group():
+    """Record real mouse/keyboard input and replay it as actions."""
+    pass
+
+@macro_group.command("record")
+@click.argument("output", type=click.Path(dir_okay=False))
+@click.option("--stop-key", default="esc", help="Key that ends the recording")
+@click.option("--max-seconds", type=float, help="Stop automatically after this long")
+def macro_record(output: str, stop_key: str, max_seconds: Optional[float]):
+    """Record input until the stop key is pressed."""
+    echo_info(f"Recording... press '{stop_key}' to stop")
+    try:
+        macro = MacroRecorder(stop_key).record(max_seconds)
+    except KeyboardInterrupt:
+        echo_err("Recording cancelled")
+        return
+    size = macro.save(output)
+    echo_ok(f"{len(macro)} events saved to {output} ({size} bytes)")
+
+@macro_group.command("compile")
+@click.argument("macro_file", type=click.Path(exists=True, dir_okay=False))
+@click.option("-o", "--output", type=click.Path(dir_okay=False), help="Write the action batch to file")
+@click.option("--intent", default="Recorded macro", help="Intent attached to the batch")
+@click.option("--jitter", default=3, help="Pointer movement in pixels ignored as jitter")
+@click.option("--min-pause", default=0.5, help="Shortest idle gap kept as system.sleep (s)")
+def macro_compile(macro_file: str, output: Optional[str], intent: str, jitter: int, min_pause: float):
+    """Compile a recorded macro into an action batch (JSON)."""
+    try:
+        batch = compile_macro(MacroLog.load(macro_file), intent, jitter_px=jitter, min_pause=min_pause)
+    except ValueError as e:
+        echo_err(str(e))
+        return
+    text = json.dumps(batch, indent=2, ensure_ascii=False)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text)
+        echo_ok(f"{len(batch['actions'])} actions written to {output}")
+    else:
+        click.echo(text)
+
+@macro_group.command("play")
+@click.argument("macro_file", type=click.Path(exists=True, dir_okay=False))
+@click.option("--dry-run", is_flag=True, help="Print the compiled actions without executing")
+def macro_play(macro_file: str, dry_run: bool):
+    """Compile a recorded macro and execute it through the dispatcher."""
+    try:
+        batch = compile_macro(MacroLog.load(macro_file))
+    except ValueError as e:
+        echo_err(str(e))
+        return
+    if dry_run:
+        click.echo(json.dumps(batch, indent=2, ensure_ascii=False))
+        return
+
+    config = load_config()
+    workspace = os.path.abspath(os.path.join(PROJECT_ROOT, config.get("workspace", "workspace")))
+    dispatcher = Dispatcher(HumanExecutor(workspace), config.get("action_timeouts"),
+                            int(config.get("memo_entries", DEFAULT_MAX_ENTRIES)))
+    for action in batch["actions"]:
+        result = dispatcher.dispatch(action)
+        if result.get("status") != "ok":
+            echo_err(f"{action['type']}: {result.get('message', 'Failed')}")
+            return
+    echo_ok(f"Played {len(batch['actions'])} actions")
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Model/Adapter Management
 # ─────────────────────────────────────────────────────────────────────────────
@@ -420,6 +787,168 @@ def logs_tail(lines: int):
         echo_err(f"Error reading logs: {e}")
 
 
+@logs_group.command("query")
+@click.option("-t", "--type", "action_type", help="Action type, or skill wildcard like 'file.*'")
+@click.option("-s", "--status", help="Result status (ok, error, ...)")
+@click.option("--since", help="Lower bound: epoch, ISO 8601 or relative ('1h', '30m')")
+@click.option("--until", help="Upper bound: epoch, ISO 8601 or relative")
+@click.option("--batch", help="Batch identifier")
+@click.option("--cursor", type=int, help="Continue from a previous page's cursor")
+@click.option("-n", "--limit", default=20, help="Records per page")
+@click.option("--json", "as_json", is_flag=True, help="Print raw JSON")
+def logs_query(action_type, status, since, until, batch, cursor, limit, as_json):
+    """
+    Query the indexed action history.
+
+    \b
+    Example:
+      agent logs query -t file.write -s error --since 1h
+    """
+    history_db = _history_path(load_config())
+    if not history_db or not os.path.exists(history_db):
+        echo_info("No action history recorded yet")
+        return
+    try:
+        page = HistoryStore(history_db).query(action_type, status, since, until, batch, cursor, limit)
+    except ValueError as e:
+        echo_err(str(e))
+        return
+
+    if as_json:
+        click.echo(json.dumps(page, indent=2))
+        return
+    for r in page["records"]:
+        ts = datetime.fromtimestamp(r["ts"]).strftime("%Y-%m-%d %H:%M:%S")
+        line = f"{ts} | {r['type']:<18} | {r['status']:<6} | {r['duration_ms'] or 0:>9.2f} ms | {r['message']}"
+        click.echo(click.style(line, fg=None if r["status"] == "ok" else "red"))
+    if page["next_cursor"] is not None:
+        echo_info(f"More results: --cursor {page['next_cursor']}")
+
+@logs_group.command("stats")
+@click.option("--since", help="Lower bound: epoch, ISO 8601 or relative ('1h', '30m')")
+@click.option("--until", help="Upper bound: epoch, ISO 8601 or relative")
+@click.option("-t", "--type", "action_type", help="Action type, or skill wildcard like 'file.*'")
+@click.option("--json", "as_json", is_flag=True, help="Print raw JSON")
+def logs_stats(since, until, action_type, as_json):
+    """Show per-action-type counts, errors and durations."""
+    history_db = _history_path(load_config())
+    if not history_db or not os.path.exists(history_db):
+        echo_info("No action history recorded yet")
+        return
+    try:
+        stats = HistoryStore(history_db).stats(since, until, action_type)
+    except ValueError as e:
+        echo_err(str(e))
+        return
+
+    if as_json:
+        click.echo(json.dumps(stats, indent=2))
+        return
+    echo_header(f"Action Stats ({stats['total']} actions)")
+    click.echo(f"  {'Type':<20} {'Count':>9} {'Errors':>8} {'Avg ms':>10} {'Max ms':>10}")
+    for r in stats["types"]:
+        click.echo(f"  {r['type']:<20} {r['count']:>9} {r['errors']:>8} {r['avg_ms'] or 0:>10} {r['max_ms'] or 0:>10}")
+    click.echo()
+
+
+@cli.command("bench")
+@click.option("-n", "--iterations", default=1000, help="Samples per in-process benchmark")
+@click.option("--api-iterations", default=20, help="Samples for the API round trip")
+@click.option("--layer", "layers", multiple=True,
+              help="Layer to run (repeatable): dispatch, executor, llm_parse, file_adapter, api, metrics, halt, network, memo, codec")
+@click.option("-o", "--output", type=click.Path(dir_okay=False), help="Also write JSON results to file")
+def cmd_bench(iterations: int, api_iterations: int, layers: tuple, output: Optional[str]):
+    """
+    Benchmark each execution layer on the null input backend.
+
+    \b
+    Examples:
+      agent bench                            # Run all layers
+      agent bench --layer dispatch -n 10000  # Single layer, more samples
+    """
+    from core.bench import BenchmarkSuite
+
+    logging.getLogger().setLevel(logging.WARNING)
+    suite = BenchmarkSuite(iterations=iterations, api_iterations=api_iterations)
+    try:
+        report = suite.run(list(layers) or None)
+    finally:
+        suite.close()
+
+    text = json.dumps(report, indent=2)
+    click.echo(text)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+@cli.command("replay")
+@click.argument("recording", type=click.Path(exists=True, dir_okay=False))
+@click.option("--speed", default=0.0,
+              help="Speed multiplier for recorded timing (0 = as fast as possible)")
+@click.option("--backend", default="null", help="Input backend (default: null, no real input)")
+@click.option("--compare", default="status,message", help="Result fields that must match")
+@click.option("--json", "as_json", is_flag=True, help="Print the full JSON report")
+@click.option("--live-workspace", is_flag=True,
+              help="Replay against the real workspace instead of a temporary copy")
+@click.option("--live-side-effects", is_flag=True,
+              help="Really run network, process.kill, clipboard and file-changing actions")
+def cmd_replay(recording: str, speed: float, backend: str, compare: str, as_json: bool,
+               live_workspace: bool, live_side_effects: bool):
+    """
+    Replay a recording made with 'agent run --record' and diff the results.
+
+    File actions run in a temporary copy of the workspace, so replaying
+    writes and deletes never touches the real one (see --live-workspace).
+    Network requests, process kills and clipboard changes are skipped and
+    counted as such, as are file changes with --live-workspace; pass
+    --live-side-effects to run them all for real.
+
+    \b
+    Examples:
+      agent replay run.jsonl.gz              # Fast headless regression check
+      agent replay run.jsonl --speed 1       # Original pacing
+    """
+    config = load_config()
+    workspace = os.path.abspath(os.path.join(PROJECT_ROOT, config.get("workspace", "workspace")))
+    logging.getLogger().setLevel(logging.WARNING)
+    scratch = None
+    # File changes only land in the scratch copy unless --live-workspace
+    side_effects = ["*"] if live_side_effects else [] if live_workspace else ["file"]
+    if not live_workspace:
+        scratch = tempfile.TemporaryDirectory(prefix="octopus-replay-")
+        copy = os.path.join(scratch.name, "workspace")
+        if os.path.isdir(workspace):
+            shutil.copytree(workspace, copy, symlinks=True)
+        else:
+            os.makedirs(copy)
+        workspace = copy
+    try:
+        replayer = RunReplayer(recording, speed=speed, workspace=workspace, backend=backend,
+                               compare=[f.strip() for f in compare.split(",") if f.strip()],
+                               side_effects=side_effects)
+        report = replayer.run()
+    except ValueError as e:
+        echo_err(str(e))
+        sys.exit(1)
+    finally:
+        if scratch:
+            scratch.cleanup()
+
+    if as_json:
+        click.echo(json.dumps(report, indent=2, default=str))
+    else:
+        for m in report["mismatches"]:
+            for field, values in m["diff"].items():
+                echo_err(f"#{m['seq']} {m['type']} {field}: "
+                         f"expected {values['expected']!r}, got {values['actual']!r}")
+        summary = (f"{report['message']} | recorded {report['recorded_seconds']:.3f}s, "
+                   f"replayed {report['replayed_seconds']:.3f}s")
+        (echo_ok if report["status"] == "ok" else echo_err)(summary)
+    if report["status"] != "ok":
+        sys.exit(1)
+
+
 @cli.command("update")
 def cmd_update():
     """Update dependencies from requirements.txt."""
@@ -0,0 +1,267 @@
+"""
+Octopus Action Log
+==================
+Structured action records written off the execution thread.
+
+The agent enqueues one record per executed action; a background writer
+compacts it (large params are truncated and hashed), appends it as a JSON
+line and rotates the file by size and age, optionally gzip-compressing
+rotated segments.
+
+Author: Octopus Contributors
+License: MIT
+"""
+
+import os
+import gzip
+import time
+import glob
+import queue
+import shutil
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Callable, Optional
+
+from core.clock import Clock, SYSTEM_CLOCK
+from core import codec
+
+log = logging.getLogger("octopus.actionlog")
+
+_STOP = object()
+
+
+def compact_value(value: Any, max_chars: int = 256, max_items: int = 50) -> Any:
+    """
+    Shrink a parameter value for logging.
+
+    Long strings become {"len", "sha256", "head"} so identical payloads can
+    still be correlated; long containers are cut to max_items entries.
+
+    Args:
+        value: Parameter value (any JSON-compatible type)
+        max_chars: Strings longer than this are summarized
+        max_items: Lists/dicts longer than this are truncated
+
+    Returns:
+        JSON-compatible compacted value
+    """
+    if isinstance(value, str):
+        if len(value) <= max_chars:
+            return value
+        digest = hashlib.sha256(value.encode("utf-8", "replace")).hexdigest()[:16]
+        return {"len": len(value), "sha256": digest, "head": value[:64]}
+    if isinstance(value, dict):
+        items = list(value.items())
+        out = {str(k): compact_value(v, max_chars, max_items) for k, v in items[:max_items]}
+        if len(items) > max_items:
+            out["..."] = len(items) - max_items
+        return out
+    if isinstance(value, (list, tuple)):
+        out = [compact_value(v, max_chars, max_items) for v in value[:max_items]]
+        if len(value) > max_items:
+            out.append(f"... {len(value) - max_items} more")
+        return out
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    return compact_value(str(value), max_chars, max_items)
+
+
+def build_record(ts: float, action: Any, result: Any, duration: float,
+                 batch: Optional[str] = None, intent: Optional[str] = None,
+                 max_param_chars: int = 256) -> Dict[str, Any]:
+    """Action log / history record of one executed action."""
+    if not isinstance(action, dict):
+        action = {"type": "invalid", "params": action}
+    if not isinstance(result, dict):
+        result = {}
+    message = str(result.get("message", ""))
+    return {
+        "ts": round(ts, 3),
+        "type": action.get("type", "unknown"),
+        "params": compact_value(action.get("params", {}), max_param_chars),
+        "status": result.get("status", "unknown"),
+        "message": message if len(message) <= 200 else message[:200] + "...",
+        "duration_ms": round(duration * 1000, 3),
+        "batch": batch,
+        "intent": intent,
+    }
+
+
+class RotatingWriter:
+    """
+    Append-only line writer with size and time based rotation.
+
+    Rotated segments are renamed to '<path>.<YYYYmmdd-HHMMSS>' (plus '.gz'
+    when compressed); only the newest `backup_count` segments are kept.
+    """
+
+    def __init__(self, path: str, max_bytes: int, rotate_seconds: float,
+                 backup_count: int, compress: bool):
+        self._path = path
+        self._max_bytes = max_bytes
+        self._rotate_seconds = rotate_seconds
+        self._backup_count = backup_count
+        self._compress = compress
+        self._file = None
+        self._size = 0
+        self._opened_at = 0.0
+
+        log_dir = os.path.dirname(path)
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
+
+    def _open(self) -> None:
+        # Binary, so _size counts bytes as max_bytes does
+        self._file = open(self._path, "ab")
+        self._size = self._file.tell()
+        self._opened_at = time.time()
+
+    def write_lines(self, lines: List[str]) -> None:
+        """Append lines (already newline-terminated) and rotate if due."""
+        if self._file is None:
+            self._open()
+        data = "".join(lines).encode("utf-8")
+        self._file.write(data)
+        self._file.flush()
+        self._size += len(data)
+
+        too_big = self._max_bytes and self._size >= self._max_bytes
+        too_old = self._rotate_seconds and time.time() - self._opened_at >= self._rotate_seconds
+        if too_big or too_old:
+            self.rotate()
+
+    def rotate(self) -> None:
+        """Close the current segment and start a new one."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if not os.path.exists(self._path) or os.path.getsize(self._path) == 0:
+            return
+
+        target = f"{self._path}.{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+        suffix = 1
+        while os.path.exists(target) or os.path.exists(f"{target}.gz"):
+            target = f"{self._path}.{datetime.now().strftime('%Y%m%d-%H%M%S')}-{suffix}"
+            suffix += 1
+        os.replace(self._path, target)
+
+        if self._compress:
+            with open(target, "rb") as src, gzip.open(f"{target}.gz", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(target)
+        self._prune()
+
+    def _prune(self) -> None:
+        if self._backup_count <= 0:
+            return
+        segments = sorted(glob.glob(f"{glob.escape(self._path)}.*"), key=os.path.getmtime)
+        for old in segments[:-self._backup_count]:
+            try:
+                os.remove(old)
+            except OSError as e:
+                log.warning(f"Could not remove old log segment {old}: {e}")
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class ActionLog:
+    """
+    Queue-backed JSON-lines action recorder.
+
+    record() only enqueues a tuple and never blocks: when the queue is full
+    the record is dropped and counted. Compaction, encoding and file I/O
+    happen on the writer thread.
+
+    Record format (one JSON object per line):
+        {"ts": 1700000000.123, "type": "file.write", "params": {...},
+         "status": "ok", "message": "...", "duration_ms": 1.52,
+         "batch": "a1b2c3", "intent": "..."}
+    """
+
+    def __init__(self, path: str, max_bytes: int = 10 * 1024 * 1024,
+                 rotate_seconds: float = 86400, backup_count: int = 10,
+                 compress: bool = False, max_param_chars: int = 256,
+                 queue_size: int = 10000, clock: Optional[Clock] = None):
+        """
+        Args:
+            path: JSON-lines output file
+            max_bytes: Rotate when the segment reaches this size (0 disables)
+            rotate_seconds: Rotate when the segment is this old (0 disables)
+            backup_count: Rotated segments to keep (0 keeps all)
+            compress: Gzip rotated segments
+            max_param_chars: String params longer than this are hashed
+            queue_size: Pending records before new ones are dropped
+            clock: Source of record timestamps (default: real time)
+        """
+        self._writer = RotatingWriter(path, max_bytes, rotate_seconds, backup_count, compress)
+        self._max_param_chars = max_param_chars
+        self._clock = clock or SYSTEM_CLOCK
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._sinks: List[Callable[[List[Dict[str, Any]]], None]] = []
+        self.dropped = 0
+
+        self._thread = threading.Thread(target=self._run, daemon=True, name="action-log")
+        self._thread.start()
+
+    def add_sink(self, sink: Callable[[List[Dict[str, Any]]], None]) -> None:
+        """Register a callable that also receives each drained list of records."""
+        self._sinks.append(sink)
+
+    def record(self, action: Dict[str, Any], result: Dict[str, Any], duration: float,
+               batch: Optional[str] = None, intent: Optional[str] = None) -> None:
+        """
+        Enqueue an executed action (non-blocking).
+
+        Args:
+            action: Action as dispatched
+            result: Result dictionary
+            duration: Execution time in seconds
+            batch: Batch identifier the action belongs to
+            intent: Batch intent
+        """
+        try:
+            self._queue.put_nowait((self._clock.time(), action, result, duration, batch, intent))
+        except queue.Full:
+            self.dropped += 1
+
+    def _build(self, item) -> Dict[str, Any]:
+        return build_record(*item, max_param_chars=self._max_param_chars)
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            items = [self._queue.get()]
+            # Drain whatever else is pending into the same write
+            while len(items) < 512:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if _STOP in items:
+                stopping = True
+                items = [i for i in items if i is not _STOP]
+            if not items:
+                continue
+
+            try:
+                records = [self._build(i) for i in items]
+                self._writer.write_lines(
+                    [codec.dumps(r) + "\n" for r in records]
+                )
+                for sink in self._sinks:
+                    sink(records)
+            except Exception as e:
+                log.error(f"Action log write failed: {e}")
+        self._writer.close()
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Flush pending records and stop the writer thread."""
+        if not self._thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
@@ -0,0 +1,189 @@
+"""
+Octopus Action Stream
+=====================
+Incremental reader for large action files and a checkpoint for resuming
+interrupted runs. Actions are yielded one at a time, so memory use does not
+grow with the size of the plan.
+
+Accepted input formats:
+    - NDJSON: one action (or one {"actions": [...]} batch) per line
+    - A top-level JSON array of actions, parsed element by element
+    - One or more concatenated JSON objects (actions or batches)
+
+Author: Octopus Contributors
+License: MIT
+"""
+
+import os
+import json
+import logging
+from datetime import datetime
+from typing import Dict, Any, Iterator, Optional, TextIO
+
+log = logging.getLogger("octopus.stream")
+
+CHUNK_SIZE = 64 * 1024
+# Upper bound for a single encoded action; guards against unbounded buffering
+MAX_ELEMENT_SIZE = 64 * 1024 * 1024
+
+_decoder = json.JSONDecoder()
+
+
+class StreamFormatError(ValueError):
+    """Raised when the action stream is not valid JSON/NDJSON."""
+
+
+class _Buffer:
+    """Sliding text window over a stream."""
+
+    def __init__(self, stream: TextIO, chunk_size: int):
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Read one more chunk. Returns False at end of stream."""
+        if self.eof:
+            return False
+        chunk = self._stream.read(self._chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        # Drop consumed text before growing the window
+        self.text = self.text[self.pos:] + chunk
+        self.pos = 0
+        if len(self.text) > MAX_ELEMENT_SIZE:
+            raise StreamFormatError(f"Single element exceeds {MAX_ELEMENT_SIZE} bytes")
+        return True
+
+    def skip(self, chars: str) -> Optional[str]:
+        """Advance past any of `chars`; return the next char or None at EOF."""
+        while True:
+            text, pos = self.text, self.pos
+            while pos < len(text) and text[pos] in chars:
+                pos += 1
+            self.pos = pos
+            if pos < len(text):
+                return text[pos]
+            if not self.fill():
+                return None
+
+    def decode(self) -> Any:
+        """Decode one JSON value at the current position, reading more as needed."""
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError as e:
+                if self.fill():
+                    continue
+                raise StreamFormatError(f"Invalid JSON near offset {e.pos}: {e.msg}") from e
+            # A number at the window edge may continue in the next chunk
+            if end == len(self.text) and not self.eof and not isinstance(value, (dict, list, str)):
+                if self.fill():
+                    continue
+            self.pos = end
+            return value
+
+
+def _expand(value: Any) -> Iterator[Dict[str, Any]]:
+    """Yield actions from a decoded object (single action or batch)."""
+    if isinstance(value, dict) and isinstance(value.get("actions"), list):
+        yield from value["actions"]
+    else:
+        yield value
+
+
+def iter_actions(stream: TextIO, chunk_size: int = CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily yield actions from a text stream.
+
+    Args:
+        stream: Open text stream (file or stdin)
+        chunk_size: Characters read per refill
+
+    Yields:
+        Action dictionaries in file order
+
+    Raises:
+        StreamFormatError: On malformed input
+    """
+    buf = _Buffer(stream, chunk_size)
+    first = buf.skip(" \t\r\n\ufeff")
+    if first is None:
+        return
+
+    if first == "[":
+        # Top-level array: decode one element at a time
+        buf.pos += 1
+        while True:
+            ch = buf.skip(" \t\r\n,")
+            if ch is None:
+                raise StreamFormatError("Unterminated JSON array")
+            if ch == "]":
+                return
+            yield from _expand(buf.decode())
+    else:
+        # NDJSON or concatenated objects
+        while buf.skip(" \t\r\n") is not None:
+            yield from _expand(buf.decode())
+
+
+class Checkpoint:
+    """
+    Persists the number of completed actions for a stream.
+
+    Writes are atomic (temp file + rename), so an interrupted run leaves
+    either the previous or the new offset on disk, never a torn file.
+    """
+
+    def __init__(self, path: str, source: str, every: int = 100):
+        """
+        Args:
+            path: Checkpoint file location
+            source: Identifier of the input (file path or '-')
+            every: Persist after this many completed actions
+        """
+        self._path = path
+        self._source = source
+        self._every = max(1, every)
+        self.offset = 0
+
+    def load(self) -> int:
+        """Read the saved offset. Returns 0 if absent or for a different source."""
+        if not os.path.exists(self._path):
+            return 0
+        try:
+            with open(self._path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            log.warning(f"Ignoring unreadable checkpoint {self._path}: {e}")
+            return 0
+        if data.get("source") != self._source:
+            log.warning(f"Checkpoint {self._path} belongs to '{data.get('source')}', ignoring")
+            return 0
+        self.offset = int(data.get("offset", 0))
+        return self.offset
+
+    def update(self, offset: int) -> None:
+        """Record the completed-action count, persisting periodically."""
+        self.offset = offset
+        if offset % self._every == 0:
+            self.save()
+
+    def save(self) -> None:
+        """Persist the current offset."""
+        tmp_path = f"{self._path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "source": self._source,
+                "offset": self.offset,
+                "updated": datetime.now().isoformat(timespec="seconds"),
+            }, f)
+        os.replace(tmp_path, self._path)
+
+    def clear(self) -> None:
+        """Remove the checkpoint after a completed run."""
+        if os.path.exists(self._path):
+            os.remove(self._path)
@@ -10,18 +10,27 @@ License: MIT
 
 import os
 import sys
-import time
+import uuid
 import queue
 import logging
+import logging.handlers
 import threading
 from datetime import datetime
 from typing import Dict, Any, Optional
 
-from pynput import keyboard
-
 from core.executor.human_executor import HumanExecutor
 from core.dispatcher import Dispatcher
 from core.model_adapter import create_adapter
+from core.action_log import ActionLog
+from core.history import HistoryStore
+from core.metrics import QUEUE_DEPTH, BATCHES_TOTAL
+from core.tracing import span
+from core.clock import Clock, SystemClock, SYSTEM_CLOCK
+from core.recording import RunRecorder
+from core.plan import PlanRunner, PlanError, as_plan, uses_plan_features, validate_plan, DEFAULT_MAX_STEPS
+from core.dag import DEFAULT_MAX_WORKERS
+from core.memo import DEFAULT_MAX_ENTRIES
+from core.blobs import BlobStore, blob_dir, DEFAULT_THRESHOLD
 
 log = logging.getLogger("octopus.agent")
 
@@ -33,64 +42,164 @@ class Agent:
     Features:
     - Blocking queue for low CPU idle usage
     - Emergency stop via Ctrl+Alt+Q hotkey
-    - Action logging to file
+    - Asynchronous JSON-lines action log with rotation
     - Configurable adapter (mock/file)
     
     The agent fetches action batches from the adapter in a background
-    thread and processes them sequentially in the main loop.
+    thread and processes them sequentially in the main loop. For tests
+    and replays, run_until_idle() drives the same pipeline on a single
+    thread, typically with a VirtualClock.
     """
 
-    def __init__(self, config: Dict[str, Any]):
+    def __init__(self, config: Dict[str, Any], clock: Optional[Clock] = None):
         """
         Initialize agent with configuration.
         
         Args:
             config: Dictionary with keys:
                 - workspace: Path to workspace directory
-                - log_file: Path to action log file
+                - log_file: Path to text log file
+                - action_log_file: Path to JSON-lines action log
+                  (default: actions.jsonl next to log_file)
+                - log_max_bytes: Rotate logs at this size (default 10 MB)
+                - log_rotate_seconds: Rotate action log at this age (default 1 day)
+                - log_backup_count: Rotated segments to keep (default 10)
+                - log_compress: Gzip rotated action log segments (default False)
+                - history_db: SQLite action history (default: history.db next
+                  to log_file; set to '' to disable)
                 - adapter: Adapter name ('mock' or 'file')
+                - action_timeouts: Time budgets in seconds keyed by skill or
+                  'skill.method' (see core.dispatcher.DEFAULT_TIMEOUTS)
+                - plan_max_steps: Step budget per batch with control flow
+                  (default 1000, see core.plan)
+                - blob_dir: Store for large result fields (default: blobs/
+                  next to log_file; see core.blobs)
+                - blob_threshold: Result fields larger than this many bytes
+                  are logged as blob handles (default 4096, 0 keeps them inline)
+                - memo_entries: Results of idempotent reads kept by the
+                  dispatcher (default 256, 0 disables; see core.memo)
+                - dag_max_workers: Concurrent actions in a batch that uses
+                  'depends_on' (default 4, see core.dag)
+                - record_file: Write a replayable run recording here
+                  (see core.recording; default: off)
+            clock: Time source shared by agent, adapter and executor
+                (default: real time; pass a VirtualClock to skip sleeps)
         """
         self._config = config
+        self._clock = clock or SYSTEM_CLOCK
         self._workspace = config.get("workspace", "workspace")
         self._log_file = config.get("log_file", "logs/actions.log")
-
-        # Initialize components
-        self._executor = HumanExecutor(self._workspace)
-        self._dispatcher = Dispatcher(self._executor)
-        self._adapter = create_adapter(
-            config.get("adapter", "mock"), self._workspace
+        self._action_log_file = config.get(
+            "action_log_file",
+            os.path.join(os.path.dirname(self._log_file), "actions.jsonl"),
         )
 
         # Execution state
         self._action_queue: queue.Queue = queue.Queue()
         self._halt_event = threading.Event()
         self._running = False
+        self._closed = False
+
+        # Initialize components (the executor aborts running primitives on halt)
+        self._executor = HumanExecutor(
+            self._workspace, backend=config.get("input_backend"), clock=self._clock,
+            halt_event=self._halt_event,
+        )
+        self._dispatcher = Dispatcher(self._executor, config.get("action_timeouts"),
+                                      int(config.get("memo_entries", DEFAULT_MAX_ENTRIES)))
+        self._adapter = create_adapter(
+            config.get("adapter", "mock"), self._workspace, self._clock
+        )
+
+        # Large result fields are logged and recorded as blob handles
+        threshold = int(config.get("blob_threshold", DEFAULT_THRESHOLD))
+        self._blobs = BlobStore(blob_dir(config), threshold) if threshold > 0 else None
 
         # Setup logging
         self._init_logging()
 
     def _init_logging(self) -> None:
-        """Initialize file-based action logging."""
+        """
+        Initialize file logging.
+
+        Text log records are handed to a QueueListener so file I/O never
+        runs on the execution thread; structured action records go to a
+        separate ActionLog.
+        """
         log_dir = os.path.dirname(self._log_file)
         if log_dir and not os.path.exists(log_dir):
             os.makedirs(log_dir, exist_ok=True)
 
-        file_handler = logging.FileHandler(self._log_file, encoding="utf-8")
+        max_bytes = int(self._config.get("log_max_bytes", 10 * 1024 * 1024))
+        backup_count = int(self._config.get("log_backup_count", 10))
+
+        file_handler = logging.handlers.RotatingFileHandler(
+            self._log_file, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+        )
         file_handler.setLevel(logging.INFO)
         formatter = logging.Formatter(
             "%(asctime)s | %(levelname)s | %(message)s",
             datefmt="%Y-%m-%d %H:%M:%S"
         )
         file_handler.setFormatter(formatter)
-        logging.getLogger().addHandler(file_handler)
 
-    def _log_action(self, action: Dict, result: Dict) -> None:
-        """Record action execution to log."""
-        action_type = action.get("type", "unknown")
-        params = action.get("params", {})
-        status = result.get("status", "unknown")
-        message = result.get("message", "")
-        log.info(f"ACTION: {action_type} | params={params} | {status}: {message}")
+        log_queue: queue.Queue = queue.Queue(-1)
+        queue_handler = logging.handlers.QueueHandler(log_queue)
+        queue_handler.setLevel(logging.INFO)
+        self._log_listener = logging.handlers.QueueListener(log_queue, file_handler)
+        self._log_listener.start()
+        logging.getLogger().addHandler(queue_handler)
+        self._log_handler = queue_handler
+
+        self._action_log = ActionLog(
+            self._action_log_file,
+            max_bytes=max_bytes,
+            rotate_seconds=float(self._config.get("log_rotate_seconds", 86400)),
+            backup_count=backup_count,
+            compress=bool(self._config.get("log_compress", False)),
+            clock=self._clock,
+        )
+
+        history_db = self._config.get(
+            "history_db", os.path.join(os.path.dirname(self._log_file), "history.db")
+        )
+        self._history = HistoryStore(history_db) if history_db else None
+        if self._history:
+            self._action_log.add_sink(self._history.write)
+
+        record_file = self._config.get("record_file")
+        self._recorder = RunRecorder(record_file, clock=self._clock) if record_file else None
+
+    def close(self) -> None:
+        """
+        Flush and detach the log writers, history and recording.
+
+        Call once when done with the agent (start() and run_until_idle()
+        leave them open so they can be called again). Safe to call twice.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._action_log.close()
+        if self._recorder:
+            self._recorder.close()
+        if self._history:
+            self._history.close()
+        logging.getLogger().removeHandler(self._log_handler)
+        self._log_listener.stop()
+
+    def _log_action(self, action: Dict, result: Dict, duration: float,
+                    batch: Optional[Dict[str, Any]] = None) -> None:
+        """Record action execution to the structured action log."""
+        batch = batch or {}
+        self._action_log.record(
+            action, result, duration,
+            batch=batch.get("id"), intent=batch.get("intent"),
+        )
+        log.info(
+            f"ACTION: {action.get('type', 'unknown')} | "
+            f"{result.get('status', 'unknown')}: {result.get('message', '')}"
+        )
 
     def _on_emergency_halt(self) -> None:
         """Handle emergency stop hotkey."""
@@ -100,26 +209,54 @@ class Agent:
 
     def _start_halt_listener(self) -> None:
         """Start global hotkey listener for Ctrl+Alt+Q."""
+        # Imported lazily: pynput needs a display server at import time
+        from pynput import keyboard
+
         hotkey = keyboard.GlobalHotKeys({
             "<ctrl>+<alt>+q": self._on_emergency_halt
         })
         hotkey.start()
         log.info("Emergency halt listener active (Ctrl+Alt+Q)")
 
+    def _enqueue_batch(self, batch: Optional[Dict[str, Any]]) -> bool:
+        """Queue the actions of an adapter batch. Returns False if there was none."""
+        if not batch or "actions" not in batch:
+            return False
+        intent = batch.get("intent", "No intent")
+        log.info(f"Received batch: {intent}")
+        context = {"id": uuid.uuid4().hex[:12], "intent": intent}
+        actions = batch["actions"]
+        if uses_plan_features(actions):
+            # Control flow and references: one runner (and scope) per batch
+            actions = as_plan(actions)
+            max_steps = int(self._config.get("plan_max_steps", DEFAULT_MAX_STEPS))
+            try:
+                validate_plan(actions, max_steps)
+            except PlanError as e:
+                log.error(f"Rejected batch '{intent}': {e}")
+                return True
+            context["runner"] = PlanRunner(
+                lambda action: self._run_one(action, context), max_steps,
+                should_stop=lambda: not self._running or self._halt_event.is_set(),
+                max_workers=int(self._config.get("dag_max_workers", DEFAULT_MAX_WORKERS)),
+            )
+        if self._recorder:
+            self._recorder.record_batch(context["id"], intent, len(batch["actions"]))
+        BATCHES_TOTAL.inc()
+        for action in actions:
+            self._action_queue.put((action, context))
+        QUEUE_DEPTH.set(self._action_queue.qsize())
+        return True
+
     def _adapter_loop(self) -> None:
         """Background thread: fetch actions from adapter."""
         while self._running and not self._halt_event.is_set():
             try:
-                batch = self._adapter.get_actions()
-                if batch and "actions" in batch:
-                    intent = batch.get("intent", "No intent")
-                    log.info(f"Received batch: {intent}")
-                    for action in batch["actions"]:
-                        self._action_queue.put(action)
+                self._enqueue_batch(self._adapter.get_actions())
             except Exception as e:
                 if self._running:
                     log.error(f"Adapter error: {e}")
-                time.sleep(0.5)
+                self._clock.sleep(0.5)
 
     def start(self) -> None:
         """Start the agent execution loop."""
@@ -149,6 +286,82 @@ class Agent:
             self._running = False
             log.info("Octopus Agent stopped")
 
+    def stop(self) -> None:
+        """Make start() or run_until_idle() return after the current action."""
+        self._running = False
+
+    def run_until_idle(self, max_idle_polls: int = 1) -> int:
+        """
+        Drive adapter and execution on the calling thread until the adapter
+        runs dry or an exit signal arrives. No background threads or hotkey
+        listener are started, so ordering is deterministic.
+
+        Args:
+            max_idle_polls: Consecutive empty adapter polls before stopping
+
+        Returns:
+            Number of actions executed
+        """
+        self._running = True
+        self._halt_event.clear()
+        executed, idle = 0, 0
+        try:
+            while self._running and not self._halt_event.is_set() and idle < max_idle_polls:
+                if not self._enqueue_batch(self._adapter.get_actions()):
+                    idle += 1
+                    continue
+                idle = 0
+                while self._running and not self._action_queue.empty():
+                    action, batch = self._action_queue.get_nowait()
+                    executed += 1
+                    if not self._execute(action, batch):
+                        break
+        finally:
+            self._running = False
+        return executed
+
+    def _next_item(self, timeout: float):
+        """Take the next queued action, waiting up to `timeout` (raises queue.Empty)."""
+        if isinstance(self._clock, SystemClock):
+            return self._action_queue.get(timeout=timeout)
+        try:
+            return self._action_queue.get_nowait()
+        except queue.Empty:
+            self._clock.sleep(timeout)
+            raise
+
+    def _execute(self, action: Dict[str, Any], batch: Dict[str, Any]) -> bool:
+        """Execute one queued action or control node. Returns False when the agent should exit."""
+        runner = batch.get("runner")
+        if runner is not None:
+            runner.execute(action)
+        else:
+            self._run_one(action, batch)
+        return self._running
+
+    def _run_one(self, action: Dict[str, Any], batch: Dict[str, Any]) -> Dict[str, Any]:
+        """Dispatch, log and record one action."""
+        action_type = action.get("type", "")
+        log.info(f"Executing: {action_type}")
+
+        # Dispatch to skill
+        started = self._clock.monotonic()
+        offset = self._recorder.offset() if self._recorder else 0.0
+        with span("agent.action", type=action_type, batch=batch.get("id"), intent=batch.get("intent")):
+            result = self._dispatcher.dispatch(action)
+        duration = self._clock.monotonic() - started
+        # The caller (e.g. a plan reference) still gets the full result
+        logged = self._blobs.externalize(result) if self._blobs else result
+        self._log_action(action, logged, duration, batch)
+        if self._recorder:
+            self._recorder.record_action(action, logged, offset, duration, batch.get("id"))
+
+        # Check for exit signal
+        if result.get("message") == "EXIT_SIGNAL":
+            log.info("Exit signal received")
+            self._running = False
+        return result
+
     def _main_loop(self) -> None:
         """
         Main execution loop using blocking queue.
@@ -159,21 +372,12 @@ class Agent:
             try:
                 # Block until action available (timeout allows halt check)
                 try:
-                    action = self._action_queue.get(timeout=0.5)
+                    action, batch = self._next_item(timeout=0.5)
                 except queue.Empty:
                     continue
+                QUEUE_DEPTH.set(self._action_queue.qsize())
 
-                action_type = action.get("type", "")
-                log.info(f"Executing: {action_type}")
-
-                # Dispatch to skill
-                result = self._dispatcher.dispatch(action)
-                self._log_action(action, result)
-
-                # Check for exit signal
-                if result.get("message") == "EXIT_SIGNAL":
-                    log.info("Exit signal received")
-                    self._running = False
+                if not self._execute(action, batch):
                     break
 
                 self._action_queue.task_done()
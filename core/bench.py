@@ -0,0 +1,458 @@
+"""
+Octopus Benchmark Suite
+=======================
+Times each execution layer on the null input backend so results are
+reproducible on display-less hosts. Every benchmark reports throughput
+and p50/p95/p99 latency; the suite result is a JSON-serializable dict
+so runs can be stored and compared over time.
+
+Author: Octopus Contributors
+License: MIT
+"""
+
+import os
+import sys
+import time
+import json
+import random
+import shutil
+import logging
+import platform
+import tempfile
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Callable, Optional
+
+from core.executor.human_executor import HumanExecutor, BACKEND_ENV_VAR
+from core.executor.null_backend import NullBackend
+from core.dispatcher import Dispatcher
+from core.model_adapter import FileAdapter
+
+log = logging.getLogger("octopus.bench")
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Keep-alive JSON responder; /slow waits 20 ms like a remote API."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        if self.path.startswith("/slow"):
+            time.sleep(0.02)
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+# Realistic LLM outputs: bare JSON, fenced with prose, and a long plan
+LLM_PAYLOADS = [
+    '{"intent": "Open notepad", "actions": [{"type": "keyboard.hotkey", "params": {"keys": ["win", "r"]}}, '
+    '{"type": "keyboard.type", "params": {"text": "notepad"}}, {"type": "keyboard.press", "params": {"key": "enter"}}]}',
+    'Sure! Here is the plan:\n```json\n{"intent": "Write a note", "actions": [{"type": "file.write", '
+    '"params": {"path": "note.txt", "content": "Meeting at 10am\\nBring laptop"}}]}\n```\nLet me know if you need more.',
+    json.dumps({
+        "intent": "Fill a form",
+        "actions": [
+            {"type": "mouse.click", "params": {"x": 100 + i, "y": 200 + i}} if i % 2 == 0
+            else {"type": "keyboard.type", "params": {"text": f"field value {i}"}}
+            for i in range(50)
+        ],
+    }),
+]
+# The long plan cut off mid-action, as when a reply hits max_tokens
+LLM_PAYLOADS.append(LLM_PAYLOADS[2][:len(LLM_PAYLOADS[2]) * 2 // 3])
+
+
+def summarize(samples_ns: List[int]) -> Dict[str, float]:
+    """
+    Reduce latency samples to throughput and percentile statistics.
+
+    Args:
+        samples_ns: Per-operation latencies in nanoseconds
+
+    Returns:
+        Dict with count, throughput (ops/s) and latencies in microseconds
+    """
+    if not samples_ns:
+        return {"count": 0}
+    ordered = sorted(samples_ns)
+    n = len(ordered)
+    total_s = sum(ordered) / 1e9
+
+    def pct(p: float) -> float:
+        # Nearest-rank percentile
+        rank = max(0, min(n - 1, int(round(p / 100.0 * n + 0.5)) - 1))
+        return round(ordered[rank] / 1e3, 3)
+
+    return {
+        "count": n,
+        "throughput_per_s": round(n / total_s, 1) if total_s > 0 else None,
+        "mean_us": round(total_s * 1e6 / n, 3),
+        "p50_us": pct(50),
+        "p95_us": pct(95),
+        "p99_us": pct(99),
+        "max_us": round(ordered[-1] / 1e3, 3),
+    }
+
+
+def time_bulk(fn: Callable[[], Any], iterations: int) -> Dict[str, float]:
+    """
+    Mean cost of fn over a tight loop, for operations too cheap to time
+    individually (per-call timer overhead would dominate).
+    """
+    start = time.perf_counter_ns()
+    for _ in range(iterations):
+        fn()
+    elapsed = time.perf_counter_ns() - start
+    return {
+        "count": iterations,
+        "throughput_per_s": round(iterations / (elapsed / 1e9), 1),
+        "mean_ns": round(elapsed / iterations, 1),
+    }
+
+
+def time_calls(fn: Callable[[], Any], iterations: int, warmup: int = 10) -> Dict[str, float]:
+    """Call fn repeatedly and summarize per-call latency."""
+    for _ in range(min(warmup, iterations)):
+        fn()
+    samples = []
+    clock = time.perf_counter_ns
+    for _ in range(iterations):
+        start = clock()
+        fn()
+        samples.append(clock() - start)
+    return summarize(samples)
+
+
+class BenchmarkSuite:
+    """
+    Runs the layer benchmarks against a temporary workspace.
+
+    The executor uses NullBackend with a zero operation interval so that
+    the numbers reflect Octopus overhead rather than deliberate pacing.
+    """
+
+    LAYERS = ["dispatch", "executor", "llm_parse", "file_adapter", "api", "metrics", "halt", "network", "memo", "codec"]
+
+    def __init__(self, iterations: int = 1000, api_iterations: int = 20,
+                 adapter_samples: int = 10):
+        """
+        Args:
+            iterations: Samples per in-process benchmark
+            api_iterations: Samples for the API round trip (spawns a process each)
+            adapter_samples: Samples for FileAdapter polling latency
+        """
+        self._iterations = iterations
+        self._api_iterations = api_iterations
+        self._adapter_samples = adapter_samples
+        self._workspace = tempfile.mkdtemp(prefix="octopus-bench-")
+        self._executor = HumanExecutor(self._workspace, backend=NullBackend())
+        self._executor.min_interval = 0.0
+        # No memo: layers time the work itself, bench_memo times the memo
+        self._dispatcher = Dispatcher(self._executor, memo_entries=0)
+
+    def close(self) -> None:
+        """Remove the temporary workspace."""
+        shutil.rmtree(self._workspace, ignore_errors=True)
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # Layers
+    # ─────────────────────────────────────────────────────────────────────────
+
+    def bench_dispatch(self) -> Dict[str, Any]:
+        """Dispatcher.dispatch cost on a trivial action, minus the handler itself."""
+        action = {"type": "system.screen_size", "params": {}}
+        skill = self._dispatcher._skills["system"]
+        dispatched = time_calls(lambda: self._dispatcher.dispatch(action), self._iterations)
+        direct = time_calls(skill.screen_size, self._iterations)
+        invalid = time_calls(
+            lambda: self._dispatcher.dispatch({"type": "nosuch.method"}), self._iterations
+        )
+        return {
+            "dispatch": dispatched,
+            "handler_only": direct,
+            "overhead_p50_us": round(dispatched["p50_us"] - direct["p50_us"], 3),
+            "rejected_action": invalid,
+        }
+
+    def bench_executor(self) -> Dict[str, Any]:
+        """Each executor primitive reached through its skill."""
+        ex = self._executor
+        ex.file_write("bench.txt", "x" * 4096)
+        payload = "y" * 4096
+        primitives = {
+            "mouse.move": lambda: ex.mouse_move(100, 100, duration=0),
+            "mouse.drag": lambda: ex.mouse_drag(200, 200, duration=0),
+            "mouse.click": lambda: ex.mouse_click(100, 100),
+            "mouse.scroll": lambda: ex.mouse_scroll(-3),
+            "mouse.position": ex.mouse_position,
+            "keyboard.type": lambda: ex.keyboard_type("hello world", interval=0),
+            "keyboard.press": lambda: ex.keyboard_press("enter"),
+            "keyboard.hotkey": lambda: ex.keyboard_hotkey("ctrl", "c"),
+            "file.write": lambda: ex.file_write("bench_w.txt", payload),
+            "file.read": lambda: ex.file_read("bench.txt"),
+            "file.list": lambda: ex.file_list("."),
+            "file.exists": lambda: ex.file_exists("bench.txt"),
+            "system.sleep": lambda: ex.system_sleep(0),
+        }
+        return {name: time_calls(fn, self._iterations) for name, fn in primitives.items()}
+
+    def bench_llm_parse(self) -> Dict[str, Any]:
+        """LLMEngine._parse_json on representative model replies."""
+        from api.llm_engine import LLMEngine
+
+        engine = LLMEngine()
+        labels = ["plain", "fenced", "large_plan", "truncated"]
+        return {
+            label: dict(time_calls(lambda p=payload: engine._parse_json(p), self._iterations),
+                        payload_bytes=len(payload))
+            for label, payload in zip(labels, LLM_PAYLOADS)
+        }
+
+    def bench_file_adapter(self) -> Dict[str, Any]:
+        """
+        FileAdapter costs: consuming a present instruction file, and the
+        end-to-end pickup latency when the file appears at a random moment.
+        """
+        adapter = FileAdapter(self._workspace)
+        trigger = os.path.join(self._workspace, "instruction.json")
+        batch = json.dumps({"intent": "bench", "actions": [{"type": "system.info", "params": {}}]})
+
+        consume = []
+        for _ in range(self._iterations):
+            with open(trigger, "w", encoding="utf-8") as f:
+                f.write(batch)
+            start = time.perf_counter_ns()
+            adapter.get_actions()
+            consume.append(time.perf_counter_ns() - start)
+
+        pickup = []
+        staging = trigger + ".tmp"
+        for _ in range(self._adapter_samples):
+            written = {}
+
+            def writer():
+                time.sleep(random.uniform(0.0, 0.5))
+                # Atomic appearance: the adapter never sees a half-written file
+                with open(staging, "w", encoding="utf-8") as f:
+                    f.write(batch)
+                written["t"] = time.perf_counter_ns()
+                os.replace(staging, trigger)
+
+            t = threading.Thread(target=writer)
+            t.start()
+            while adapter.get_actions() is None:
+                pass
+            t.join()
+            pickup.append(time.perf_counter_ns() - written["t"])
+
+        return {"consume": summarize(consume), "pickup": summarize(pickup)}
+
+    def bench_api(self) -> Dict[str, Any]:
+        """POST /action round trip through the FastAPI app (in-process client)."""
+        try:
+            from fastapi.testclient import TestClient
+        except ImportError as e:
+            return {"skipped": f"FastAPI test client unavailable: {e}"}
+
+        from api.main import app
+
+        # The API executes actions in a CLI subprocess; it inherits the null backend
+        previous = os.environ.get(BACKEND_ENV_VAR)
+        os.environ[BACKEND_ENV_VAR] = "null"
+        try:
+            client = TestClient(app)
+            action = {"type": "system.screen_size", "params": {}}
+            return {
+                "action": time_calls(lambda: client.post("/action", json=action),
+                                     self._api_iterations, warmup=1),
+                "status": time_calls(lambda: client.get("/status"), self._iterations),
+            }
+        finally:
+            if previous is None:
+                os.environ.pop(BACKEND_ENV_VAR, None)
+            else:
+                os.environ[BACKEND_ENV_VAR] = previous
+
+    def bench_metrics(self) -> Dict[str, Any]:
+        """Per-event recording cost of the metrics primitives (target: < 1 µs)."""
+        from core.metrics import Counter, Gauge, Histogram
+
+        counter = Counter("bench_total", "bench", ("type", "status"))
+        gauge = Gauge("bench_depth", "bench")
+        histogram = Histogram("bench_seconds", "bench", ("type", "status"))
+        iterations = max(self._iterations, 100000)
+        return {
+            "counter_inc": time_bulk(lambda: counter.inc("file.write", "ok"), iterations),
+            "gauge_set": time_bulk(lambda: gauge.set(3), iterations),
+            "histogram_observe": time_bulk(
+                lambda: histogram.observe(0.0042, "file.write", "ok"), iterations),
+            "loop_baseline": time_bulk(lambda: None, iterations),
+        }
+
+    def bench_halt(self) -> Dict[str, Any]:
+        """
+        Emergency-halt latency: time from setting the halt event to a
+        long-running primitive returning (target: tens of milliseconds).
+        """
+        primitives = {
+            "system.sleep": lambda ex: ex.system_sleep(60),
+            "keyboard.type": lambda ex: ex.keyboard_type("z" * 10240, interval=0.01),
+            "keyboard.type_burst": lambda ex: ex.keyboard_type("z" * 10 ** 7, interval=0),
+            "mouse.move": lambda ex: ex.mouse_move(1000, 800, duration=60),
+            "mouse.drag": lambda ex: ex.mouse_drag(1000, 800, duration=60),
+        }
+        results = {}
+        for name, call in primitives.items():
+            samples, statuses = [], set()
+            for _ in range(self._adapter_samples):
+                halt = threading.Event()
+                ex = HumanExecutor(self._workspace, backend=NullBackend(), halt_event=halt)
+                ex.min_interval = 0.0
+                done = {}
+
+                def target():
+                    done["result"] = call(ex)
+                    done["t"] = time.perf_counter_ns()
+
+                t = threading.Thread(target=target)
+                t.start()
+                time.sleep(random.uniform(0.05, 0.15))
+                halted_at = time.perf_counter_ns()
+                halt.set()
+                t.join()
+                samples.append(done["t"] - halted_at)
+                statuses.add(done["result"].get("status"))
+            results[name] = dict(summarize(samples), statuses=sorted(statuses))
+        return results
+
+    def bench_memo(self) -> Dict[str, Any]:
+        """Idempotent reads through a dispatcher with and without the result memo."""
+        memoized = Dispatcher(self._executor)
+        self._executor.file_write("memo.txt", "m" * 16384)
+        actions = {
+            "file.read": {"type": "file.read", "params": {"path": "memo.txt"}},
+            "file.list": {"type": "file.list", "params": {"path": "."}},
+            "system.screen_size": {"type": "system.screen_size", "params": {}},
+        }
+        results = {}
+        for name, action in actions.items():
+            results[name] = {
+                "uncached": time_calls(lambda a=action: self._dispatcher.dispatch(a), self._iterations),
+                "memo": time_calls(lambda a=action: memoized.dispatch(a), self._iterations),
+            }
+        results["stats"] = memoized.memo.snapshot()
+        return results
+
+    def bench_codec(self) -> Dict[str, Any]:
+        """
+        JSON cost of one action's trip through the CLI path: encode for the
+        subprocess argv, decode in `agent run`, encode the result for the
+        action log and the daemon socket. "stdlib" is the json calls this
+        path used before the codec; "codec" is core.codec on its backend.
+        """
+        from core import codec
+
+        action = {"type": "keyboard.type", "params": {"text": "Grüße aus Octopus " * 4}, "timeout": 5}
+        results = {
+            "small_result": {"status": "ok", "message": "Typed 72 characters"},
+            "process_list": {"status": "ok", "message": "Processes listed (200 of 200 matching)",
+                             "processes": [{"pid": i, "name": f"proc{i}.exe", "username": "user",
+                                            "cpu_percent": i * 0.1, "memory_percent": 0.25}
+                                           for i in range(200)]},
+        }
+        report: Dict[str, Any] = {"backend": codec.BACKEND}
+        for label, result in results.items():
+            def stdlib(r=result):
+                json.loads(json.dumps(action))
+                json.dumps(r, ensure_ascii=False, separators=(",", ":"), default=str)
+                json.dumps(r, default=str).encode("utf-8")
+
+            def fast(r=result):
+                codec.loads(codec.dumps(action))
+                codec.dumps(r)
+                codec.dumpb(r)
+
+            report[label] = {"stdlib": time_calls(stdlib, self._iterations),
+                             "codec": time_calls(fast, self._iterations)}
+        return report
+
+    def bench_network(self) -> Dict[str, Any]:
+        """
+        Network skill against a local stub server: a fresh client per call
+        versus the pooled client, and network.batch fan-out versus the same
+        requests one at a time (the stub delays each reply by 20 ms).
+        """
+        try:
+            import httpx
+            from skills import network
+        except ImportError as e:
+            return {"skipped": f"httpx unavailable: {e}"}
+
+        server = _StubHTTPServer(("127.0.0.1", 0), _StubHandler)
+        threading.Thread(target=server.serve_forever, daemon=True, name="bench-http").start()
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        iterations = min(self._iterations, 500)
+        try:
+            def fresh():
+                with httpx.Client(timeout=10.0) as client:
+                    client.get(f"{base}/fast")
+
+            urls = [f"{base}/slow?n={i}" for i in range(32)]
+            return {
+                "fresh_client": time_calls(fresh, iterations),
+                "pooled_client": time_calls(
+                    lambda: network.execute({"method": "GET", "url": f"{base}/fast"}), iterations),
+                "sequential_32x20ms": time_calls(
+                    lambda: [network.execute({"url": u}) for u in urls], 3, warmup=1),
+                "batch_32x20ms": time_calls(
+                    lambda: network.execute({"action": "batch", "requests": urls}), 3, warmup=1),
+                "http2": network.HTTP2,
+            }
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # Runner
+    # ─────────────────────────────────────────────────────────────────────────
+
+    def run(self, layers: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Run the selected layers (all by default).
+
+        Returns:
+            Dict with 'meta' (environment, settings) and 'results' per layer
+        """
+        layers = layers or self.LAYERS
+        results = {}
+        for layer in layers:
+            if layer not in self.LAYERS:
+                results[layer] = {"error": f"Unknown layer. Available: {self.LAYERS}"}
+                continue
+            log.info(f"Benchmarking: {layer}")
+            try:
+                results[layer] = getattr(self, f"bench_{layer}")()
+            except Exception as e:
+                results[layer] = {"error": str(e)}
+
+        return {
+            "meta": {
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "python": sys.version.split(" ")[0],
+                "platform": platform.platform(),
+                "iterations": self._iterations,
+                "api_iterations": self._api_iterations,
+            },
+            "results": results,
+        }
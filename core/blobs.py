@@ -0,0 +1,200 @@
+"""
+Octopus Blob Store
+==================
+Content-addressed storage for large action outputs.
+
+Results are printed by the CLI, returned through the API and written to
+the action log; a multi-megabyte file.read or process.list would be
+re-encoded at every hop. externalize() moves each large result field into
+a blob named by the SHA-256 of its bytes and leaves a small handle:
+
+    {"$blob": "<sha256>", "size": 48213, "type": "text", "preview": "..."}
+
+Identical outputs are stored once. The API serves blobs, with HTTP Range
+support, at /results/{id}.
+
+Author: Octopus Contributors
+License: MIT
+"""
+
+import os
+import re
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Dict, Any, Iterator, Optional
+
+from core import codec
+
+log = logging.getLogger("octopus.blobs")
+
+DEFAULT_THRESHOLD = 4096
+PREVIEW_CHARS = 200
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# Fields that stay inline whatever their size
+INLINE_FIELDS = {"status", "message", "code"}
+_ID = re.compile(r"^[0-9a-f]{64}$")
+
+
+def is_handle(value: Any) -> bool:
+    return isinstance(value, dict) and "$blob" in value
+
+
+class BlobStore:
+    """
+    Directory of immutable blobs named by their SHA-256.
+
+    Blobs live in <root>/<first two hex chars>/<id>. Once the store grows
+    past max_bytes, the least recently written blobs are removed.
+    """
+
+    def __init__(self, root: str, threshold: int = DEFAULT_THRESHOLD,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Args:
+            root: Store directory (created on first write)
+            threshold: Fields whose encoded size exceeds this many bytes are externalized
+            max_bytes: Size at which old blobs are pruned
+        """
+        self.root = root
+        self.threshold = threshold
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def path(self, blob_id: str) -> str:
+        """
+        Raises:
+            ValueError: If blob_id is not a SHA-256 hex digest
+        """
+        if not _ID.match(blob_id or ""):
+            raise ValueError(f"Invalid blob id: {blob_id!r}")
+        return os.path.join(self.root, blob_id[:2], blob_id)
+
+    def put(self, data: bytes) -> str:
+        """Store bytes (no-op if already present) and return their id."""
+        blob_id = hashlib.sha256(data).hexdigest()
+        path = self.path(blob_id)
+        if os.path.exists(path):
+            try:
+                os.utime(path)  # Recently used blobs survive pruning
+            except OSError:
+                pass
+            return blob_id
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+        with self._lock:
+            self._writes += 1
+            check = self._writes % 100 == 0
+        if check:
+            self.prune()
+        return blob_id
+
+    def size(self, blob_id: str) -> Optional[int]:
+        """Blob size in bytes, or None if it does not exist."""
+        try:
+            return os.path.getsize(self.path(blob_id))
+        except OSError:
+            return None
+
+    def read(self, blob_id: str, start: int = 0, end: Optional[int] = None,
+             chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        """
+        Stream bytes [start, end] (inclusive, like HTTP Range) of a blob.
+
+        Raises:
+            FileNotFoundError: If the blob does not exist
+        """
+        with open(self.path(blob_id), "rb") as f:
+            f.seek(start)
+            remaining = None if end is None else end - start + 1
+            while remaining is None or remaining > 0:
+                chunk = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+                if not chunk:
+                    return
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    def externalize(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Copy of result with every large field replaced by a blob handle.
+
+        Strings are stored as UTF-8 text ("type": "text"); lists and dicts
+        as JSON ("type": "json"). Storage errors leave the field inline.
+        """
+        out = None
+        for key, value in result.items():
+            if key in INLINE_FIELDS or is_handle(value):
+                continue
+            if isinstance(value, str):
+                # Cheap pre-check: UTF-8 never takes fewer bytes than characters
+                if len(value) * 4 <= self.threshold:
+                    continue
+                data, kind = value.encode("utf-8"), "text"
+            elif isinstance(value, (list, dict)) and value:
+                data = codec.dumpb(value)
+                kind = "json"
+            else:
+                continue
+            if len(data) <= self.threshold:
+                continue
+            try:
+                blob_id = self.put(data)
+            except OSError as e:
+                log.warning(f"Keeping '{key}' inline, blob store failed: {e}")
+                continue
+            if out is None:
+                out = dict(result)
+            out[key] = {
+                "$blob": blob_id,
+                "size": len(data),
+                "type": kind,
+                "preview": data[:PREVIEW_CHARS * 4].decode("utf-8", "ignore")[:PREVIEW_CHARS],
+            }
+        return result if out is None else out
+
+    def prune(self) -> int:
+        """Remove the oldest blobs until the store fits max_bytes. Returns blobs removed."""
+        blobs = []
+        total = 0
+        for dirpath, _, names in os.walk(self.root):
+            for name in names:
+                if _ID.match(name):
+                    path = os.path.join(dirpath, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    blobs.append((st.st_mtime, st.st_size, path))
+                    total += st.st_size
+        removed = 0
+        for _, size, path in sorted(blobs):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                removed += 1
+            except OSError:
+                pass
+        if removed:
+            log.info(f"Pruned {removed} blobs from {self.root}")
+        return removed
+
+
+def blob_dir(config: Dict[str, Any]) -> str:
+    """Store location for a config: 'blob_dir', else blobs/ next to the log file."""
+    return config.get("blob_dir") or os.path.join(
+        os.path.dirname(config.get("log_file", "logs/actions.log")), "blobs")
@@ -0,0 +1,107 @@
+"""
+Octopus Clock
+=============
+Injectable time source for the agent, adapters and executor.
+
+SystemClock is the default and uses real time. VirtualClock keeps simulated
+time: sleeps and timed waits advance it instantly instead of blocking, so
+test and replay runs skip wall-clock waiting. Paired with
+Agent.run_until_idle() (single-threaded), event order is deterministic.
+
+Author: Octopus Contributors
+License: MIT
+"""
+
+import time
+import threading
+from abc import ABC, abstractmethod
+
+
+class Clock(ABC):
+    """Time source interface."""
+
+    @abstractmethod
+    def time(self) -> float:
+        """Wall-clock time in epoch seconds."""
+
+    @abstractmethod
+    def monotonic(self) -> float:
+        """Monotonic seconds for measuring intervals."""
+
+    @abstractmethod
+    def sleep(self, seconds: float) -> None:
+        """Pause for `seconds`."""
+
+    @abstractmethod
+    def wait(self, event: threading.Event, timeout: float) -> bool:
+        """
+        Wait until `event` is set or `timeout` elapses.
+
+        Returns:
+            True if the event is set
+        """
+
+
+class SystemClock(Clock):
+    """Real time."""
+
+    def time(self) -> float:
+        return time.time()
+
+    def monotonic(self) -> float:
+        # perf_counter: monotonic and high resolution on every platform
+        return time.perf_counter()
+
+    def sleep(self, seconds: float) -> None:
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def wait(self, event: threading.Event, timeout: float) -> bool:
+        return event.wait(timeout)
+
+
+class VirtualClock(Clock):
+    """
+    Simulated time advanced by sleeps and waits.
+
+    Attributes:
+        slept: Total simulated seconds spent in sleep()/wait()
+    """
+
+    def __init__(self, start: float = 1_700_000_000.0):
+        """
+        Args:
+            start: Initial epoch time (fixed default keeps runs reproducible)
+        """
+        self._start = start
+        self._now = start
+        self._lock = threading.Lock()
+        self.slept = 0.0
+
+    def time(self) -> float:
+        return self._now
+
+    def monotonic(self) -> float:
+        return self._now - self._start
+
+    def advance(self, seconds: float) -> None:
+        """Move simulated time forward."""
+        if seconds <= 0:
+            return
+        with self._lock:
+            self._now += seconds
+            self.slept += seconds
+
+    def sleep(self, seconds: float) -> None:
+        self.advance(float(seconds))
+        # Let other threads run, as a real sleep would
+        time.sleep(0)
+
+    def wait(self, event: threading.Event, timeout: float) -> bool:
+        if event.is_set():
+            return True
+        self.sleep(timeout)
+        return event.is_set()
+
+
+SYSTEM_CLOCK = SystemClock()
@@ -0,0 +1,193 @@
+"""
+Octopus JSON Codec
+==================
+One place to encode and decode JSON.
+
+Every action is encoded and decoded several times on its way through the
+system (API -> CLI argv -> dispatcher -> action log -> API response), so
+the codec uses orjson when it is installed and falls back to the standard
+library otherwise. Both backends produce compact UTF-8 output and encode
+unknown objects with str(). Set OCTOPUS_JSON_BACKEND=json to force the
+standard library.
+
+parse_lenient() is the tolerant reader for LLM replies: it strips Markdown
+fences and surrounding prose, drops trailing commas, and repairs replies
+cut off mid-stream by closing them after their last complete element.
+
+Author: Octopus Contributors
+License: MIT
+"""
+
+import os
+import re
+import json
+import logging
+from typing import Any, List, Optional, Tuple, Union
+
+log = logging.getLogger("octopus.codec")
+
+BACKEND_ENV_VAR = "OCTOPUS_JSON_BACKEND"
+
+# orjson.JSONDecodeError subclasses this, so one except clause covers both
+DecodeError = json.JSONDecodeError
+
+try:
+    if os.environ.get(BACKEND_ENV_VAR, "").lower() == "json":
+        raise ImportError(f"disabled by {BACKEND_ENV_VAR}")
+    import orjson
+    BACKEND = "orjson"
+except ImportError:
+    orjson = None
+    BACKEND = "json"
+
+# A Markdown code fence: opening and closing ``` at the start of a line
+_FENCE = re.compile(r"^[ \t]*```[\w+-]*[ \t]*\n(.*?)(?:^[ \t]*```|\Z)", re.DOTALL | re.MULTILINE)
+_CLOSERS = {"{": "}", "[": "]"}
+# Strings (possibly unterminated) and structural characters
+_TOKEN = re.compile(r'("[^"\\]*(?:\\.[^"\\]*)*"?|[{}\[\],])', re.DOTALL)
+# Repair attempts before giving up on a reply
+MAX_REPAIR_CANDIDATES = 32
+
+
+def _options(indent: bool, sort_keys: bool) -> int:
+    opts = orjson.OPT_NON_STR_KEYS
+    if indent:
+        opts |= orjson.OPT_INDENT_2
+    if sort_keys:
+        opts |= orjson.OPT_SORT_KEYS
+    return opts
+
+
+def _stdlib_dumps(obj: Any, indent: bool, sort_keys: bool) -> str:
+    return json.dumps(obj, ensure_ascii=False, default=str, sort_keys=sort_keys,
+                      indent=2 if indent else None,
+                      separators=None if indent else (",", ":"))
+
+
+def dumpb(obj: Any, indent: bool = False, sort_keys: bool = False) -> bytes:
+    """Encode to UTF-8 JSON bytes."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=str, option=_options(indent, sort_keys))
+        except orjson.JSONEncodeError:
+            # Integers beyond 64 bits, mixed-type keys with sort_keys, ...
+            pass
+    return _stdlib_dumps(obj, indent, sort_keys).encode("utf-8")
+
+
+def dumps(obj: Any, indent: bool = False, sort_keys: bool = False) -> str:
+    """Encode to a JSON string (non-ASCII characters are kept as is)."""
+    if orjson is not None:
+        return dumpb(obj, indent, sort_keys).decode("utf-8")
+    return _stdlib_dumps(obj, indent, sort_keys)
+
+
+def loads(data: Union[str, bytes, bytearray]) -> Any:
+    """
+    Decode JSON text or UTF-8 bytes.
+
+    Raises:
+        DecodeError: If data is not valid JSON
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Tolerant parsing
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _scan(text: str) -> Tuple[List[str], List[Tuple[int, str]], bool]:
+    """
+    Walk one JSON value starting at text[0], dropping trailing commas.
+
+    Returns the cleaned text as chunks, the cut points (chunk count and
+    brackets open there) before which everything is complete, and whether
+    the value closed. A cut point is only recorded when no object inside an
+    array is open, so a repair never keeps half of an action.
+    """
+    # Alternating filler (numbers, literals, ':', whitespace) and tokens
+    chunks = _TOKEN.split(text)
+    cuts: List[Tuple[int, str]] = []
+    stack = ""
+    for i in range(1, len(chunks), 2):
+        token = chunks[i]
+        if token[0] == '"':
+            continue
+        if token == ",":
+            if "[{" not in stack:
+                cuts.append((i, stack))
+            continue
+        if token in "{[":
+            stack += token
+        else:
+            if not stack or _CLOSERS[stack[-1]] != token:
+                return chunks[:i], cuts, False
+            j = i - 1
+            while j > 0 and chunks[j].strip() in ("", ","):
+                chunks[j] = ""
+                j -= 1
+            stack = stack[:-1]
+            if not stack:
+                return chunks[:i + 1], cuts, True
+        if "[{" not in stack:
+            cuts.append((i + 1, stack))
+    return chunks, cuts, False
+
+
+def _json_start(text: str) -> Optional[int]:
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    return min(starts) if starts else None
+
+
+def _first_value(text: str) -> Any:
+    """Decode text, or else the first JSON value in it (prose around it is ignored)."""
+    try:
+        return loads(text)
+    except DecodeError as e:
+        start = _json_start(text)
+        if start is None:
+            raise e
+    return json.JSONDecoder().raw_decode(text, start)[0]
+
+
+def parse_lenient(text: str) -> Tuple[Any, bool]:
+    """
+    Parse the JSON object or array in an LLM reply.
+
+    Returns:
+        (value, repaired): repaired is True if the reply was not valid JSON
+        as is and had to be fixed up (trailing commas, truncation)
+
+    Raises:
+        DecodeError: If no JSON value can be recovered
+    """
+    # The reply as is first: its strings may well contain ``` themselves
+    body = text.strip()
+    try:
+        return _first_value(body), False
+    except DecodeError as e:
+        error = e
+    match = _FENCE.search(text)
+    if match:
+        body = match.group(1).strip()
+        try:
+            return _first_value(body), False
+        except DecodeError as e:
+            error = e
+
+    start = _json_start(body)
+    if start is None:
+        raise DecodeError("No JSON object in reply", body, 0)
+    chunks, cuts, closed = _scan(body[start:])
+    ends = ([(len(chunks), "")] if closed else []) + cuts[::-1][:MAX_REPAIR_CANDIDATES]
+    for count, stack in ends:
+        candidate = "".join(chunks[:count]) + "".join(_CLOSERS[c] for c in reversed(stack))
+        try:
+            value = loads(candidate)
+        except DecodeError:
+            continue
+        log.debug(f"Repaired malformed JSON ({len(body)} chars -> {len(candidate)})")
+        return value, True
+    raise error
@@ -0,0 +1,311 @@
+"""
+Octopus Daemon
+==============
+Long-running action server that keeps a warm HumanExecutor and Dispatcher.
+Clients forward actions over a local socket as newline-delimited JSON and
+receive one JSON result line per request.
+
+Protocol (one JSON object per line):
+    {"op": "auth", "token": "..."}      first line of every connection
+    {"op": "dispatch", "action": {"type": "...", "params": {...}}}
+    {"op": "ping"}
+    {"op": "shutdown"}
+
+The token is generated at startup and written to a file only the current
+user can read (token_path()). Connections that do not open with it are
+closed, so other local users, and browsers POSTing to the loopback TCP
+port, cannot dispatch actions.
+
+Author: Octopus Contributors
+License: MIT
+"""
+
+import os
+import hmac
+import socket
+import secrets
+import logging
+import threading
+import socketserver
+from typing import Dict, Any, Optional, Tuple, Union
+
+from core.executor.human_executor import HumanExecutor
+from core.dispatcher import Dispatcher
+from core import codec
+
+log = logging.getLogger("octopus.daemon")
+
+# Unix sockets are preferred; hosts without AF_UNIX fall back to loopback TCP
+HAS_UNIX_SOCKETS = hasattr(socket, "AF_UNIX") and hasattr(socketserver, "ThreadingUnixStreamServer")
+DEFAULT_SOCKET_PATH = os.path.join("run", "octopus.sock")
+DEFAULT_TCP_PORT = 47800
+
+Address = Union[str, Tuple[str, int]]
+
+
+def token_path(address: Address) -> str:
+    """Token file for a daemon: next to its Unix socket, else in ~/.octopus."""
+    if isinstance(address, str):
+        return address + ".token"
+    return os.path.join(os.path.expanduser("~"), ".octopus", f"daemon-{address[1]}.token")
+
+
+def _write_token(path: str, token: str) -> None:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+    if os.path.exists(path):
+        os.remove(path)
+    # Created user-only from the start (on Windows the profile directory ACL applies)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "w") as f:
+        f.write(token)
+
+
+def read_token(address: Address) -> str:
+    """Raises OSError if the daemon's token file is missing or unreadable."""
+    with open(token_path(address), "r") as f:
+        return f.read().strip()
+
+
+def resolve_address(config: Dict[str, Any], project_root: str) -> Address:
+    """
+    Determine the daemon endpoint from configuration.
+
+    Args:
+        config: Loaded configuration dictionary
+        project_root: Directory relative socket paths are resolved against
+
+    Returns:
+        Socket path (Unix) or (host, port) tuple (TCP fallback)
+    """
+    if HAS_UNIX_SOCKETS:
+        path = config.get("daemon_socket", DEFAULT_SOCKET_PATH)
+        return os.path.abspath(os.path.join(project_root, path))
+    return ("127.0.0.1", int(config.get("daemon_port", DEFAULT_TCP_PORT)))
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Serves one client connection; handles requests until EOF."""
+
+    def handle(self) -> None:
+        daemon: "ActionDaemon" = self.server.daemon_ref
+        if not self._authenticate(daemon):
+            return
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = codec.loads(line)
+            except codec.DecodeError as e:
+                request = None
+                reply = {"status": "error", "message": f"Invalid JSON: {e}"}
+            else:
+                reply = daemon.handle_request(request)
+
+            self.wfile.write(codec.dumpb(reply) + b"\n")
+            self.wfile.flush()
+
+            if isinstance(request, dict) and request.get("op") == "shutdown":
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+                return
+
+    def _authenticate(self, daemon: "ActionDaemon") -> bool:
+        """The first line must carry the daemon token; anything else closes the connection."""
+        line = self.rfile.readline(4096)
+        try:
+            request = codec.loads(line)
+        except codec.DecodeError:
+            request = None
+        token = request.get("token") if isinstance(request, dict) and request.get("op") == "auth" else None
+        ok = isinstance(token, str) and hmac.compare_digest(token, daemon.token)
+        reply = {"status": "ok", "message": "authenticated"} if ok else \
+            {"status": "error", "message": "Authentication required"}
+        self.wfile.write(codec.dumpb(reply) + b"\n")
+        self.wfile.flush()
+        if not ok:
+            log.warning(f"Rejected unauthenticated daemon connection from {self.client_address or 'local socket'}")
+        return ok
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    # Rebind right after a restart despite connections in TIME_WAIT
+    allow_reuse_address = True
+
+
+class ActionDaemon:
+    """
+    Socket server that executes actions against a persistent Dispatcher.
+
+    Connections are served concurrently, but dispatch is serialized with a
+    lock so that input-device actions from different clients never interleave.
+    """
+
+    def __init__(self, workspace: str, address: Address,
+                 timeouts: Optional[Dict[str, float]] = None):
+        """
+        Initialize daemon with a warm executor.
+
+        Args:
+            workspace: Path to workspace directory
+            address: Socket path or (host, port) tuple from resolve_address()
+            timeouts: Dispatcher time budgets (see Dispatcher)
+        """
+        self._address = address
+        self._executor = HumanExecutor(workspace)
+        self._dispatcher = Dispatcher(self._executor, timeouts)
+        self._dispatch_lock = threading.Lock()
+        self._server: Optional[socketserver.BaseServer] = None
+        self.token = secrets.token_hex(32)
+
+    def handle_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Execute a single protocol request.
+
+        Args:
+            request: Decoded request object
+
+        Returns:
+            Reply dictionary (always contains 'status')
+        """
+        if not isinstance(request, dict):
+            return {"status": "error", "message": "Request must be a JSON object"}
+
+        op = request.get("op", "dispatch")
+        if op == "auth":
+            return {"status": "ok", "message": "already authenticated"}
+        if op == "ping":
+            return {"status": "ok", "message": "pong", "pid": os.getpid()}
+        if op == "shutdown":
+            return {"status": "ok", "message": "Daemon shutting down"}
+        if op != "dispatch":
+            return {"status": "error", "message": f"Unknown op: '{op}'"}
+
+        with self._dispatch_lock:
+            return self._dispatcher.dispatch(request.get("action"))
+
+    def _create_server(self) -> socketserver.BaseServer:
+        if isinstance(self._address, str):
+            run_dir = os.path.dirname(self._address)
+            if run_dir:
+                os.makedirs(run_dir, exist_ok=True)
+            if os.path.exists(self._address):
+                # Stale socket from a crashed daemon
+                os.remove(self._address)
+            server = socketserver.ThreadingUnixStreamServer(self._address, _RequestHandler)
+            os.chmod(self._address, 0o600)
+        else:
+            server = _TCPServer(self._address, _RequestHandler)
+        server.daemon_threads = True
+        server.daemon_ref = self
+        return server
+
+    def serve_forever(self) -> None:
+        """Bind the socket and serve until shutdown is requested."""
+        self._server = self._create_server()
+        try:
+            # Written once bound, so a failed start leaves no token behind
+            _write_token(token_path(self._address), self.token)
+            log.info(f"Daemon listening on {self._address}")
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            for path in (self._address, token_path(self._address)):
+                if isinstance(path, str) and os.path.exists(path):
+                    os.remove(path)
+            log.info("Daemon stopped")
+
+
+class DaemonClient:
+    """
+    Thin client for ActionDaemon.
+
+    Keeps one connection open so that consecutive requests pay only the
+    socket round trip.
+    """
+
+    def __init__(self, address: Address, timeout: Optional[float] = None):
+        """
+        Args:
+            address: Socket path or (host, port) tuple from resolve_address()
+            timeout: Socket timeout in seconds (None blocks indefinitely)
+        """
+        self._address = address
+        self._timeout = timeout
+        self._sock: Optional[socket.socket] = None
+        self._reader = None
+
+    def connect(self) -> "DaemonClient":
+        """
+        Open and authenticate the connection.
+
+        Raises:
+            OSError: If the daemon is not running or its token is unreadable
+            ConnectionError: If the daemon rejects the token
+        """
+        token = read_token(self._address)
+        family = socket.AF_UNIX if isinstance(self._address, str) else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.settimeout(self._timeout)
+        try:
+            sock.connect(self._address)
+        except OSError:
+            sock.close()
+            raise
+        self._sock = sock
+        self._reader = sock.makefile("rb")
+        try:
+            reply = self.request({"op": "auth", "token": token})
+        except (OSError, ValueError):
+            self.close()
+            raise
+        if reply.get("status") != "ok":
+            self.close()
+            raise ConnectionError(f"Daemon rejected the connection: {reply.get('message')}")
+        return self
+
+    def close(self) -> None:
+        """Close the connection."""
+        if self._reader:
+            self._reader.close()
+            self._reader = None
+        if self._sock:
+            self._sock.close()
+            self._sock = None
+
+    def __enter__(self) -> "DaemonClient":
+        return self.connect() if self._sock is None else self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def request(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Send one request and wait for its reply."""
+        if self._sock is None:
+            self.connect()
+        self._sock.sendall(codec.dumpb(payload) + b"\n")
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("Daemon closed the connection")
+        return codec.loads(line)
+
+    def dispatch(self, action: Dict[str, Any]) -> Dict[str, Any]:
+        """Execute an action on the daemon."""
+        return self.request({"op": "dispatch", "action": action})
+
+    def ping(self) -> Dict[str, Any]:
+        """Check daemon liveness."""
+        return self.request({"op": "ping"})
+
+    def shutdown(self) -> Dict[str, Any]:
+        """Ask the daemon to stop."""
+        return self.request({"op": "shutdown"})
+
+
+def is_daemon_running(address: Address) -> bool:
+    """Return True if a daemon answers ping at the given address."""
+    try:
+        with DaemonClient(address, timeout=1.0) as client:
+            return client.ping().get("status") == "ok"
+    except (OSError, ValueError):
+        return False
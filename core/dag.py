@@ -0,0 +1,205 @@
+"""
+Octopus DAG Executor
+====================
+Runs a batch whose actions declare dependencies ("id" / "depends_on") as a
+graph: independent actions execute concurrently on a bounded thread pool,
+so batch latency approaches the critical path instead of the sum of all
+actions.
+
+Actions that drive the shared input devices (mouse, keyboard, clipboard)
+never overlap each other; everything else (network, files, processes) runs
+in parallel. A failed action marks everything that depends on it as
+'skipped'.
+
+Author: Octopus Contributors
+License: MIT
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Any, Callable, List, Optional, Set
+
+log = logging.getLogger("octopus.dag")
+
+DEFAULT_MAX_WORKERS = 4
+# Skills that share one physical device and must run one at a time
+EXCLUSIVE_SKILLS = {"mouse", "keyboard", "clipboard"}
+
+
+class DagError(ValueError):
+    """Raised for unknown dependencies or cycles."""
+
+
+def is_exclusive(action: Dict[str, Any]) -> bool:
+    """True if the action uses a shared input device."""
+    return str(action.get("type", "")).split(".", 1)[0] in EXCLUSIVE_SKILLS
+
+
+def build_graph(nodes: List[Dict[str, Any]], implicit: Optional[List[Set[str]]] = None) -> List[Set[int]]:
+    """
+    Resolve dependencies to node indices and reject cycles.
+
+    Args:
+        nodes: Actions with optional "id" and "depends_on" (id or list of ids)
+        implicit: Per node, extra ids it depends on (e.g. from references);
+            ids that are not nodes of this graph are ignored
+
+    Returns:
+        For each node, the set of node indices it depends on
+
+    Raises:
+        DagError: On duplicate ids, unknown dependencies or cycles
+    """
+    index: Dict[str, int] = {}
+    for i, node in enumerate(nodes):
+        node_id = node.get("id")
+        if node_id is not None:
+            if node_id in index:
+                raise DagError(f"actions[{i}]: duplicate id '{node_id}'")
+            index[node_id] = i
+
+    deps: List[Set[int]] = []
+    for i, node in enumerate(nodes):
+        wanted = node.get("depends_on", [])
+        if isinstance(wanted, str):
+            wanted = [wanted]
+        if not isinstance(wanted, list):
+            raise DagError(f"actions[{i}]: 'depends_on' must be an id or a list of ids")
+        edges = set()
+        for dep in wanted:
+            if dep not in index:
+                raise DagError(f"actions[{i}]: depends on unknown id '{dep}'")
+            edges.add(index[dep])
+        if implicit:
+            edges |= {index[name] for name in implicit[i] if name in index}
+        if i in edges:
+            raise DagError(f"actions[{i}]: depends on itself")
+        deps.append(edges)
+
+    # Kahn's algorithm: anything left over sits on a cycle
+    indegree = [len(d) for d in deps]
+    dependents: List[List[int]] = [[] for _ in nodes]
+    for i, d in enumerate(deps):
+        for j in d:
+            dependents[j].append(i)
+    ready = [i for i, n in enumerate(indegree) if n == 0]
+    seen = 0
+    while ready:
+        i = ready.pop()
+        seen += 1
+        for k in dependents[i]:
+            indegree[k] -= 1
+            if indegree[k] == 0:
+                ready.append(k)
+    if seen != len(nodes):
+        cyclic = [nodes[i].get("id", f"#{i}") for i, n in enumerate(indegree) if n > 0]
+        raise DagError(f"actions: dependency cycle among {cyclic}")
+    return deps
+
+
+class DagExecutor:
+    """
+    Executes dependency graphs of actions on a thread pool.
+    """
+
+    def __init__(self, dispatch: Callable[[Dict[str, Any]], Dict[str, Any]],
+                 max_workers: int = DEFAULT_MAX_WORKERS,
+                 should_stop: Optional[Callable[[], bool]] = None):
+        """
+        Args:
+            dispatch: Executes one action (called from worker threads)
+            max_workers: Actions running at the same time
+            should_stop: Polled before starting each action; True skips the rest
+        """
+        self._dispatch = dispatch
+        self.max_workers = max(1, int(max_workers))
+        self._should_stop = should_stop
+        self._device_lock = threading.Lock()
+
+    def _call(self, action: Dict[str, Any]) -> Dict[str, Any]:
+        if is_exclusive(action):
+            with self._device_lock:
+                return self._dispatch(action)
+        return self._dispatch(action)
+
+    def run(self, nodes: List[Dict[str, Any]], deps: List[Set[int]],
+            prepare: Optional[Callable[[int, List[Optional[Dict[str, Any]]]], Dict[str, Any]]] = None
+            ) -> List[Dict[str, Any]]:
+        """
+        Execute the graph.
+
+        Args:
+            nodes: Actions
+            deps: Output of build_graph(nodes)
+            prepare: Builds the action to dispatch for node i from the results
+                so far (e.g. to resolve references); defaults to the node as is.
+                May raise ValueError to fail the node.
+
+        Returns:
+            Results in node order
+        """
+        n = len(nodes)
+        log.debug(f"Running graph of {n} actions on {self.max_workers} workers")
+        results: List[Optional[Dict[str, Any]]] = [None] * n
+        remaining = [len(d) for d in deps]
+        dependents: List[List[int]] = [[] for _ in range(n)]
+        for i, d in enumerate(deps):
+            for j in d:
+                dependents[j].append(i)
+
+        def task(i: int) -> Dict[str, Any]:
+            try:
+                action = prepare(i, results) if prepare else nodes[i]
+            except ValueError as e:
+                return {"status": "error", "message": str(e)}
+            return self._call(action)
+
+        def skip(i: int, reason: str) -> None:
+            # Mark i and everything downstream of it
+            stack = [(i, reason)]
+            while stack:
+                k, why = stack.pop()
+                if results[k] is not None:
+                    continue
+                results[k] = {"status": "skipped", "message": why}
+                label = nodes[k].get("id", f"#{k}")
+                stack.extend((m, f"Dependency '{label}' did not run") for m in dependents[k])
+
+        ready = [i for i in range(n) if remaining[i] == 0]
+        running: Dict[Any, int] = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="dag") as pool:
+            while ready or running:
+                while ready:
+                    i = ready.pop(0)
+                    if results[i] is not None:
+                        continue
+                    if self._should_stop and self._should_stop():
+                        skip(i, "Halted before start")
+                        continue
+                    running[pool.submit(task, i)] = i
+
+                if not running:
+                    break
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    i = running.pop(future)
+                    try:
+                        results[i] = future.result()
+                    except Exception as e:
+                        results[i] = {"status": "error", "message": f"Execution error: {e}"}
+                    failed = results[i].get("status") != "ok"
+                    label = nodes[i].get("id", f"#{i}")
+                    for k in dependents[i]:
+                        if failed:
+                            skip(k, f"Dependency '{label}' failed: {results[i].get('message', '')}")
+                            continue
+                        remaining[k] -= 1
+                        if remaining[k] == 0:
+                            ready.append(k)
+
+        # Nodes never reached (e.g. after a halt)
+        for i in range(n):
+            if results[i] is None:
+                results[i] = {"status": "skipped", "message": "Not started"}
+        return results
@@ -4,20 +4,54 @@ Octopus Action Dispatcher
 Routes incoming JSON actions to appropriate Skill handlers.
 Validates action structure and parameters before dispatch.
 
+Handlers with a time budget run under a Watchdog: an action may carry
+"timeout" (seconds), otherwise per-type and per-skill budgets apply
+(DEFAULT_TIMEOUTS covers skills that wait on the outside world). An overrun
+returns status 'timeout' and the hung handler is abandoned. Mouse, keyboard
+and system actions always run inline: an abandoned handler would keep
+moving the mouse or typing while the next action runs, so they take no
+budget (the emergency halt stops them instead).
+
+Idempotent reads are answered from a ResultMemo (core.memo) when their
+inputs are unchanged; writes through the same dispatcher invalidate it.
+
 Author: Octopus Contributors
 License: MIT
 """
 
+import time
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 from skills.mouse import MouseSkill
 from skills.keyboard import KeyboardSkill
 from skills.file import FileSkill
 from skills.system import SystemSkill
+from skills.module_skill import ModuleSkill, MODULE_SKILLS
+from core.metrics import ACTIONS_TOTAL, ACTION_LATENCY, ACTION_TIMEOUTS, ABANDONED_HANDLERS
+from core.tracing import TRACER
+from core.watchdog import Watchdog, WatchdogTimeout
+from core.memo import ResultMemo, DEFAULT_MAX_ENTRIES
 
 log = logging.getLogger("octopus.dispatcher")
 
+# Seconds per skill (or 'skill.method'); skills not listed run inline without a budget
+DEFAULT_TIMEOUTS: Dict[str, float] = {
+    "network": 30.0,
+    # Large files legitimately take long; stalls still hit the read timeout
+    "network.download": 0.0,
+    "process": 15.0,
+    "hardware": 10.0,
+    "clipboard": 5.0,
+}
+
+# Skills driven by HumanExecutor primitives, which only stop on halt_event
+INLINE_SKILLS = {"mouse", "keyboard", "system"}
+
+# Shared by all dispatchers so abandoned handlers are counted once per process
+_WATCHDOG = Watchdog()
+ABANDONED_HANDLERS.set_function(lambda: _WATCHDOG.abandoned)
+
 
 class Dispatcher:
     """
@@ -30,19 +64,59 @@ class Dispatcher:
     and invokes the appropriate method with provided parameters.
     """
 
-    def __init__(self, executor):
+    def __init__(self, executor, timeouts: Optional[Dict[str, float]] = None,
+                 memo_entries: int = DEFAULT_MAX_ENTRIES):
         """
         Initialize dispatcher with executor instance.
         
         Args:
             executor: HumanExecutor instance for skill operations
+            timeouts: Budgets in seconds keyed by skill or 'skill.method',
+                merged over DEFAULT_TIMEOUTS (0 disables a default)
+            memo_entries: Size of the idempotent-result memo (0 disables it)
         """
+        self.memo = ResultMemo(executor, memo_entries) if memo_entries else None
         self._skills = {
             "mouse": MouseSkill(executor),
             "keyboard": KeyboardSkill(executor),
             "file": FileSkill(executor),
             "system": SystemSkill(executor),
         }
+        for name, methods in MODULE_SKILLS.items():
+            self._skills[name] = ModuleSkill(name, methods, executor)
+        self._timeouts = dict(DEFAULT_TIMEOUTS, **(timeouts or {}))
+        for key in [k for k in self._timeouts if k.split(".", 1)[0] in INLINE_SKILLS]:
+            log.warning(f"Ignoring action timeout for '{key}': {key.split('.', 1)[0]} actions run inline")
+            del self._timeouts[key]
+
+    def timeout_for(self, action: Dict[str, Any]) -> Optional[float]:
+        """
+        Time budget for an action: its own 'timeout', else the budget for its
+        type, else for its skill. None means no limit.
+
+        Raises:
+            ValueError: If the action's 'timeout' is not a positive number,
+                or is set on a mouse, keyboard or system action
+        """
+        skill = str(action.get("type", "")).split(".", 1)[0]
+        if skill in INLINE_SKILLS:
+            if "timeout" in action:
+                raise ValueError(f"'timeout' is not supported for {skill} actions "
+                                 f"(they cannot be abandoned safely)")
+            return None
+        if "timeout" in action:
+            try:
+                timeout = float(action["timeout"])
+            except (TypeError, ValueError):
+                raise ValueError(f"Invalid timeout: {action['timeout']!r}")
+            if timeout <= 0:
+                raise ValueError(f"Timeout must be positive, got {timeout}")
+            return timeout
+        action_type = action.get("type", "")
+        timeout = self._timeouts.get(action_type)
+        if timeout is None:
+            timeout = self._timeouts.get(action_type.split(".", 1)[0])
+        return timeout or None
 
     def get_available_skills(self) -> list:
         """Return list of registered skill names."""
@@ -58,6 +132,26 @@ class Dispatcher:
         Returns:
             Result dictionary with 'status' and 'message'
         """
+        started = time.perf_counter()
+        if TRACER.enabled:
+            with TRACER.span("dispatch", type=str(action.get("type")) if isinstance(action, dict) else "") as sp:
+                result = self._dispatch(action)
+                sp.set("status", result.get("status"))
+        else:
+            result = self._dispatch(action)
+        elapsed = time.perf_counter() - started
+
+        # Unroutable types share one label to keep metric cardinality bounded
+        action_type = action.get("type", "") if isinstance(action, dict) else ""
+        if action_type.split(".", 1)[0] not in self._skills:
+            action_type = "invalid"
+        status = result.get("status", "unknown")
+        ACTIONS_TOTAL.inc(action_type, status)
+        ACTION_LATENCY.observe(elapsed, action_type, status)
+        return result
+
+    def _dispatch(self, action: Dict[str, Any]) -> Dict[str, Any]:
+        """Validate, route and execute an action."""
         # Validate action structure
         if not isinstance(action, dict):
             return {"status": "error", "message": "Action must be a dictionary"}
@@ -97,12 +191,38 @@ class Dispatcher:
 
         handler = getattr(skill, method_name)
 
+        try:
+            timeout = self.timeout_for(action)
+        except ValueError as e:
+            return {"status": "error", "message": str(e)}
+
+        memo = self.memo if isinstance(params, dict) and ResultMemo.handles(action_type) else None
+        if memo:
+            cached = memo.get(action_type, params)
+            if cached is not None:
+                log.info(f"Dispatched: {action_type} -> {cached.get('status')} (memo)")
+                return cached
+            validator = memo.validator(action_type, params)
+
         # Execute
         try:
-            result = handler(**params)
+            if timeout is None:
+                result = handler(**params)
+            else:
+                result = _WATCHDOG.run(lambda: handler(**params), timeout)
             log.info(f"Dispatched: {action_type} -> {result.get('status')}")
+            if memo:
+                memo.put(action_type, params, result, validator)
             return result
+        except WatchdogTimeout:
+            ACTION_TIMEOUTS.inc(action_type)
+            log.warning(f"Timeout: {action_type} exceeded {timeout}s; handler abandoned")
+            return {"status": "timeout", "message": f"{action_type} exceeded {timeout}s time budget"}
         except TypeError as e:
             return {"status": "error", "message": f"Parameter error: {e}"}
         except Exception as e:
             return {"status": "error", "message": f"Execution error: {e}"}
+        finally:
+            # A failed or abandoned write may still have changed the file
+            if memo:
+                memo.invalidate(action_type, params)
@@ -1,12 +1,14 @@
 """
 Octopus Executor Package
 ========================
-Provides the HumanExecutor for low-level I/O operations.
+Provides the HumanExecutor for low-level I/O operations
+and the NullBackend for display-less execution.
 
 Author: Octopus Contributors
 License: MIT
 """
 
 from core.executor.human_executor import HumanExecutor
+from core.executor.null_backend import NullBackend
 
-__all__ = ["HumanExecutor"]
+__all__ = ["HumanExecutor", "NullBackend"]
@@ -12,17 +12,45 @@ License: MIT
 """
 
 import os
-import time
 import logging
-import pyautogui
-from typing import Dict, Any
+import threading
+from typing import Dict, Any, Optional
 
-# Safety configuration
-pyautogui.FAILSAFE = True
-pyautogui.PAUSE = 0.1
+from core.executor.null_backend import NullBackend
+from core.clock import Clock, SYSTEM_CLOCK
+from core.tracing import span
 
 log = logging.getLogger("octopus.executor")
 
+# Selects the input backend when none is passed explicitly ('pyautogui' or 'null').
+# Environment-based so that subprocesses (e.g. API -> CLI) inherit the choice.
+BACKEND_ENV_VAR = "OCTOPUS_INPUT_BACKEND"
+
+
+def load_backend(name: Optional[str] = None):
+    """
+    Resolve an input backend by name.
+
+    Args:
+        name: 'pyautogui' or 'null'; defaults to $OCTOPUS_INPUT_BACKEND, then 'pyautogui'
+
+    Returns:
+        Object exposing the pyautogui functions used by HumanExecutor
+    """
+    name = (name or os.environ.get(BACKEND_ENV_VAR) or "pyautogui").lower()
+    if name == "null":
+        return NullBackend()
+    if name != "pyautogui":
+        raise ValueError(f"Unknown input backend: '{name}'")
+
+    # Imported lazily: pyautogui requires a display at import time
+    import pyautogui
+
+    # Safety configuration
+    pyautogui.FAILSAFE = True
+    pyautogui.PAUSE = 0.1
+    return pyautogui
+
 
 class HumanExecutor:
     """
@@ -36,20 +64,37 @@ class HumanExecutor:
         screen_width: Current display width in pixels
         screen_height: Current display height in pixels
         min_interval: Minimum delay between operations (seconds)
+        halt_event: When set, long-running primitives stop mid-flight and
+            return status 'halted'
     """
 
     # Class constants
     MIN_INTERVAL_SEC = 0.3
+    # Longest stretch of input issued without checking halt_event
+    HALT_CHECK_SEC = 0.02
+    # Characters typed per backend call when no keystroke interval is set
+    TYPE_CHUNK_CHARS = 16
     
-    def __init__(self, workspace_root: str):
+    def __init__(self, workspace_root: str, backend=None, clock: Optional[Clock] = None,
+                 halt_event: Optional[threading.Event] = None):
         """
         Initialize executor with workspace sandbox.
         
         Args:
             workspace_root: Directory path for sandboxed file operations
+            backend: Input backend object or name ('pyautogui', 'null').
+                     Defaults to load_backend() resolution.
+            clock: Time source for pauses (default: real time)
+            halt_event: Event that interrupts running primitives (e.g. the
+                agent's emergency stop); a private one is created if omitted
         """
         self.workspace_path = os.path.abspath(workspace_root)
-        self.screen_width, self.screen_height = pyautogui.size()
+        self._clock = clock or SYSTEM_CLOCK
+        self.halt_event = halt_event or threading.Event()
+        if backend is None or isinstance(backend, str):
+            backend = load_backend(backend)
+        self._gui = backend
+        self.screen_width, self.screen_height = self._gui.size()
         self.min_interval = self.MIN_INTERVAL_SEC
 
         if not os.path.exists(self.workspace_path):
@@ -98,8 +143,31 @@ class HumanExecutor:
         return abs_path
 
     def _enforce_interval(self) -> None:
-        """Pause to enforce minimum operation interval."""
-        time.sleep(self.min_interval)
+        """Pause to enforce minimum operation interval (cut short by a halt)."""
+        with span("executor.interval", seconds=self.min_interval):
+            self._clock.wait(self.halt_event, self.min_interval)
+
+    def _halted(self, message: str) -> Dict[str, Any]:
+        log.info(f"Halted: {message}")
+        return {"status": "halted", "message": message}
+
+    def _glide(self, x: int, y: int, duration: float) -> bool:
+        """
+        Move the cursor to (x, y) in segments of at most HALT_CHECK_SEC,
+        waiting on halt_event between them.
+
+        Returns:
+            False if halted before reaching the target
+        """
+        steps = max(1, int(duration / self.HALT_CHECK_SEC))
+        step_wait = duration / steps
+        start_x, start_y = self._gui.position()
+        for i in range(1, steps + 1):
+            if self._clock.wait(self.halt_event, step_wait):
+                return False
+            self._gui.moveTo(round(start_x + (x - start_x) * i / steps),
+                             round(start_y + (y - start_y) * i / steps), _pause=False)
+        return True
 
     def get_display_info(self) -> Dict[str, int]:
         """
@@ -132,7 +200,8 @@ class HumanExecutor:
         """
         try:
             self._check_coordinates(x, y)
-            pyautogui.moveTo(x, y, duration=duration)
+            if not self._glide(x, y, duration):
+                return self._halted(f"Move to ({x}, {y}) interrupted")
             return {"status": "ok", "message": f"Moved to ({x}, {y})"}
         except Exception as e:
             return {"status": "error", "message": str(e)}
@@ -152,7 +221,16 @@ class HumanExecutor:
         """
         try:
             self._check_coordinates(x, y)
-            pyautogui.dragTo(x, y, duration=duration, button=button)
+            if self.halt_event.is_set():
+                return self._halted(f"Drag to ({x}, {y}) not started")
+            self._gui.mouseDown(button=button, _pause=False)
+            try:
+                completed = self._glide(x, y, duration)
+            finally:
+                # Never leave the button held, including on halt
+                self._gui.mouseUp(button=button, _pause=False)
+            if not completed:
+                return self._halted(f"Drag to ({x}, {y}) interrupted; {button} released")
             return {"status": "ok", "message": f"Dragged to ({x}, {y}) with {button}"}
         except Exception as e:
             return {"status": "error", "message": str(e)}
@@ -176,7 +254,7 @@ class HumanExecutor:
             valid_buttons = {"left", "right", "middle"}
             if button not in valid_buttons:
                 return {"status": "error", "message": f"Invalid button: {button}"}
-            pyautogui.click(x, y, button=button, clicks=clicks, interval=interval)
+            self._gui.click(x, y, button=button, clicks=clicks, interval=interval)
             self._enforce_interval()
             return {"status": "ok", "message": f"Clicked {button} ({clicks}x) at ({x}, {y})"}
         except Exception as e:
@@ -193,7 +271,7 @@ class HumanExecutor:
             Result dict with 'status' and 'message'
         """
         try:
-            pyautogui.scroll(clicks)
+            self._gui.scroll(clicks)
             self._enforce_interval()
             return {"status": "ok", "message": f"Scrolled {clicks} clicks"}
         except Exception as e:
@@ -207,7 +285,7 @@ class HumanExecutor:
             Result dict with 'x', 'y' coordinates
         """
         try:
-            x, y = pyautogui.position()
+            x, y = self._gui.position()
             return {"status": "ok", "x": x, "y": y, "message": f"Position: ({x}, {y})"}
         except Exception as e:
             return {"status": "error", "message": str(e)}
@@ -228,7 +306,18 @@ class HumanExecutor:
             Result dict with 'status' and 'message'
         """
         try:
-            pyautogui.write(text, interval=interval)
+            # Typed in small pieces so a halt lands within HALT_CHECK_SEC
+            if interval > 0:
+                for i, char in enumerate(text):
+                    if self.halt_event.is_set():
+                        return self._halted(f"Typing interrupted after {i} of {len(text)} characters")
+                    self._gui.write(char, _pause=False)
+                    self._clock.wait(self.halt_event, interval)
+            else:
+                for i in range(0, len(text), self.TYPE_CHUNK_CHARS):
+                    if self.halt_event.is_set():
+                        return self._halted(f"Typing interrupted after {i} of {len(text)} characters")
+                    self._gui.write(text[i:i + self.TYPE_CHUNK_CHARS], _pause=False)
             self._enforce_interval()
             return {"status": "ok", "message": f"Typed {len(text)} characters"}
         except Exception as e:
@@ -245,7 +334,7 @@ class HumanExecutor:
             Result dict with 'status' and 'message'
         """
         try:
-            pyautogui.press(key)
+            self._gui.press(key)
             self._enforce_interval()
             return {"status": "ok", "message": f"Pressed '{key}'"}
         except Exception as e:
@@ -262,7 +351,7 @@ class HumanExecutor:
             Result dict with 'status' and 'message'
         """
         try:
-            pyautogui.hotkey(*keys)
+            self._gui.hotkey(*keys)
             self._enforce_interval()
             return {"status": "ok", "message": f"Hotkey: {'+'.join(keys)}"}
         except Exception as e:
@@ -397,7 +486,9 @@ class HumanExecutor:
             Result dict with 'status' and 'message'
         """
         try:
-            time.sleep(float(seconds))
+            with span("executor.sleep", seconds=float(seconds)):
+                if self._clock.wait(self.halt_event, float(seconds)):
+                    return self._halted(f"Sleep of {seconds}s interrupted")
             return {"status": "ok", "message": f"Slept {seconds}s"}
         except Exception as e:
             return {"status": "error", "message": str(e)}
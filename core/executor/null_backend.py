@@ -0,0 +1,64 @@
+"""
+Octopus Null Input Backend
+==========================
+Drop-in stand-in for the pyautogui functions used by HumanExecutor.
+Performs no real input, so the executor runs on display-less hosts
+(benchmarks, CI, replay against a null target).
+
+Author: Octopus Contributors
+License: MIT
+"""
+
+from typing import Tuple
+
+
+class NullBackend:
+    """
+    No-op input backend with a virtual cursor.
+
+    Only tracks the cursor position so that mouse_position() stays
+    consistent with preceding moves.
+    """
+
+    def __init__(self, width: int = 1920, height: int = 1080):
+        """
+        Args:
+            width: Virtual display width in pixels
+            height: Virtual display height in pixels
+        """
+        self._size = (width, height)
+        self._x, self._y = width // 2, height // 2
+
+    def size(self) -> Tuple[int, int]:
+        return self._size
+
+    def position(self) -> Tuple[int, int]:
+        return self._x, self._y
+
+    def moveTo(self, x: int, y: int, duration: float = 0.0, **kwargs) -> None:
+        self._x, self._y = x, y
+
+    def dragTo(self, x: int, y: int, duration: float = 0.0, button: str = "left", **kwargs) -> None:
+        self._x, self._y = x, y
+
+    def click(self, x: int = None, y: int = None, **kwargs) -> None:
+        if x is not None and y is not None:
+            self._x, self._y = x, y
+
+    def mouseDown(self, x: int = None, y: int = None, button: str = "left", **kwargs) -> None:
+        pass
+
+    def mouseUp(self, x: int = None, y: int = None, button: str = "left", **kwargs) -> None:
+        pass
+
+    def scroll(self, clicks: int, **kwargs) -> None:
+        pass
+
+    def write(self, text: str, interval: float = 0.0, **kwargs) -> None:
+        pass
+
+    def press(self, key: str, **kwargs) -> None:
+        pass
+
+    def hotkey(self, *keys, **kwargs) -> None:
+        pass
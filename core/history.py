@@ -0,0 +1,304 @@
+"""
+Octopus Action History
+======================
+Indexed SQLite store of executed actions, fed by the agent's ActionLog
+writer thread and by RunHistory for 'agent run'. Supports filtered,
+cursor-paginated queries and per-type stats that stay fast at millions of
+rows (stats read a per-minute rollup).
+
+Author: Octopus Contributors
+License: MIT
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+import sqlite3
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Union
+
+from core.action_log import build_record
+
+log = logging.getLogger("octopus.history")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS actions (
+    id            INTEGER PRIMARY KEY,
+    ts            REAL NOT NULL,
+    type          TEXT NOT NULL,
+    skill         TEXT NOT NULL,
+    status        TEXT NOT NULL,
+    duration_ms   REAL,
+    params_digest TEXT,
+    message       TEXT,
+    batch         TEXT,
+    intent        TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_actions_type   ON actions(type, id);
+CREATE INDEX IF NOT EXISTS idx_actions_skill  ON actions(skill, id);
+CREATE INDEX IF NOT EXISTS idx_actions_status ON actions(status, id);
+CREATE INDEX IF NOT EXISTS idx_actions_ts     ON actions(ts);
+CREATE INDEX IF NOT EXISTS idx_actions_batch  ON actions(batch);
+
+-- Per-minute rollup so stats never scan the raw table
+CREATE TABLE IF NOT EXISTS action_rollup (
+    minute   INTEGER NOT NULL,
+    type     TEXT NOT NULL,
+    count    INTEGER NOT NULL,
+    errors   INTEGER NOT NULL,
+    total_ms REAL NOT NULL,
+    max_ms   REAL NOT NULL,
+    PRIMARY KEY (minute, type)
+);
+"""
+
+_RELATIVE_TIME = re.compile(r"^(\d+(?:\.\d+)?)\s*([smhd])$")
+_UNIT_SECONDS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_time(value: Union[str, float, int, None]) -> Optional[float]:
+    """
+    Convert a time filter to an epoch timestamp.
+
+    Accepts epoch seconds, relative durations ('30s', '15m', '1h', '7d'
+    meaning "that long ago") and ISO 8601 datetimes.
+
+    Raises:
+        ValueError: If the value cannot be interpreted
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip()
+    match = _RELATIVE_TIME.match(text)
+    if match:
+        return time.time() - float(match.group(1)) * _UNIT_SECONDS[match.group(2)]
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(text).timestamp()
+    except ValueError:
+        raise ValueError(f"Unrecognized time: '{value}'. Use epoch, ISO 8601 or e.g. '1h'")
+
+
+def params_digest(params: Any) -> str:
+    """Stable short hash of (compacted) action params."""
+    encoded = json.dumps(params, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:16]
+
+
+class HistoryStore:
+    """
+    SQLite-backed action history.
+
+    Uses WAL mode so the API and CLI can read while the agent writes.
+    All access goes through one connection guarded by a lock.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Database file (created if missing)
+        """
+        db_dir = os.path.dirname(path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10.0)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def write(self, records: List[Dict[str, Any]]) -> None:
+        """
+        Insert ActionLog records in one transaction.
+
+        Args:
+            records: Records as produced by ActionLog (ts, type, params, ...)
+        """
+        rows = [
+            (
+                r.get("ts", time.time()),
+                r.get("type", "unknown"),
+                str(r.get("type", "unknown")).split(".", 1)[0],
+                r.get("status", "unknown"),
+                r.get("duration_ms"),
+                params_digest(r.get("params", {})),
+                r.get("message"),
+                r.get("batch"),
+                r.get("intent"),
+            )
+            for r in records
+        ]
+        rollup: Dict[tuple, list] = {}
+        for ts, action_type, _, status, duration, *_ in rows:
+            entry = rollup.setdefault((int(ts // 60), action_type), [0, 0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += status != "ok"
+            entry[2] += duration or 0.0
+            entry[3] = max(entry[3], duration or 0.0)
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO actions "
+                "(ts, type, skill, status, duration_ms, params_digest, message, batch, intent) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.executemany(
+                "INSERT INTO action_rollup (minute, type, count, errors, total_ms, max_ms) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(minute, type) DO UPDATE SET "
+                "count = count + excluded.count, errors = errors + excluded.errors, "
+                "total_ms = total_ms + excluded.total_ms, max_ms = MAX(max_ms, excluded.max_ms)",
+                [(minute, action_type, *entry) for (minute, action_type), entry in rollup.items()],
+            )
+            self._conn.commit()
+
+    @staticmethod
+    def _filters(action_type: Optional[str], status: Optional[str], since, until,
+                 batch: Optional[str], skill_column: str = "skill") -> tuple:
+        clauses, args = [], []
+        if action_type:
+            if action_type.endswith(".*"):
+                # Skill wildcard, e.g. 'file.*'
+                if skill_column:
+                    clauses.append(f"{skill_column} = ?")
+                    args.append(action_type[:-2])
+                else:
+                    clauses.append("type >= ? AND type < ?")
+                    args += [action_type[:-1], action_type[:-2] + "/"]
+            else:
+                clauses.append("type = ?")
+                args.append(action_type)
+        if status:
+            clauses.append("status = ?")
+            args.append(status)
+        since, until = parse_time(since), parse_time(until)
+        if since is not None:
+            clauses.append("ts >= ?")
+            args.append(since)
+        if until is not None:
+            clauses.append("ts < ?")
+            args.append(until)
+        if batch:
+            clauses.append("batch = ?")
+            args.append(batch)
+        return clauses, args
+
+    def query(self, action_type: Optional[str] = None, status: Optional[str] = None,
+              since=None, until=None, batch: Optional[str] = None,
+              cursor: Optional[int] = None, limit: int = 50) -> Dict[str, Any]:
+        """
+        Fetch matching records, newest first.
+
+        Args:
+            action_type: Exact type ('file.write') or skill wildcard ('file.*')
+            status: Result status ('ok', 'error', ...)
+            since: Lower time bound (see parse_time)
+            until: Upper time bound (see parse_time)
+            batch: Batch identifier
+            cursor: 'next_cursor' from a previous page
+            limit: Page size (max 1000)
+
+        Returns:
+            Dict with 'records' and 'next_cursor' (None on the last page)
+        """
+        limit = max(1, min(int(limit), 1000))
+        clauses, args = self._filters(action_type, status, since, until, batch)
+        if cursor is not None:
+            # Keyset pagination: constant cost regardless of page depth
+            clauses.append("id < ?")
+            args.append(int(cursor))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = f"SELECT * FROM actions {where} ORDER BY id DESC LIMIT ?"
+
+        with self._lock:
+            rows = self._conn.execute(sql, args + [limit + 1]).fetchall()
+
+        records = [dict(row) for row in rows[:limit]]
+        next_cursor = records[-1]["id"] if len(rows) > limit else None
+        return {"records": records, "next_cursor": next_cursor}
+
+    def stats(self, since=None, until=None, action_type: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Aggregate counts and durations per action type.
+
+        Time bounds are applied at minute granularity.
+
+        Returns:
+            Dict with 'total' and per-type rows (count, errors, avg/max duration)
+        """
+        clauses, args = self._filters(action_type, None, None, None, None, skill_column="")
+        since, until = parse_time(since), parse_time(until)
+        if since is not None:
+            clauses.append("minute >= ?")
+            args.append(int(since // 60))
+        if until is not None:
+            clauses.append("minute <= ?")
+            args.append(int(until // 60))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = (
+            "SELECT type, SUM(count) AS count, SUM(errors) AS errors, "
+            "ROUND(SUM(total_ms) / SUM(count), 3) AS avg_ms, ROUND(MAX(max_ms), 3) AS max_ms "
+            f"FROM action_rollup {where} GROUP BY type ORDER BY count DESC"
+        )
+        with self._lock:
+            rows = [dict(row) for row in self._conn.execute(sql, args).fetchall()]
+        return {"total": sum(r["count"] for r in rows), "types": rows}
+
+
+class RunHistory:
+    """
+    Records the actions of one run outside the agent loop ('agent run',
+    which the API's /action, /chat and /jobs also go through) as one batch.
+
+    Records are buffered and written every FLUSH_EVERY actions and on close().
+    """
+
+    FLUSH_EVERY = 256
+
+    def __init__(self, store: HistoryStore, intent: Optional[str] = None):
+        self.store = store
+        self.batch = uuid.uuid4().hex[:12]
+        self.intent = intent
+        self._pending: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def record(self, action: Dict[str, Any], result: Dict[str, Any], duration: float) -> None:
+        record = build_record(time.time(), action, result, duration, self.batch, self.intent)
+        with self._lock:
+            self._pending.append(record)
+            if len(self._pending) < self.FLUSH_EVERY:
+                return
+            pending, self._pending = self._pending, []
+        self._write(pending)
+
+    def _write(self, records: List[Dict[str, Any]]) -> None:
+        try:
+            self.store.write(records)
+        except sqlite3.Error as e:
+            log.warning(f"Could not write {len(records)} history records: {e}")
+
+    def close(self) -> None:
+        """Write what is buffered and close the store."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if pending:
+            self._write(pending)
+        self.store.close()
@@ -0,0 +1,373 @@
+"""
+Octopus Job Manager
+===================
+Runs long requests (LLM plans, actions) as background jobs.
+
+Jobs wait in bounded per-session queues and run on a fixed number of
+worker threads, so however many clients submit at once, only `workers`
+jobs run concurrently. Workers take jobs from the sessions by weighted
+round-robin (each session in turn gets up to `weight` jobs, FIFO within a
+session), so one session with a long backlog neither delays nor, with its
+own queue cap, locks out the others. When the queue or the session's share
+of it is full, submit() raises QueueFull with a Retry-After estimate
+instead of accepting work that would only time out.
+
+Jobs submitted as exclusive (their batch uses the mouse or keyboard) run
+one at a time: while one runs, sessions whose next job is exclusive are
+passed over, so shared-only jobs keep the workers busy. A job that still
+has to wait for the input lease (core.scheduler) does so inside
+waiting(), which lets another worker take its slot meanwhile.
+
+Each job gets a cancel event: queued jobs are dropped immediately,
+running ones see the event set and stop at their next check.
+
+A job runs in a copy of the submitter's context (contextvars), so the
+trace it was submitted under continues into the worker thread.
+
+Author: Octopus Contributors
+License: MIT
+"""
+
+import math
+import time
+import uuid
+import logging
+import threading
+import contextvars
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Dict, Any, Callable, Deque, Iterator, List, Optional
+
+from core.metrics import JOBS_QUEUED, JOBS_RUNNING, JOBS_TOTAL, JOB_QUEUE_WAIT
+from core.scheduler import DEFAULT_SESSION
+
+log = logging.getLogger("octopus.jobs")
+
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_QUEUED = 32
+# Queued jobs one session may hold
+DEFAULT_MAX_PER_SESSION = 8
+# Finished jobs are kept this long (seconds) for status and result queries
+DEFAULT_RETENTION = 3600.0
+MAX_FINISHED = 1000
+# Assumed job duration before any job has finished
+INITIAL_ESTIMATE = 5.0
+MAX_RETRY_AFTER = 300
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+FINISHED = {SUCCEEDED, FAILED, CANCELLED}
+
+
+class QueueFull(Exception):
+    """Raised by submit() when the queue is at capacity."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Job queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class Job:
+    """
+    One submitted unit of work.
+
+    Attributes:
+        cancelled: Set by cancel(); the job function should poll it
+        done: Set once the job reaches a finished state
+    """
+
+    def __init__(self, kind: str, fn: Callable[["Job"], Dict[str, Any]], session: Optional[str] = None,
+                 exclusive: bool = False):
+        self.id = uuid.uuid4().hex[:16]
+        self.kind = kind
+        self.session = session
+        self.exclusive = exclusive
+        self.fn = fn
+        # Submitter's context (current trace span), entered by the worker
+        self.context = contextvars.copy_context()
+        self.state = QUEUED
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.cancelled = threading.Event()
+        self.done = threading.Event()
+
+    def to_dict(self, result: bool = False) -> Dict[str, Any]:
+        out = {
+            "job_id": self.id,
+            "kind": self.kind,
+            "session": self.session,
+            "state": self.state,
+            "created": round(self.created, 3),
+            "started": round(self.started, 3) if self.started else None,
+            "finished": round(self.finished, 3) if self.finished else None,
+        }
+        if self.error:
+            out["error"] = self.error
+        if result:
+            out["result"] = self.result
+        return out
+
+
+class JobManager:
+    """Bounded, per-session fair job queue served by a fixed pool of worker threads."""
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, max_queued: int = DEFAULT_MAX_QUEUED,
+                 retention: float = DEFAULT_RETENTION, max_per_session: int = DEFAULT_MAX_PER_SESSION,
+                 weight: Optional[Callable[[str], int]] = None):
+        """
+        Args:
+            workers: Jobs run concurrently
+            max_queued: Jobs allowed to wait; further submissions get QueueFull
+            retention: Seconds finished jobs stay queryable
+            max_per_session: Jobs one session may have waiting
+            weight: Session -> consecutive jobs per round (default 1 each)
+        """
+        self.workers = max(1, workers)
+        self.max_queued = max_queued
+        self.max_per_session = max(1, max_per_session)
+        self.retention = retention
+        self._weight = weight or (lambda session: 1)
+        # Round-robin ring: session -> its queued jobs in arrival order
+        self._queues: "OrderedDict[str, Deque[Job]]" = OrderedDict()
+        self._current: Optional[str] = None
+        self._credit = 0
+        self._queued = 0
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._running = 0
+        self._exclusive_running = 0
+        # Workers alive, and how many of them wait inside waiting()
+        self._alive = 0
+        self._blocked = 0
+        self._spawned = 0
+        self._avg_duration = INITIAL_ESTIMATE
+        self._cond = threading.Condition()
+        self._stopping = False
+        JOBS_QUEUED.set_function(lambda: self._queued)
+        JOBS_RUNNING.set_function(lambda: self._running)
+
+    def start(self) -> "JobManager":
+        """Start the workers (submit() does this on first use)."""
+        with self._cond:
+            self._stopping = False
+            self._spawn()
+        return self
+
+    def stop(self) -> None:
+        """Cancel everything queued and let the workers exit after their current job."""
+        with self._cond:
+            self._stopping = True
+            for queue in self._queues.values():
+                for job in queue:
+                    self._finish(job, CANCELLED, error="Job manager stopped")
+            self._queues.clear()
+            self._queued = 0
+            self._current = None
+            self._cond.notify_all()
+
+    def _spawn(self) -> None:
+        """Start workers until `workers` of them are free to take jobs (lock held)."""
+        while self._alive - self._blocked < self.workers:
+            self._alive += 1
+            self._spawned += 1
+            threading.Thread(target=self._work, daemon=True, name=f"job-worker-{self._spawned}").start()
+
+    @contextmanager
+    def waiting(self) -> Iterator[None]:
+        """
+        Mark the calling worker as blocked (e.g. on the input lease) while in
+        the block; another worker takes its place so queued jobs keep running.
+        """
+        with self._cond:
+            self._blocked += 1
+            if not self._stopping:
+                self._spawn()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._blocked -= 1
+                # One worker too many now: let an idle one retire
+                self._cond.notify()
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # Submission
+    # ─────────────────────────────────────────────────────────────────────────
+
+    def retry_after(self) -> int:
+        """Seconds until a queue slot is likely to free up."""
+        with self._cond:
+            # A slot opens when any worker finishes its job
+            estimate = self._avg_duration / self.workers
+        return max(1, min(MAX_RETRY_AFTER, math.ceil(estimate)))
+
+    def submit(self, kind: str, fn: Callable[[Job], Dict[str, Any]], session: Optional[str] = None,
+               exclusive: bool = False) -> Job:
+        """
+        Queue fn(job) to run on a worker; its return value becomes job.result.
+
+        Args:
+            exclusive: The job drives the mouse or keyboard (runs one at a time)
+
+        Raises:
+            QueueFull: If max_queued jobs, or max_per_session of this
+                session's, are already waiting
+        """
+        job = Job(kind, fn, session, exclusive)
+        key = session or DEFAULT_SESSION
+        with self._cond:
+            queue = self._queues.get(key)
+            full = self._queued >= self.max_queued or (queue is not None and len(queue) >= self.max_per_session)
+            if not full:
+                if queue is None:
+                    # Joins the round at the back
+                    queue = self._queues[key] = deque()
+                queue.append(job)
+                self._queued += 1
+                self._jobs[job.id] = job
+                self._prune()
+                if not self._alive:
+                    self._spawn()
+                self._cond.notify()
+        if full:
+            JOBS_TOTAL.inc(kind, "rejected")
+            raise QueueFull(self.retry_after())
+        return job
+
+    def position(self, job: Job) -> Optional[int]:
+        """0-based place of a queued job in its session's line, None once it has started."""
+        with self._cond:
+            try:
+                return self._queues.get(job.session or DEFAULT_SESSION, ()).index(job)
+            except ValueError:
+                return None
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def list(self, state: Optional[str] = None, limit: int = 50, session: Optional[str] = None) -> List[Job]:
+        """Most recent jobs first."""
+        with self._cond:
+            jobs = [j for j in reversed(self._jobs.values())
+                    if (state is None or j.state == state) and (session is None or j.session == session)]
+        return jobs[:limit]
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancel a job: queued ones are dropped, running ones are signalled."""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job.state in FINISHED:
+                return job
+            job.cancelled.set()
+            if job.state == QUEUED:
+                self._dequeue(job.session or DEFAULT_SESSION, job)
+                self._finish(job, CANCELLED)
+        return job
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "workers": self.workers,
+                "running": self._running,
+                "queued": self._queued,
+                "max_queued": self.max_queued,
+                "max_per_session": self.max_per_session,
+                "sessions_queued": {s: len(q) for s, q in self._queues.items()},
+                "avg_duration_s": round(self._avg_duration, 3),
+            }
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # Workers
+    # ─────────────────────────────────────────────────────────────────────────
+
+    def _finish(self, job: Job, state: str, result: Optional[Dict[str, Any]] = None,
+                error: Optional[str] = None) -> None:
+        """Record a final state (lock held)."""
+        job.state = state
+        job.result = result
+        job.error = error
+        job.finished = time.time()
+        job.fn = None
+        job.context = None
+        JOBS_TOTAL.inc(job.kind, state)
+        job.done.set()
+
+    def _prune(self) -> None:
+        """Drop finished jobs past retention or beyond MAX_FINISHED (lock held)."""
+        cutoff = time.time() - self.retention
+        finished = [j for j in self._jobs.values() if j.state in FINISHED]
+        excess = len(finished) - MAX_FINISHED
+        for j in finished:
+            if excess > 0 or j.finished < cutoff:
+                del self._jobs[j.id]
+                excess -= 1
+
+    def _dequeue(self, session: str, job: Job) -> None:
+        """Take a job out of its session's queue (lock held)."""
+        queue = self._queues[session]
+        queue.remove(job)
+        self._queued -= 1
+        if not queue:
+            # Rejoins at the back of the ring when it next submits
+            del self._queues[session]
+            if self._current == session:
+                self._current = None
+
+    def _next(self) -> Optional[Job]:
+        """
+        Next job by weighted round-robin over sessions (lock held). A session
+        whose next job is exclusive is passed over while one is running.
+        """
+        for session, queue in self._queues.items():
+            job = queue[0]
+            if job.exclusive and self._exclusive_running:
+                continue
+            if session != self._current or self._credit <= 0:
+                self._current, self._credit = session, self._weight(session)
+            self._credit -= 1
+            self._dequeue(session, job)
+            if self._credit <= 0 and session in self._queues:
+                self._queues.move_to_end(session)
+            return job
+        return None
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                job = None
+                # Extra workers started by waiting() retire once they are not needed
+                while not self._stopping and self._alive - self._blocked <= self.workers:
+                    job = self._next()
+                    if job is not None:
+                        break
+                    self._cond.wait()
+                if job is None:
+                    self._alive -= 1
+                    return
+                job.state = RUNNING
+                job.started = time.time()
+                self._running += 1
+                self._exclusive_running += job.exclusive
+            JOB_QUEUE_WAIT.observe(job.started - job.created, job.kind)
+
+            try:
+                result, error = job.context.run(job.fn, job), None
+            except Exception as e:
+                log.error(f"Job {job.id} ({job.kind}) failed: {e}")
+                result, error = None, str(e)
+
+            with self._cond:
+                self._running -= 1
+                self._exclusive_running -= job.exclusive
+                if job.exclusive:
+                    self._cond.notify_all()
+                duration = time.time() - job.started
+                self._avg_duration = 0.8 * self._avg_duration + 0.2 * duration
+                if job.cancelled.is_set():
+                    self._finish(job, CANCELLED, result)
+                elif error is not None:
+                    self._finish(job, FAILED, error=error)
+                else:
+                    self._finish(job, SUCCEEDED, result)
@@ -0,0 +1,462 @@
+"""
+Octopus Macro Recorder
+======================
+Captures real mouse and keyboard input with pynput and compiles it into
+Octopus action batches, so a workflow demonstrated once can be replayed
+through the Dispatcher without an LLM planning it.
+
+Events are stored as four int32 fields (kind, dt_ms, a, b) in an array:
+times are deltas from the previous event and pointer moves are deltas from
+the previous position, so a minute of input is a few kilobytes before
+zlib compression.
+
+    MOVE   a, b = dx, dy
+    BUTTON a = button code, b = 1 pressed / 0 released
+    SCROLL a, b = dx, dy wheel steps
+    KEY    a = index into the key-name table, b = 1 pressed / 0 released
+
+Author: Octopus Contributors
+License: MIT
+"""
+
+import sys
+import json
+import time
+import zlib
+import struct
+import logging
+import threading
+from array import array
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+log = logging.getLogger("octopus.macro")
+
+MAGIC = b"OCTM"
+FORMAT_VERSION = 1
+
+MOVE, BUTTON, SCROLL, KEY = 0, 1, 2, 3
+BUTTONS = {"left": 1, "right": 2, "middle": 3}
+BUTTON_NAMES = {code: name for name, code in BUTTONS.items()}
+
+# pynput key names -> pyautogui key names
+KEY_ALIASES = {
+    "ctrl_l": "ctrl", "ctrl_r": "ctrl", "alt_l": "alt", "alt_r": "alt", "alt_gr": "altright",
+    "shift_l": "shift", "shift_r": "shift", "cmd": "win", "cmd_l": "win", "cmd_r": "win",
+    "page_up": "pageup", "page_down": "pagedown", "caps_lock": "capslock",
+    "num_lock": "numlock", "scroll_lock": "scrolllock", "print_screen": "printscreen",
+    "media_play_pause": "playpause", "media_next": "nexttrack", "media_previous": "prevtrack",
+    "media_volume_up": "volumeup", "media_volume_down": "volumedown", "media_volume_mute": "volumemute",
+}
+MODIFIERS = {"ctrl", "alt", "altright", "win"}
+# Keys folded into keyboard.type text
+TYPED_KEYS = {"space": " ", "enter": "\n", "tab": "\t"}
+
+
+class MacroLog:
+    """Delta-encoded input event log."""
+
+    def __init__(self, origin: Tuple[int, int] = (0, 0)):
+        """
+        Args:
+            origin: Pointer position when recording started
+        """
+        self.origin = (int(origin[0]), int(origin[1]))
+        self.keys: List[str] = []
+        self.events = array("i")
+        self._key_index: Dict[str, int] = {}
+        self._pos = self.origin
+        self._last_ms = 0
+
+    def __len__(self) -> int:
+        return len(self.events) // 4
+
+    def _append(self, kind: int, t_ms: int, a: int, b: int) -> None:
+        dt = max(0, t_ms - self._last_ms)
+        self._last_ms += dt
+        self.events.extend((kind, dt, a, b))
+
+    def move(self, t_ms: int, x: int, y: int) -> None:
+        """Record the pointer at (x, y); no-op if it has not moved."""
+        x, y = int(x), int(y)
+        if (x, y) != self._pos:
+            self._append(MOVE, t_ms, x - self._pos[0], y - self._pos[1])
+            self._pos = (x, y)
+
+    def button(self, t_ms: int, button: str, pressed: bool) -> None:
+        self._append(BUTTON, t_ms, BUTTONS.get(button, 1), int(pressed))
+
+    def scroll(self, t_ms: int, dx: int, dy: int) -> None:
+        self._append(SCROLL, t_ms, int(dx), int(dy))
+
+    def key(self, t_ms: int, name: str, pressed: bool) -> None:
+        index = self._key_index.get(name)
+        if index is None:
+            index = self._key_index[name] = len(self.keys)
+            self.keys.append(name)
+        self._append(KEY, t_ms, index, int(pressed))
+
+    def decode(self) -> Iterator[Tuple[int, float, Any, Any]]:
+        """
+        Yield (kind, t_seconds, a, b) with absolute values restored.
+
+        MOVE yields (x, y), BUTTON (button name, pressed), SCROLL (dx, dy)
+        and KEY (key name, pressed).
+        """
+        x, y = self.origin
+        t_ms = 0
+        ev = self.events
+        for i in range(0, len(ev), 4):
+            kind, dt, a, b = ev[i], ev[i + 1], ev[i + 2], ev[i + 3]
+            t_ms += dt
+            if kind == MOVE:
+                x, y = x + a, y + b
+                yield kind, t_ms / 1000.0, x, y
+            elif kind == BUTTON:
+                yield kind, t_ms / 1000.0, BUTTON_NAMES.get(a, "left"), bool(b)
+            elif kind == KEY:
+                yield kind, t_ms / 1000.0, self.keys[a], bool(b)
+            else:
+                yield kind, t_ms / 1000.0, a, b
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # Serialization
+    # ─────────────────────────────────────────────────────────────────────────
+
+    def to_bytes(self) -> bytes:
+        """Encode as MAGIC, version, JSON header length, header, zlib(events)."""
+        header = json.dumps({"origin": self.origin, "keys": self.keys}).encode("utf-8")
+        events = array("i", self.events)
+        if sys.byteorder == "big":
+            events.byteswap()
+        return (MAGIC + struct.pack("<HI", FORMAT_VERSION, len(header)) + header
+                + zlib.compress(events.tobytes(), 6))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "MacroLog":
+        if data[:4] != MAGIC:
+            raise ValueError("Not an Octopus macro file")
+        version, header_len = struct.unpack_from("<HI", data, 4)
+        if version > FORMAT_VERSION:
+            raise ValueError(f"Unsupported macro version {version}")
+        offset = 4 + struct.calcsize("<HI")
+        header = json.loads(data[offset:offset + header_len].decode("utf-8"))
+        macro = cls(tuple(header.get("origin", (0, 0))))
+        macro.keys = list(header.get("keys", []))
+        macro._key_index = {name: i for i, name in enumerate(macro.keys)}
+        macro.events.frombytes(zlib.decompress(data[offset + header_len:]))
+        if sys.byteorder == "big":
+            macro.events.byteswap()
+        if len(macro.events) % 4:
+            raise ValueError("Truncated macro event data")
+        return macro
+
+    def save(self, path: str) -> int:
+        """Write to a file. Returns the number of bytes written."""
+        data = self.to_bytes()
+        with open(path, "wb") as f:
+            f.write(data)
+        return len(data)
+
+    @classmethod
+    def load(cls, path: str) -> "MacroLog":
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Recording
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _key_name(key) -> str:
+    """Normalize a pynput Key/KeyCode to a pyautogui key name."""
+    char = getattr(key, "char", None)
+    if char is not None:
+        # Some platforms report Ctrl+<letter> as a control character
+        if len(char) == 1 and ord(char) < 32:
+            return chr(ord(char) + 96)
+        return char
+    name = getattr(key, "name", None)
+    if name:
+        return KEY_ALIASES.get(name, name)
+    vk = getattr(key, "vk", None)
+    return f"vk{vk}" if vk is not None else str(key)
+
+
+class MacroRecorder:
+    """
+    Records global mouse and keyboard input into a MacroLog.
+
+    Pressing the stop key ends the recording; the stop key itself is not
+    recorded.
+    """
+
+    def __init__(self, stop_key: str = "esc"):
+        """
+        Args:
+            stop_key: Key name that ends the recording
+        """
+        self.stop_key = stop_key
+        self.macro: Optional[MacroLog] = None
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._listeners: list = []
+        self._t0 = 0.0
+
+    def _now_ms(self) -> int:
+        return int((time.perf_counter() - self._t0) * 1000)
+
+    def _on_move(self, x, y) -> None:
+        with self._lock:
+            self.macro.move(self._now_ms(), x, y)
+
+    def _on_click(self, x, y, button, pressed) -> None:
+        with self._lock:
+            t = self._now_ms()
+            self.macro.move(t, x, y)
+            self.macro.button(t, getattr(button, "name", "left"), pressed)
+
+    def _on_scroll(self, x, y, dx, dy) -> None:
+        with self._lock:
+            t = self._now_ms()
+            self.macro.move(t, x, y)
+            self.macro.scroll(t, dx, dy)
+
+    def _on_press(self, key) -> None:
+        name = _key_name(key)
+        if name == self.stop_key:
+            self._done.set()
+            return
+        with self._lock:
+            self.macro.key(self._now_ms(), name, True)
+
+    def _on_release(self, key) -> None:
+        name = _key_name(key)
+        if name == self.stop_key:
+            return
+        with self._lock:
+            self.macro.key(self._now_ms(), name, False)
+
+    def start(self) -> None:
+        """Start the global listeners."""
+        # Imported lazily: pynput needs a display server at import time
+        from pynput import mouse, keyboard
+
+        origin = mouse.Controller().position
+        self.macro = MacroLog((int(origin[0]), int(origin[1])))
+        self._done.clear()
+        self._t0 = time.perf_counter()
+        self._listeners = [
+            mouse.Listener(on_move=self._on_move, on_click=self._on_click, on_scroll=self._on_scroll),
+            keyboard.Listener(on_press=self._on_press, on_release=self._on_release),
+        ]
+        for listener in self._listeners:
+            listener.start()
+        log.info(f"Macro recording started (press '{self.stop_key}' to stop)")
+
+    def stop(self) -> MacroLog:
+        """Stop the listeners and return the recorded log."""
+        for listener in self._listeners:
+            listener.stop()
+        self._listeners = []
+        self._done.set()
+        log.info(f"Macro recording stopped ({len(self.macro)} events)")
+        return self.macro
+
+    def record(self, max_seconds: Optional[float] = None) -> MacroLog:
+        """Record until the stop key is pressed or max_seconds elapse."""
+        self.start()
+        try:
+            self._done.wait(max_seconds)
+        finally:
+            self.stop()
+        return self.macro
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Compilation
+# ─────────────────────────────────────────────────────────────────────────────
+
+class _Compiler:
+    """Turns decoded events into actions (see compile_macro)."""
+
+    def __init__(self, jitter_px: int, min_pause: float, double_click: float):
+        self.jitter_px = jitter_px
+        self.min_pause = min_pause
+        self.double_click = double_click
+        self.actions: List[Dict[str, Any]] = []
+        self.pos = (0, 0)
+        self.emitted_pos: Optional[Tuple[int, int]] = None
+        self.last_t = 0.0
+        self.move_start: Optional[float] = None
+        self.move_end = 0.0
+        self.shift = False
+        self.pressed: Dict[str, Tuple[Tuple[int, int], float]] = {}
+        self.modifiers: List[str] = []
+        self.text: List[str] = []
+        self.text_times: List[float] = []
+        self.scroll = 0
+
+    def _near(self, a, b) -> bool:
+        return b is not None and abs(a[0] - b[0]) <= self.jitter_px and abs(a[1] - b[1]) <= self.jitter_px
+
+    def _emit(self, t: float, action_type: str, **params) -> None:
+        gap = t - self.last_t
+        if self.actions and gap >= self.min_pause:
+            self.actions.append({"type": "system.sleep", "params": {"seconds": round(gap, 2)}})
+        self.actions.append({"type": action_type, "params": params})
+
+    def flush_text(self) -> None:
+        if not self.text:
+            return
+        times = self.text_times
+        interval = (times[-1] - times[0]) / (len(times) - 1) if len(times) > 1 else 0.02
+        self._emit(times[0], "keyboard.type", text="".join(self.text),
+                   interval=round(min(max(interval, 0.0), 0.1), 3))
+        self.last_t = times[-1]
+        self.text, self.text_times = [], []
+
+    def flush_scroll(self, t: float) -> None:
+        if self.scroll:
+            self._emit(t, "mouse.scroll", clicks=self.scroll)
+            self.last_t = t
+            self.scroll = 0
+
+    def flush_move(self, t: float) -> None:
+        """Collapse the pending pointer path into one move to its end point."""
+        if self.move_start is None:
+            return
+        if not self._near(self.pos, self.emitted_pos):
+            self._emit(self.move_start, "mouse.move", x=self.pos[0], y=self.pos[1],
+                       duration=round(min(max(self.move_end - self.move_start, 0.05), 1.0), 2))
+            self.emitted_pos = self.pos
+            self.last_t = self.move_end
+        self.move_start = None
+
+    def flush(self, t: float) -> None:
+        self.flush_text()
+        self.flush_scroll(t)
+        self.flush_move(t)
+
+    def on_move(self, t: float, x: int, y: int) -> None:
+        if self.pressed:
+            # Path while a button is held becomes part of a drag
+            self.pos = (x, y)
+            return
+        if self.move_start is None:
+            self.flush_text()
+            self.flush_scroll(t)
+            self.move_start = t
+        self.move_end = t
+        self.pos = (x, y)
+
+    def on_button(self, t: float, button: str, pressed: bool) -> None:
+        if pressed:
+            self.flush(t)
+            self.pressed[button] = (self.pos, t)
+            return
+        if button not in self.pressed:
+            return
+        start_pos, start_t = self.pressed.pop(button)
+        if self._near(self.pos, start_pos):
+            self._click(start_t, start_pos, button)
+        else:
+            if not self._near(start_pos, self.emitted_pos):
+                self._emit(start_t, "mouse.move", x=start_pos[0], y=start_pos[1], duration=0.1)
+            self._emit(start_t, "mouse.drag", x=self.pos[0], y=self.pos[1],
+                       duration=round(min(max(t - start_t, 0.1), 2.0), 2), button=button)
+        self.emitted_pos = self.pos
+        self.last_t = t
+
+    def _click(self, t: float, pos: Tuple[int, int], button: str) -> None:
+        last = self.actions[-1] if self.actions else None
+        if (last and last["type"] == "mouse.click" and last["params"]["button"] == button
+                and self._near(pos, (last["params"]["x"], last["params"]["y"]))
+                and t - self.last_t <= self.double_click):
+            last["type"] = "mouse.double_click"
+            return
+        self._emit(t, "mouse.click", x=pos[0], y=pos[1], button=button)
+
+    def on_scroll(self, t: float, dy: int) -> None:
+        self.flush_text()
+        self.flush_move(t)
+        self.scroll += dy
+        self.last_t = t
+
+    def on_key(self, t: float, name: str, pressed: bool) -> None:
+        if name in MODIFIERS:
+            if pressed and name not in self.modifiers:
+                self.modifiers.append(name)
+            elif not pressed and name in self.modifiers:
+                self.modifiers.remove(name)
+            return
+        if name == "shift":
+            # Shifted characters already arrive as their final char; shift
+            # only matters inside a modifier combination
+            self.shift = pressed
+            return
+        if not pressed:
+            return
+
+        if self.modifiers:
+            self.flush(t)
+            keys = self.modifiers + (["shift"] if self.shift else [])
+            self._emit(t, "keyboard.hotkey", keys=keys + [name.lower() if len(name) == 1 else name])
+            self.last_t = t
+            return
+
+        char = TYPED_KEYS.get(name, name if len(name) == 1 else None)
+        if char is not None:
+            if not self.text:
+                self.flush_scroll(t)
+                self.flush_move(t)
+            self.text.append(char)
+            self.text_times.append(t)
+            return
+        if name == "backspace" and self.text:
+            # Correct the pending text instead of replaying the typo
+            self.text.pop()
+            self.text_times.pop()
+            return
+
+        self.flush(t)
+        self._emit(t, "keyboard.press", key=name)
+        self.last_t = t
+
+
+def compile_macro(macro: MacroLog, intent: str = "Recorded macro", jitter_px: int = 3,
+                  min_pause: float = 0.5, double_click: float = 0.4) -> Dict[str, Any]:
+    """
+    Compile a recorded log into an action batch.
+
+    Pointer paths collapse to one mouse.move to their end point (moves
+    within `jitter_px` of the last emitted position are dropped), press and
+    release at the same spot become clicks or double clicks, otherwise a
+    drag. Consecutive printable keys merge into keyboard.type (backspace
+    edits the pending text), modifier combinations become keyboard.hotkey
+    and idle gaps of at least `min_pause` become system.sleep.
+
+    Args:
+        macro: Recorded MacroLog
+        intent: Intent attached to the batch
+        jitter_px: Pointer movement ignored as jitter
+        min_pause: Shortest gap kept as a system.sleep (seconds)
+        double_click: Max seconds between clicks merged into a double click
+
+    Returns:
+        {"intent": str, "actions": [...]}
+    """
+    c = _Compiler(jitter_px, min_pause, double_click)
+    c.pos = macro.origin
+    c.emitted_pos = macro.origin
+    t = 0.0
+    for kind, t, a, b in macro.decode():
+        if kind == MOVE:
+            c.on_move(t, a, b)
+        elif kind == BUTTON:
+            c.on_button(t, a, b)
+        elif kind == SCROLL:
+            c.on_scroll(t, b)
+        elif kind == KEY:
+            c.on_key(t, a, b)
+    c.flush(t)
+    return {"intent": intent, "actions": c.actions}
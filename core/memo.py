@@ -0,0 +1,214 @@
+"""
+Octopus Result Memo
+===================
+Serves repeated idempotent read actions (system.screen_size, file.read,
+file.list) from a bounded LRU instead of running them again.
+
+Every entry carries a validator that is re-checked on each hit:
+
+    file.read           mtime and size of the file
+    file.list           mtime of the directory, plus a short TTL because the
+                        listing also reports sizes of files modified in place
+    system.screen_size  a short TTL (displays can be reconfigured)
+
+system.info and file.exists are deliberately not memoized: running them
+costs no more than validating a cached answer (one stat call).
+
+Writes dispatched through the same Dispatcher (file.write, file.append,
+file.delete, network.download) drop the entries of the paths they touch
+immediately, so plans never read their own stale output.
+
+Author: Octopus Contributors
+License: MIT
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+from core.metrics import MEMO_LOOKUPS
+
+log = logging.getLogger("octopus.memo")
+
+DEFAULT_MAX_ENTRIES = 256
+# Larger files are read every time rather than pinned in memory
+MAX_FILE_BYTES = 1024 * 1024
+
+# type -> (validator kind, max age in seconds or None)
+IDEMPOTENT: Dict[str, Tuple[str, Optional[float]]] = {
+    "system.screen_size": ("static", 5.0),
+    "file.read": ("file", None),
+    "file.list": ("dir", 2.0),
+}
+# Actions that modify the workspace path in their 'path' param
+WRITES = {"file.write", "file.append", "file.delete", "network.download"}
+
+
+def _copy(value: Any) -> Any:
+    """Copy of nested dicts and lists (much cheaper than copy.deepcopy)."""
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy(v) for v in value]
+    return value
+
+
+def _key(action_type: str, params: Dict[str, Any]) -> Optional[Any]:
+    try:
+        key = (action_type, tuple(sorted(params.items())))
+        hash(key)
+        return key
+    except TypeError:
+        # Unhashable values (lists, dicts)
+        try:
+            return action_type, json.dumps(params, sort_keys=True)
+        except (TypeError, ValueError):
+            return None
+
+
+def _mtime(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class ResultMemo:
+    """
+    Bounded LRU of action results, validated on every hit.
+
+    Attributes:
+        stats: Counts of hits, misses, stale entries and invalidations
+    """
+
+    def __init__(self, executor, max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        Args:
+            executor: HumanExecutor whose workspace resolves file paths
+            max_entries: Results kept before the least recently used is dropped
+        """
+        self._executor = executor
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # key -> (resolved path or None, validator, stored at, result)
+        self._entries: "OrderedDict[Any, Tuple[Optional[str], Any, float, Dict[str, Any]]]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "stale": 0, "invalidations": 0}
+
+    @staticmethod
+    def handles(action_type: str) -> bool:
+        return action_type in IDEMPOTENT or action_type in WRITES
+
+    def _resolve(self, params: Dict[str, Any], default: Optional[str] = None) -> Optional[str]:
+        path = params.get("path", default)
+        if not isinstance(path, str):
+            return None
+        try:
+            return self._executor._check_path(path)
+        except PermissionError:
+            return None
+
+    def _validator(self, kind: str, path: Optional[str]) -> Any:
+        if kind in ("file", "dir"):
+            return _mtime(path)
+        return None
+
+    def _prepare(self, action_type: str, params: Dict[str, Any]):
+        """Key, resolved path and validator kind of a memoizable call (None if not)."""
+        kind, _ = IDEMPOTENT[action_type]
+        path = None
+        if kind != "static":
+            path = self._resolve(params, "." if kind == "dir" else None)
+            if path is None:
+                return None
+        key = _key(action_type, params)
+        if key is None:
+            return None
+        return key, path, kind
+
+    def get(self, action_type: str, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Cached result for an idempotent action, or None (then call put())."""
+        if action_type not in IDEMPOTENT:
+            return None
+        key = _key(action_type, params)
+        if key is None:
+            return None
+        kind, max_age = IDEMPOTENT[action_type]
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                MEMO_LOOKUPS.inc("miss")
+                return None
+            # The path was resolved when the entry was stored
+            path, validator, stored, result = entry
+            if (max_age is not None and time.monotonic() - stored > max_age) or \
+                    self._validator(kind, path) != validator:
+                del self._entries[key]
+                self.stats["stale"] += 1
+                MEMO_LOOKUPS.inc("stale")
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+        MEMO_LOOKUPS.inc("hit")
+        # Callers may mutate what they get back
+        return _copy(result)
+
+    def validator(self, action_type: str, params: Dict[str, Any]) -> Any:
+        """
+        Snapshot the validator before running the action; put() stores it, so a
+        change that races with the read makes the entry stale instead of wrong.
+        """
+        prepared = self._prepare(action_type, params) if action_type in IDEMPOTENT else None
+        if prepared is None:
+            return None
+        _, path, kind = prepared
+        return self._validator(kind, path)
+
+    def put(self, action_type: str, params: Dict[str, Any], result: Dict[str, Any], validator: Any) -> None:
+        """Store a successful result of an idempotent action."""
+        if action_type not in IDEMPOTENT or result.get("status") != "ok":
+            return
+        prepared = self._prepare(action_type, params)
+        if prepared is None:
+            return
+        key, path, kind = prepared
+        if kind == "file" and (validator is None or validator[1] > MAX_FILE_BYTES):
+            return
+        with self._lock:
+            self._entries[key] = (path, validator, time.monotonic(), _copy(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, action_type: str, params: Dict[str, Any]) -> None:
+        """Drop entries a write action may have changed."""
+        if action_type not in WRITES:
+            return
+        path = self._resolve(params)
+        with self._lock:
+            if path is None:
+                # Unknown target (e.g. a download named after its URL)
+                stale = [k for k, e in self._entries.items() if e[0] is not None]
+            else:
+                parent = os.path.dirname(path)
+                stale = [k for k, e in self._entries.items() if e[0] is not None and
+                         (e[0] == path or e[0] == parent or e[0].startswith(path + os.sep))]
+            for key in stale:
+                del self._entries[key]
+            self.stats["invalidations"] += len(stale)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters, size and hit rate."""
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"] + self.stats["stale"]
+            return dict(self.stats, entries=len(self._entries),
+                        hit_rate=round(self.stats["hits"] / lookups, 4) if lookups else None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
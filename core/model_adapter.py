@@ -9,12 +9,13 @@ License: MIT
 """
 
 import os
-import time
-import json
 import logging
 from abc import ABC, abstractmethod
 from typing import Dict, Any, Optional
 
+from core.clock import Clock, SYSTEM_CLOCK
+from core import codec
+
 log = logging.getLogger("octopus.adapter")
 
 
@@ -45,11 +46,12 @@ class MockAdapter(ModelAdapter):
     Used for testing the complete execution pipeline.
     """
 
-    def __init__(self):
+    def __init__(self, clock: Optional[Clock] = None):
         self._step = 0
+        self._clock = clock or SYSTEM_CLOCK
 
     def get_actions(self) -> Optional[Dict[str, Any]]:
-        time.sleep(0.5)  # Simulate fetch latency
+        self._clock.sleep(0.5)  # Simulate fetch latency
         self._step += 1
 
         if self._step == 1:
@@ -86,21 +88,24 @@ class FileAdapter(ModelAdapter):
     When found, reads and deletes the file (consume pattern).
     """
 
-    def __init__(self, workspace_path: str, trigger_file: str = "instruction.json"):
+    def __init__(self, workspace_path: str, trigger_file: str = "instruction.json",
+                 poll_interval: float = 0.5, clock: Optional[Clock] = None):
         self._trigger_path = os.path.join(workspace_path, trigger_file)
+        self._poll_interval = poll_interval
+        self._clock = clock or SYSTEM_CLOCK
 
     def get_actions(self) -> Optional[Dict[str, Any]]:
         if not os.path.exists(self._trigger_path):
-            time.sleep(0.5)
+            self._clock.sleep(self._poll_interval)
             return None
 
         try:
-            with open(self._trigger_path, "r", encoding="utf-8") as f:
-                batch = json.load(f)
+            with open(self._trigger_path, "rb") as f:
+                batch = codec.loads(f.read())
             os.remove(self._trigger_path)
             log.info(f"Loaded instruction from {self._trigger_path}")
             return batch
-        except json.JSONDecodeError as e:
+        except codec.DecodeError as e:
             log.error(f"Invalid JSON in instruction file: {e}")
             os.remove(self._trigger_path)
             return None
@@ -109,20 +114,22 @@ class FileAdapter(ModelAdapter):
             return None
 
 
-def create_adapter(adapter_name: str, workspace_path: str) -> ModelAdapter:
+def create_adapter(adapter_name: str, workspace_path: str,
+                   clock: Optional[Clock] = None) -> ModelAdapter:
     """
     Factory function to create adapter by name.
     
     Args:
         adapter_name: 'mock' or 'file'
         workspace_path: Path to workspace directory
+        clock: Time source for polling delays (default: real time)
         
     Returns:
         Configured ModelAdapter instance
     """
     adapters = {
-        "mock": lambda: MockAdapter(),
-        "file": lambda: FileAdapter(workspace_path),
+        "mock": lambda: MockAdapter(clock),
+        "file": lambda: FileAdapter(workspace_path, clock=clock),
     }
 
     if adapter_name in adapters:
@@ -130,4 +137,4 @@ def create_adapter(adapter_name: str, workspace_path: str) -> ModelAdapter:
         return adapters[adapter_name]()
 
     log.warning(f"Unknown adapter '{adapter_name}', defaulting to mock")
-    return MockAdapter()
+    return MockAdapter(clock)
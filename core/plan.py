@@ -0,0 +1,563 @@
+"""
+Octopus Plan Runner
+===================
+Local control flow for action batches, so loops and branches run without
+another round trip to the model.
+
+Control nodes sit in the action list next to ordinary actions:
+
+    {"type": "control.repeat", "params": {"times": 3, "actions": [...]}}
+    {"type": "control.for_each", "params": {"items": {"$ref": "ls.files"},
+                                            "as": "name", "actions": [...]}}
+    {"type": "control.if", "params": {"value": {"$ref": "chk.exists"}, "equals": true,
+                                      "then": [...], "else": [...]}}
+
+Any node may carry an "id"; its result is then available to later params:
+{"$ref": "id.field.0"} is replaced by the value itself and "${id.field}"
+is interpolated into strings as text. Loop variables ('index', 'item' or the name
+given by "as") and 'last' (the previous result) resolve the same way.
+"${...}" is only a reference when it starts with one of those names, so
+shell text such as "echo ${HOME}" passes through unchanged; "$${" always
+stands for a literal "${".
+
+Actions may also declare "depends_on" (an id or list of ids). A batch that
+does is run as a dependency graph by core.dag: independent actions execute
+concurrently and a failure skips its dependents. The same graph can be
+nested explicitly as {"type": "control.dag", "params": {"actions": [...]}};
+referencing another graph action's id implies a dependency on it.
+
+Plans are validated before anything runs, and every executed node counts
+against a step budget.
+
+Author: Octopus Contributors
+License: MIT
+"""
+
+import re
+import json
+import logging
+from typing import Dict, Any, Callable, List, Optional, Set
+
+from core.dag import DagExecutor, DagError, build_graph, DEFAULT_MAX_WORKERS
+
+log = logging.getLogger("octopus.plan")
+
+CONTROL_PREFIX = "control."
+CONTROL_TYPES = {"control.repeat", "control.for_each", "control.if", "control.dag"}
+DEFAULT_MAX_STEPS = 1000
+# Result fields compared by control.if
+CONDITIONS = ("equals", "not_equals", "contains", "gt", "gte", "lt", "lte")
+# Params of control nodes that hold nested action lists (resolved lazily)
+BODY_KEYS = ("actions", "then", "else")
+# Statuses that end the whole plan
+STOP_STATUSES = {"halted"}
+
+# "${path}" or, escaped, "$${path}"
+_TEMPLATE = re.compile(r"(\$?)\$\{([^}]+)\}")
+
+
+class PlanError(ValueError):
+    """Raised for an invalid plan or an unresolvable reference."""
+
+
+def _has_refs(value: Any) -> bool:
+    """True for $ref objects, templates naming 'last' and escaped templates."""
+    if isinstance(value, dict):
+        return "$ref" in value or any(_has_refs(v) for v in value.values())
+    if isinstance(value, list):
+        return any(_has_refs(v) for v in value)
+    if isinstance(value, str) and "${" in value:
+        return any(m.group(1) or _root(m) == "last" for m in _TEMPLATE.finditer(value))
+    return False
+
+
+def declared_names(actions: Any) -> Set[str]:
+    """Names a plan's templates may refer to: ids, loop variables and 'last'."""
+    names = {"last"}
+    if not isinstance(actions, list):
+        return names
+    for node in actions:
+        if not isinstance(node, dict):
+            continue
+        if isinstance(node.get("id"), str):
+            names.add(node["id"])
+        params = node.get("params")
+        if not isinstance(params, dict):
+            continue
+        if node.get("type") in ("control.repeat", "control.for_each"):
+            default = "index" if node["type"] == "control.repeat" else "item"
+            loop_var = params.get("as", default)
+            names |= {"index", loop_var} if isinstance(loop_var, str) else {"index"}
+        for key in BODY_KEYS:
+            names |= declared_names(params.get(key))
+    return names
+
+
+def uses_plan_features(actions: List[Any]) -> bool:
+    """True if a batch needs the PlanRunner (control nodes, ids, dependencies or references)."""
+    for action in actions:
+        if not isinstance(action, dict):
+            continue
+        if str(action.get("type", "")).startswith(CONTROL_PREFIX) or "id" in action:
+            return True
+        if "depends_on" in action:
+            return True
+        if _has_refs(action.get("params")):
+            return True
+    return False
+
+
+def as_plan(actions: List[Any]) -> List[Any]:
+    """
+    Wrap a batch that uses "depends_on" in a single control.dag node.
+
+    Other batches are returned unchanged.
+    """
+    if any(isinstance(a, dict) and "depends_on" in a for a in actions):
+        return [{"type": "control.dag", "params": {"actions": actions}}]
+    return actions
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# References
+# ─────────────────────────────────────────────────────────────────────────────
+
+def lookup(path: str, scope: Dict[str, Any]) -> Any:
+    """
+    Resolve a dotted path ('id.field.0') against the scope.
+
+    Raises:
+        PlanError: If any segment is missing
+    """
+    parts = path.strip().split(".")
+    if parts[0] not in scope:
+        raise PlanError(f"Unresolved reference '{path}': no result named '{parts[0]}'")
+    value = scope[parts[0]]
+    for part in parts[1:]:
+        if isinstance(value, dict) and part in value:
+            value = value[part]
+        elif isinstance(value, list) and part.lstrip("-").isdigit() and -len(value) <= int(part) < len(value):
+            value = value[int(part)]
+        else:
+            raise PlanError(f"Unresolved reference '{path}': no '{part}'")
+    return value
+
+
+def _root(match: "re.Match") -> str:
+    return match.group(2).strip().split(".")[0]
+
+
+def resolve(value: Any, scope: Dict[str, Any], names: Optional[Set[str]] = None) -> Any:
+    """
+    Substitute {"$ref": path} values and "${path}" templates.
+
+    Args:
+        value: Params (or part of them) to resolve
+        scope: Results and loop variables by name
+        names: Template roots that are references (default: the names in
+            scope); other "${...}" text is kept as is
+    """
+    if names is None:
+        names = set(scope)
+    if isinstance(value, dict):
+        if len(value) == 1 and "$ref" in value:
+            return lookup(str(value["$ref"]), scope)
+        return {k: resolve(v, scope, names) for k, v in value.items()}
+    if isinstance(value, list):
+        return [resolve(v, scope, names) for v in value]
+    if isinstance(value, str) and "${" in value:
+        def substitute(m: "re.Match") -> str:
+            if m.group(1):
+                return m.group(0)[1:]
+            if _root(m) not in names:
+                return m.group(0)
+            return _text(lookup(m.group(2), scope))
+        return _TEMPLATE.sub(substitute, value)
+    return value
+
+
+def _text(value: Any) -> str:
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False, default=str)
+    return str(value)
+
+
+def _ref_roots(value: Any, names: Set[str]) -> Set[str]:
+    """Names referenced by $ref objects and by templates whose root is in `names`."""
+    if isinstance(value, dict):
+        if len(value) == 1 and "$ref" in value:
+            return {str(value["$ref"]).split(".")[0]}
+        roots: Set[str] = set()
+        for v in value.values():
+            roots |= _ref_roots(v, names)
+        return roots
+    if isinstance(value, list):
+        roots = set()
+        for v in value:
+            roots |= _ref_roots(v, names)
+        return roots
+    if isinstance(value, str) and "${" in value:
+        return {_root(m) for m in _TEMPLATE.finditer(value) if not m.group(1) and _root(m) in names}
+    return set()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Validation
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _validate(actions: Any, where: str, names: Set[str], max_steps: int, declared: Set[str]) -> int:
+    """
+    Check a node list; returns its minimum step count. `names` grows with
+    ids, `declared` holds every name the whole plan declares.
+    """
+    if not isinstance(actions, list):
+        raise PlanError(f"{where}: expected a list of actions")
+    steps = 0
+    for i, node in enumerate(actions):
+        at = f"{where}[{i}]"
+        if not isinstance(node, dict) or not isinstance(node.get("type"), str) or not node["type"]:
+            raise PlanError(f"{at}: each action needs a 'type'")
+        params = node.get("params", {})
+        if not isinstance(params, dict):
+            raise PlanError(f"{at}: 'params' must be an object")
+        node_type = node["type"]
+
+        if not node_type.startswith(CONTROL_PREFIX):
+            unknown = _ref_roots(params, declared) - names
+            if unknown:
+                raise PlanError(f"{at}: reference to unknown result {sorted(unknown)}")
+            steps += 1
+        elif node_type not in CONTROL_TYPES:
+            raise PlanError(f"{at}: unknown control node '{node_type}'. Available: {sorted(CONTROL_TYPES)}")
+        else:
+            header = {k: v for k, v in params.items() if k not in BODY_KEYS}
+            unknown = _ref_roots(header, declared) - names
+            if unknown:
+                raise PlanError(f"{at}: reference to unknown result {sorted(unknown)}")
+            steps += 1 + _validate_control(node_type, params, at, names, max_steps, declared)
+
+        if "depends_on" in node:
+            raise PlanError(f"{at}: 'depends_on' is only allowed inside control.dag")
+        _check_id(node, at)
+        if "id" in node:
+            names.add(node["id"])
+        if steps > max_steps:
+            raise PlanError(f"Plan needs more than the step budget of {max_steps}")
+    return steps
+
+
+def _check_id(node: Dict[str, Any], at: str) -> None:
+    if "id" in node and (not isinstance(node["id"], str) or not node["id"].isidentifier()):
+        raise PlanError(f"{at}: 'id' must be an identifier")
+
+
+def _validate_dag(nodes: Any, at: str, names: Set[str], declared: Set[str]) -> int:
+    if not isinstance(nodes, list) or not nodes:
+        raise PlanError(f"{at}: control.dag needs a non-empty 'actions' list")
+    for i, node in enumerate(nodes):
+        where = f"{at}.actions[{i}]"
+        if not isinstance(node, dict) or not isinstance(node.get("type"), str) or not node["type"]:
+            raise PlanError(f"{where}: each action needs a 'type'")
+        if node["type"].startswith(CONTROL_PREFIX):
+            raise PlanError(f"{where}: control nodes cannot be part of a dependency graph")
+        if not isinstance(node.get("params", {}), dict):
+            raise PlanError(f"{where}: 'params' must be an object")
+        _check_id(node, where)
+    ids = {node["id"] for node in nodes if "id" in node}
+    roots = [_ref_roots(node.get("params", {}), declared) for node in nodes]
+    for i, refs in enumerate(roots):
+        unknown = refs - names - ids
+        if unknown:
+            raise PlanError(f"{at}.actions[{i}]: reference to unknown result {sorted(unknown)}")
+    try:
+        build_graph(nodes, roots)
+    except DagError as e:
+        raise PlanError(f"{at}.{e}")
+    names |= ids
+    return len(nodes)
+
+
+def _validate_control(node_type: str, params: Dict[str, Any], at: str,
+                      names: Set[str], max_steps: int, declared: Set[str]) -> int:
+    if node_type == "control.dag":
+        return _validate_dag(params.get("actions"), at, names, declared)
+    if node_type == "control.if":
+        if "value" not in params:
+            raise PlanError(f"{at}: control.if needs 'value'")
+        if len([c for c in CONDITIONS if c in params]) > 1:
+            raise PlanError(f"{at}: use at most one of {list(CONDITIONS)}")
+        then_steps = _validate(params.get("then", []), f"{at}.then", names, max_steps, declared)
+        else_steps = _validate(params.get("else", []), f"{at}.else", names, max_steps, declared)
+        return min(then_steps, else_steps)
+
+    loop_var = params.get("as", "index" if node_type == "control.repeat" else "item")
+    if not isinstance(loop_var, str) or not loop_var.isidentifier():
+        raise PlanError(f"{at}: 'as' must be an identifier")
+    if node_type == "control.repeat":
+        times = params.get("times")
+        if isinstance(times, bool) or not isinstance(times, (int, dict, str)):
+            raise PlanError(f"{at}: control.repeat needs integer 'times'")
+        if isinstance(times, int) and times < 0:
+            raise PlanError(f"{at}: 'times' must be >= 0")
+        count = times if isinstance(times, int) else 0
+    else:
+        items = params.get("items")
+        if not isinstance(items, (list, dict, str)):
+            raise PlanError(f"{at}: control.for_each needs 'items' (a list or reference)")
+        count = len(items) if isinstance(items, list) else 0
+
+    body = params.get("actions")
+    if not body:
+        raise PlanError(f"{at}: {node_type} needs a non-empty 'actions' list")
+    inner = names | {loop_var, "index"}
+    body_steps = _validate(body, f"{at}.actions", inner, max_steps, declared)
+    # Ids set inside the loop stay visible afterwards (last iteration's result)
+    names |= inner - {loop_var, "index"} - names
+    return count * body_steps
+
+
+def validate_plan(actions: List[Any], max_steps: int = DEFAULT_MAX_STEPS) -> int:
+    """
+    Check structure, references and the static step estimate of a plan.
+
+    Returns:
+        Minimum number of steps the plan will take
+
+    Raises:
+        PlanError: Describing the first problem found
+    """
+    return _validate(actions, "actions", {"last"}, max_steps, declared_names(actions))
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Execution
+# ─────────────────────────────────────────────────────────────────────────────
+
+class _Stop(Exception):
+    """Unwinds nested control nodes when the plan must end."""
+
+
+def _condition(params: Dict[str, Any]) -> bool:
+    value = params["value"]
+    try:
+        if "equals" in params:
+            return value == params["equals"]
+        if "not_equals" in params:
+            return value != params["not_equals"]
+        if "contains" in params:
+            return params["contains"] in value
+        if "gt" in params:
+            return value > params["gt"]
+        if "gte" in params:
+            return value >= params["gte"]
+        if "lt" in params:
+            return value < params["lt"]
+        if "lte" in params:
+            return value <= params["lte"]
+    except TypeError as e:
+        raise PlanError(f"Cannot compare {value!r}: {e}")
+    return bool(value)
+
+
+class PlanRunner:
+    """
+    Executes a validated plan through a dispatch callable.
+
+    One runner holds the scope of one batch: results of nodes with an id,
+    loop variables and 'last'. Once the step budget is spent, a halt is
+    seen or the agent is told to exit, remaining nodes are skipped.
+    """
+
+    def __init__(self, dispatch: Callable[[Dict[str, Any]], Dict[str, Any]],
+                 max_steps: int = DEFAULT_MAX_STEPS,
+                 should_stop: Optional[Callable[[], bool]] = None,
+                 max_workers: int = DEFAULT_MAX_WORKERS):
+        """
+        Args:
+            dispatch: Executes one ordinary action and returns its result;
+                must be thread-safe when the plan contains a dependency graph
+            max_steps: Budget of executed nodes (actions and control nodes)
+            should_stop: Polled before each node; True ends the plan
+            max_workers: Concurrent actions within a dependency graph
+        """
+        self._dispatch = dispatch
+        self.max_steps = max_steps
+        self.max_workers = max_workers
+        self._should_stop = should_stop
+        self.scope: Dict[str, Any] = {}
+        # Template roots treated as references (grows with each top-level node)
+        self.names: Set[str] = {"last"}
+        self.steps = 0
+        self.errors = 0
+        self.stopped: Optional[str] = None
+        self._stop_status = "ok"
+
+    def execute(self, node: Dict[str, Any]) -> Dict[str, Any]:
+        """Run one top-level node (ordinary action or control node)."""
+        if self.stopped:
+            return {"status": "skipped", "message": f"Plan stopped: {self.stopped}"}
+        self.names |= declared_names([node])
+        try:
+            return self._node(node)
+        except _Stop:
+            return {"status": self._stop_status, "message": f"Plan stopped: {self.stopped}"}
+
+    def run(self, actions: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Validate and run a whole plan.
+
+        Returns:
+            Summary dict with status, message, steps and top-level results
+        """
+        actions = as_plan(actions)
+        try:
+            validate_plan(actions, self.max_steps)
+        except PlanError as e:
+            return {"status": "error", "message": f"Invalid plan: {e}", "steps": 0, "results": []}
+        results = [self.execute(node) for node in actions]
+        status = self._stop_status if self.stopped else "ok"
+        if status == "ok" and self.errors:
+            status = "error"
+        message = f"Plan ran {self.steps} steps"
+        if self.stopped:
+            message += f" (stopped: {self.stopped})"
+        elif self.errors:
+            message += f" with {self.errors} errors"
+        return {"status": status, "message": message, "steps": self.steps, "results": results}
+
+    def _stop(self, reason: str, status: str) -> None:
+        self.stopped = reason
+        self._stop_status = status
+
+    def _step(self) -> None:
+        if self._should_stop and self._should_stop():
+            self._stop("halt requested", "halted")
+            raise _Stop()
+        if self.steps >= self.max_steps:
+            self._stop(f"step budget of {self.max_steps} exhausted", "error")
+            raise _Stop()
+        self.steps += 1
+
+    def _finish(self, result: Dict[str, Any]) -> None:
+        """Bookkeeping after an ordinary action ran."""
+        self.scope["last"] = result
+        if result.get("status") != "ok":
+            self.errors += 1
+        if result.get("message") == "EXIT_SIGNAL":
+            self._stop("exit signal", "ok")
+        elif result.get("status") in STOP_STATUSES:
+            self._stop(f"action {result.get('status')}", result.get("status"))
+
+    def _node(self, node: Dict[str, Any]) -> Dict[str, Any]:
+        self._step()
+        node_type = node.get("type", "")
+        if node_type.startswith(CONTROL_PREFIX):
+            result = self._control(node_type, node.get("params", {}))
+        else:
+            try:
+                action = dict(node, params=resolve(node.get("params", {}), self.scope, self.names))
+            except PlanError as e:
+                result = {"status": "error", "message": str(e)}
+            else:
+                action.pop("id", None)
+                result = self._dispatch(action)
+            self._finish(result)
+
+        if node.get("id"):
+            self.scope[node["id"]] = result
+        if self.stopped:
+            raise _Stop()
+        return result
+
+    def _body(self, body: List[Dict[str, Any]]) -> int:
+        """Run nested nodes; returns the number that failed."""
+        before = self.errors
+        for child in body:
+            self._node(child)
+        return self.errors - before
+
+    def _dag(self, nodes: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Run a dependency graph; each of its actions counts as one step."""
+        if self.steps + len(nodes) > self.max_steps:
+            self._stop(f"step budget of {self.max_steps} exhausted", "error")
+            raise _Stop()
+        self.steps += len(nodes)
+        roots = [_ref_roots(node.get("params", {}), self.names) for node in nodes]
+        try:
+            deps = build_graph(nodes, roots)
+        except DagError as e:
+            return {"status": "error", "message": str(e)}
+
+        # Workers only read this snapshot plus the results of their dependencies
+        base = dict(self.scope)
+
+        def prepare(i: int, results: List[Optional[Dict[str, Any]]]) -> Dict[str, Any]:
+            scope = dict(base)
+            for j in deps[i]:
+                if "id" in nodes[j]:
+                    scope[nodes[j]["id"]] = results[j]
+            action = dict(nodes[i], params=resolve(nodes[i].get("params", {}), scope, self.names))
+            action.pop("id", None)
+            action.pop("depends_on", None)
+            return action
+
+        results = DagExecutor(self._dispatch, self.max_workers, self._should_stop).run(nodes, deps, prepare)
+        skipped = 0
+        for node, result in zip(nodes, results):
+            if result.get("status") == "skipped":
+                skipped += 1
+            elif not self.stopped:
+                self._finish(result)
+            if node.get("id"):
+                self.scope[node["id"]] = result
+        failed = sum(1 for r in results if r.get("status") not in ("ok", "skipped"))
+        return {"status": "error" if failed or skipped else "ok", "results": results,
+                "message": f"dag: {len(nodes)} actions, {failed} failed, {skipped} skipped"}
+
+    def _control(self, node_type: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        if node_type == "control.dag":
+            return self._dag(params["actions"])
+        try:
+            header = resolve({k: v for k, v in params.items() if k not in BODY_KEYS}, self.scope, self.names)
+        except PlanError as e:
+            return {"status": "error", "message": str(e)}
+
+        if node_type == "control.if":
+            try:
+                branch = "then" if _condition(header) else "else"
+            except PlanError as e:
+                return {"status": "error", "message": str(e)}
+            body = params.get(branch, [])
+            failed = self._body(body)
+            return {"status": "error" if failed else "ok", "branch": branch,
+                    "message": f"Condition {'true' if branch == 'then' else 'false'}: "
+                               f"ran {len(body)} actions from '{branch}'"}
+
+        if node_type == "control.repeat":
+            try:
+                items = range(int(header["times"]))
+            except (TypeError, ValueError):
+                return {"status": "error", "message": f"Invalid 'times': {header.get('times')!r}"}
+            loop_var = header.get("as", "index")
+        else:
+            items = header.get("items")
+            if isinstance(items, dict):
+                items = list(items.items())
+            if not isinstance(items, list):
+                return {"status": "error", "message": f"'items' is not a list: {type(items).__name__}"}
+            loop_var = header.get("as", "item")
+
+        saved = {k: self.scope[k] for k in (loop_var, "index") if k in self.scope}
+        failed = iterations = 0
+        try:
+            for index, item in enumerate(items):
+                self.scope["index"] = index
+                self.scope[loop_var] = item
+                failed += self._body(params["actions"])
+                iterations += 1
+        finally:
+            for k in (loop_var, "index"):
+                self.scope.pop(k, None)
+            self.scope.update(saved)
+        return {"status": "error" if failed else "ok", "iterations": iterations, "errors": failed,
+                "message": f"{node_type.split('.', 1)[1]}: {iterations} iterations, {failed} errors"}
@@ -0,0 +1,267 @@
+"""
+Octopus Run Recording
+=====================
+Execution traces of real runs and a replayer for regression and
+performance testing.
+
+A recording is NDJSON (gzip-compressed when the path ends in '.gz'), one
+event per line:
+
+    {"ev": "header", "version": 1, "ts": 1700000000.0, "source": "agent"}
+    {"ev": "batch", "seq": 0, "t": 0.0012, "id": "a1b2c3", "intent": "...", "size": 2}
+    {"ev": "action", "seq": 1, "t": 0.0020, "batch": "a1b2c3",
+     "action": {"type": "...", "params": {...}}, "dur": 0.0003,
+     "result": {"status": "ok", "message": "..."}}
+
+`t` is seconds since the recording started. Actions are stored in full so
+they can be re-dispatched; results are stored as returned.
+
+Replay does not repeat effects outside the executor by default: actions in
+SIDE_EFFECTS (network requests and downloads, killing processes, clipboard
+and file changes) are skipped and their recorded result stands in, unless
+the caller opts in to running them for real.
+
+Author: Octopus Contributors
+License: MIT
+"""
+
+import os
+import gzip
+import time
+import logging
+import threading
+from typing import Dict, Any, Iterator, List, Optional, Sequence
+
+from core.clock import Clock, VirtualClock, SYSTEM_CLOCK
+from core import codec
+
+log = logging.getLogger("octopus.recording")
+
+FORMAT_VERSION = 1
+# Result fields compared during replay unless told otherwise
+DEFAULT_COMPARE = ("status", "message")
+# Skills or action types whose effects reach beyond the replay; skipped
+# unless passed in RunReplayer(side_effects=...)
+SIDE_EFFECTS = frozenset({
+    "network", "process.kill", "clipboard.write", "clipboard.clear",
+    "file.write", "file.append", "file.delete",
+})
+
+
+def _open(path: str, mode: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class RunRecorder:
+    """
+    Appends batches, actions and results of a run to a recording file.
+
+    Safe to share between threads; each event is written as one line.
+    """
+
+    def __init__(self, path: str, source: str = "agent", clock: Optional[Clock] = None):
+        """
+        Args:
+            path: Output file ('.gz' suffix enables compression)
+            source: Label for what produced the run ('agent', 'cli', ...)
+            clock: Time source for event offsets (default: real time)
+        """
+        self.path = os.path.abspath(path)
+        self._clock = clock or SYSTEM_CLOCK
+        record_dir = os.path.dirname(self.path)
+        if record_dir:
+            os.makedirs(record_dir, exist_ok=True)
+
+        self._file = _open(self.path, "w")
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._origin = self._clock.monotonic()
+        self._write({"ev": "header", "version": FORMAT_VERSION,
+                     "ts": round(self._clock.time(), 3), "source": source})
+
+    def _write(self, event: Dict[str, Any]) -> None:
+        with self._lock:
+            if self._file is None:
+                return
+            if event["ev"] != "header":
+                event["seq"] = self._seq
+                self._seq += 1
+            self._file.write(codec.dumps(event) + "\n")
+
+    def offset(self) -> float:
+        """Seconds since the recording started (use for action start times)."""
+        return self._clock.monotonic() - self._origin
+
+    def record_batch(self, batch_id: str, intent: Optional[str], size: int) -> None:
+        """Record a batch received from the adapter."""
+        self._write({"ev": "batch", "t": round(self.offset(), 6),
+                     "id": batch_id, "intent": intent, "size": size})
+
+    def record_action(self, action: Dict[str, Any], result: Dict[str, Any],
+                      started: float, duration: float, batch: Optional[str] = None) -> None:
+        """
+        Record one dispatched action.
+
+        Args:
+            action: Action as dispatched
+            result: Result dictionary
+            started: Start time as returned by offset()
+            duration: Execution time in seconds
+            batch: Batch identifier
+        """
+        self._write({"ev": "action", "t": round(started, 6), "batch": batch,
+                     "action": action, "dur": round(duration, 6), "result": result})
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self) -> "RunRecorder":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def read_recording(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Yield events from a recording file.
+
+    Raises:
+        ValueError: If the file is not a recording or has a newer format
+    """
+    with _open(path, "r") as f:
+        first = f.readline()
+        try:
+            header = codec.loads(first) if first.strip() else {}
+        except codec.DecodeError:
+            header = {}
+        if header.get("ev") != "header":
+            raise ValueError(f"Not an Octopus recording: {path}")
+        if header.get("version", 0) > FORMAT_VERSION:
+            raise ValueError(f"Unsupported recording version {header.get('version')}")
+        yield header
+        for line_no, line in enumerate(f, start=2):
+            if not line.strip():
+                continue
+            try:
+                yield codec.loads(line)
+            except codec.DecodeError:
+                # A run killed mid-write leaves a truncated last line
+                log.warning(f"Skipping unreadable event at {path}:{line_no}")
+
+
+class RunReplayer:
+    """
+    Re-drives a Dispatcher with the actions of a recording and diffs results.
+
+    With speed=0 actions run back to back; otherwise the recorded start
+    times are honoured, divided by `speed` (2.0 replays twice as fast).
+    The default executor uses the null input backend and a VirtualClock, so
+    recorded pauses (system.sleep, pacing intervals) cost no wall time.
+    Actions with side effects (SIDE_EFFECTS) are not dispatched unless
+    listed in `side_effects`; they count as skipped, not as matched.
+    """
+
+    def __init__(self, path: str, dispatcher=None, speed: float = 0.0,
+                 workspace: str = "workspace", backend: str = "null",
+                 compare: Sequence[str] = DEFAULT_COMPARE, side_effects: Sequence[str] = ()):
+        """
+        Args:
+            path: Recording file
+            dispatcher: Dispatcher to drive (default: one over a fresh
+                HumanExecutor with `backend` and a VirtualClock)
+            speed: Replay speed multiplier (0 = as fast as possible)
+            workspace: Workspace for the default executor
+            backend: Input backend for the default executor
+            compare: Result fields that must match the recording
+            side_effects: Skills or action types from SIDE_EFFECTS to run
+                for real ('*' for all of them)
+        """
+        if speed < 0:
+            raise ValueError("speed must be >= 0")
+        self.path = path
+        self.speed = speed
+        self.compare = tuple(compare)
+        self.side_effects = frozenset(side_effects)
+        if dispatcher is None:
+            from core.executor.human_executor import HumanExecutor
+            from core.dispatcher import Dispatcher
+            executor = HumanExecutor(workspace, backend=backend, clock=VirtualClock())
+            executor.min_interval = 0.0
+            dispatcher = Dispatcher(executor)
+        self._dispatcher = dispatcher
+
+    def _skip(self, action_type: str) -> bool:
+        """True if the action has side effects the caller did not opt in to."""
+        if "*" in self.side_effects:
+            return False
+        keys = (action_type, action_type.split(".", 1)[0])
+        return any(k in SIDE_EFFECTS for k in keys) and not any(k in self.side_effects for k in keys)
+
+    def _diff(self, expected: Dict[str, Any], actual: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            key: {"expected": expected.get(key), "actual": actual.get(key)}
+            for key in self.compare
+            if expected.get(key) != actual.get(key)
+        }
+
+    def run(self, max_mismatches: int = 100) -> Dict[str, Any]:
+        """
+        Replay the recording.
+
+        Args:
+            max_mismatches: Mismatch details kept in the report
+
+        Returns:
+            Report dict with status ('ok' when every replayed result
+            matched), counts, recorded vs replayed duration and mismatches
+        """
+        actions = matched = skipped = 0
+        mismatches: List[Dict[str, Any]] = []
+        recorded_end = 0.0
+        started = time.perf_counter()
+
+        for event in read_recording(self.path):
+            if event.get("ev") != "action":
+                continue
+            if self.speed > 0:
+                delay = event.get("t", 0.0) / self.speed - (time.perf_counter() - started)
+                if delay > 0:
+                    time.sleep(delay)
+
+            action = event.get("action") or {}
+            expected = event.get("result") or {}
+            actions += 1
+            recorded_end = max(recorded_end, event.get("t", 0.0) + event.get("dur", 0.0))
+            if self._skip(str(action.get("type", ""))):
+                skipped += 1
+                continue
+            actual = self._dispatcher.dispatch(action)
+
+            diff = self._diff(expected, actual)
+            if diff:
+                if len(mismatches) < max_mismatches:
+                    mismatches.append({"seq": event.get("seq"), "type": action.get("type"),
+                                       "diff": diff})
+            else:
+                matched += 1
+
+        replayed = time.perf_counter() - started
+        failed = actions - skipped - matched
+        return {
+            "status": "ok" if failed == 0 else "error",
+            "message": f"{matched}/{actions - skipped} results matched, {skipped} skipped",
+            "actions": actions,
+            "matched": matched,
+            "mismatched": failed,
+            "skipped": skipped,
+            "recorded_seconds": round(recorded_end, 6),
+            "replayed_seconds": round(replayed, 6),
+            "speedup": round(recorded_end / replayed, 1) if replayed > 0 else None,
+            "mismatches": mismatches,
+        }
@@ -0,0 +1,248 @@
+"""
+Octopus Session Scheduler
+=========================
+Shares the one desktop between concurrent sessions (dashboard users, API
+clients).
+
+A batch that touches an input device (mouse, keyboard, clipboard) must
+hold the exclusive input lease for its whole run, so two sessions never
+interleave clicks and keystrokes on the same screen. Batches that only
+use files, network or processes take a shared lease and run concurrently.
+
+When several sessions wait for the input lease, it is granted by weighted
+round-robin: each session in turn gets up to `weight` consecutive batches,
+so a session with a long backlog cannot starve the others. Time spent
+waiting is exported as octopus_session_lease_wait_seconds.
+
+Author: Octopus Contributors
+License: MIT
+"""
+
+import time
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, Any, Callable, ContextManager, Deque, Iterator, List, Optional
+from contextlib import contextmanager, nullcontext
+
+from core.dag import is_exclusive
+from core.metrics import LEASE_WAIT, LEASE_WAITERS, LEASES_TOTAL
+
+log = logging.getLogger("octopus.scheduler")
+
+DEFAULT_SESSION = "default"
+DEFAULT_WEIGHT = 1
+# Per-session statistics kept for this many most recently active sessions
+MAX_SESSIONS = 1000
+# How often a waiter checks its cancel event (seconds)
+CANCEL_POLL_INTERVAL = 0.1
+
+INPUT, SHARED = "input", "shared"
+
+
+class LeaseCancelled(Exception):
+    """Raised when a waiter's cancel event is set before it gets the lease."""
+
+
+def uses_input(actions: Any) -> bool:
+    """True if any action in a batch or plan (at any depth) uses an input device."""
+    if isinstance(actions, dict):
+        if isinstance(actions.get("type"), str) and is_exclusive(actions):
+            return True
+        return any(uses_input(v) for v in actions.values() if isinstance(v, (dict, list)))
+    if isinstance(actions, list):
+        return any(uses_input(a) for a in actions)
+    return False
+
+
+def parse_weights(spec: str) -> Dict[str, int]:
+    """Parse 'alice=3,bob=1' into {'alice': 3, 'bob': 1}."""
+    weights = {}
+    for item in filter(None, (p.strip() for p in spec.split(","))):
+        session, _, weight = item.partition("=")
+        try:
+            weights[session.strip()] = max(1, int(weight))
+        except ValueError:
+            log.warning(f"Ignoring invalid session weight '{item}'")
+    return weights
+
+
+class _Waiter:
+    __slots__ = ("session", "granted", "since")
+
+    def __init__(self, session: str):
+        self.session = session
+        self.granted = threading.Event()
+        self.since = time.monotonic()
+
+
+class SessionScheduler:
+    """
+    Exclusive input lease with weighted round-robin hand-off.
+
+    Attributes:
+        holder: Session holding the input lease, or None
+    """
+
+    def __init__(self, weights: Optional[Dict[str, int]] = None, default_weight: int = DEFAULT_WEIGHT):
+        """
+        Args:
+            weights: Session -> consecutive grants per round (default 1 each)
+            default_weight: Weight of sessions not listed in `weights`
+        """
+        self.weights = dict(weights or {})
+        self.default_weight = max(1, default_weight)
+        self.holder: Optional[str] = None
+        self._lock = threading.Lock()
+        # Round-robin ring: session -> its waiters in arrival order
+        self._ring: "OrderedDict[str, Deque[_Waiter]]" = OrderedDict()
+        self._current: Optional[str] = None
+        self._credit = 0
+        self._waiting = 0
+        self._stats: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        LEASE_WAITERS.set_function(lambda: self._waiting)
+
+    def weight(self, session: str) -> int:
+        return self.weights.get(session, self.default_weight)
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # Leases
+    # ─────────────────────────────────────────────────────────────────────────
+
+    @contextmanager
+    def lease(self, session: str, exclusive: bool, cancel: Optional[threading.Event] = None,
+              waiting: Optional[Callable[[], ContextManager]] = None) -> Iterator[float]:
+        """
+        Hold the input lease (exclusive) or a shared lease for a batch.
+
+        Yields the seconds spent waiting.
+
+        Args:
+            waiting: Context entered only while blocked on the lease (e.g.
+                JobManager.waiting, so the worker's slot is handed on)
+
+        Raises:
+            LeaseCancelled: If `cancel` is set while waiting
+        """
+        waited = self.acquire(session, exclusive, cancel, waiting)
+        try:
+            yield waited
+        finally:
+            self.release(session, exclusive)
+
+    def acquire(self, session: str, exclusive: bool, cancel: Optional[threading.Event] = None,
+                waiting: Optional[Callable[[], ContextManager]] = None) -> float:
+        """Block until the lease is granted; returns the seconds waited."""
+        resource = INPUT if exclusive else SHARED
+        if not exclusive:
+            with self._lock:
+                self._session(session)["shared"] += 1
+            self._granted(session, resource, 0.0)
+            return 0.0
+
+        waiter = _Waiter(session)
+        with self._lock:
+            if self.holder is None and not self._ring:
+                self.holder = session
+                waiter.granted.set()
+            else:
+                self._ring.setdefault(session, deque()).append(waiter)
+                self._waiting += 1
+        with (waiting() if waiting and not waiter.granted.is_set() else nullcontext()):
+            while not waiter.granted.wait(CANCEL_POLL_INTERVAL if cancel is not None else None):
+                if cancel.is_set():
+                    with self._lock:
+                        if not waiter.granted.is_set():
+                            self._withdraw(waiter)
+                            LEASES_TOTAL.inc(resource, "cancelled")
+                            raise LeaseCancelled(f"Session '{session}' cancelled while waiting for input")
+                    break
+        waited = time.monotonic() - waiter.since
+        self._granted(session, resource, waited)
+        if waited > 1.0:
+            log.info(f"Session '{session}' got the input lease after {waited:.1f}s")
+        return waited
+
+    def release(self, session: str, exclusive: bool) -> None:
+        with self._lock:
+            if not exclusive:
+                self._session(session)["shared"] -= 1
+                return
+            if self.holder != session:
+                log.warning(f"Session '{session}' released an input lease it does not hold")
+                return
+            self.holder = None
+            self._grant_next()
+
+    def _withdraw(self, waiter: _Waiter) -> None:
+        """Remove a waiter that gave up (lock held)."""
+        waiters = self._ring.get(waiter.session)
+        if waiters is None:
+            return
+        waiters.remove(waiter)
+        self._waiting -= 1
+        if not waiters:
+            del self._ring[waiter.session]
+            if self._current == waiter.session:
+                self._current = None
+
+    def _grant_next(self) -> None:
+        """Hand the input lease to the next waiter by weighted round-robin (lock held)."""
+        if not self._ring:
+            return
+        session, waiters = next(iter(self._ring.items()))
+        if session != self._current or self._credit <= 0:
+            self._current, self._credit = session, self.weight(session)
+        waiter = waiters.popleft()
+        self._waiting -= 1
+        self._credit -= 1
+        if not waiters:
+            # Rejoins at the back of the ring when it next waits
+            del self._ring[session]
+            self._current = None
+        elif self._credit <= 0:
+            self._ring.move_to_end(session)
+        self.holder = session
+        waiter.granted.set()
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # Statistics
+    # ─────────────────────────────────────────────────────────────────────────
+
+    def _session(self, session: str) -> Dict[str, Any]:
+        """Stats record of a session, most recently active last (lock held)."""
+        stats = self._stats.get(session)
+        if stats is None:
+            stats = self._stats[session] = {"granted": 0, "shared": 0, "wait_total_s": 0.0, "wait_max_s": 0.0}
+            while len(self._stats) > MAX_SESSIONS:
+                self._stats.popitem(last=False)
+        self._stats.move_to_end(session)
+        return stats
+
+    def _granted(self, session: str, resource: str, waited: float) -> None:
+        LEASE_WAIT.observe(waited, resource)
+        LEASES_TOTAL.inc(resource, "granted")
+        if resource == INPUT:
+            with self._lock:
+                stats = self._session(session)
+                stats["granted"] += 1
+                stats["wait_total_s"] += waited
+                stats["wait_max_s"] = max(stats["wait_max_s"], waited)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Lease holder, waiters per session and per-session wait statistics."""
+        with self._lock:
+            sessions: List[Dict[str, Any]] = []
+            for name, stats in reversed(self._stats.items()):
+                granted = stats["granted"]
+                sessions.append({
+                    "session": name,
+                    "weight": self.weight(name),
+                    "waiting": len(self._ring.get(name, ())),
+                    "input_leases": granted,
+                    "active_shared": stats["shared"],
+                    "avg_wait_s": round(stats["wait_total_s"] / granted, 3) if granted else None,
+                    "max_wait_s": round(stats["wait_max_s"], 3),
+                })
+            return {"holder": self.holder, "waiting": self._waiting,
+                    "sessions": sessions}
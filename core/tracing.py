@@ -0,0 +1,256 @@
+"""
+Octopus Tracing
+===============
+Lightweight spans with context propagation across the API, LLMEngine,
+Dispatcher and HumanExecutor, exported to a local file for trace viewers.
+
+Tracing is off unless an output file is configured, either with
+Tracer.configure() or the OCTOPUS_TRACE_FILE environment variable. Child
+processes (the CLI spawned by the API) inherit the file through the
+environment and continue the caller's trace via OCTOPUS_TRACEPARENT, so one
+request renders as a single waterfall.
+
+Formats (OCTOPUS_TRACE_FORMAT):
+    chrome - Chrome trace event JSON array (chrome://tracing, Perfetto)
+    otlp   - One OTLP/JSON ExportTraceServiceRequest per line
+
+Author: Octopus Contributors
+License: MIT
+"""
+
+import os
+import json
+import time
+import logging
+import secrets
+import threading
+import contextvars
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Any, List, Optional
+
+log = logging.getLogger("octopus.tracing")
+
+TRACE_FILE_ENV = "OCTOPUS_TRACE_FILE"
+TRACE_FORMAT_ENV = "OCTOPUS_TRACE_FORMAT"
+TRACEPARENT_ENV = "OCTOPUS_TRACEPARENT"
+
+_NULL_SPAN = nullcontext()
+# Flush early once this many spans are pending (long-running root spans)
+MAX_BUFFERED_SPANS = 1000
+
+
+class Span:
+    """A timed operation within a trace."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns",
+                 "attrs", "tid", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attrs: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attrs = attrs
+        self.tid = threading.get_ident()
+        self.error: Optional[str] = None
+
+    def set(self, key: str, value: Any) -> None:
+        """Attach an attribute after the span started."""
+        self.attrs[key] = value
+
+    @property
+    def traceparent(self) -> str:
+        """W3C traceparent header value identifying this span."""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+
+class _RemoteParent:
+    """Parent context received from another process."""
+
+    __slots__ = ("trace_id", "span_id")
+
+    def __init__(self, trace_id: str, span_id: str):
+        self.trace_id = trace_id
+        self.span_id = span_id
+
+
+_current: contextvars.ContextVar = contextvars.ContextVar("octopus_span", default=None)
+
+
+class Tracer:
+    """
+    Collects finished spans and appends them to the trace file.
+
+    Spans are buffered in memory and written when the outermost in-process
+    span of a trace ends.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._path: Optional[str] = None
+        self._format = "chrome"
+        self._service = "octopus"
+        self._buffer: List[Span] = []
+        self._lock = threading.Lock()
+        self._announced = False
+
+    def configure(self, path: Optional[str], fmt: str = "chrome", service: Optional[str] = None) -> None:
+        """
+        Enable (or disable with path=None) span export.
+
+        Args:
+            path: Output file; appended to by every traced process
+            fmt: 'chrome' or 'otlp'
+            service: Process label shown in the viewer
+        """
+        if fmt not in ("chrome", "otlp"):
+            raise ValueError(f"Unknown trace format: '{fmt}'")
+        self._path = os.path.abspath(path) if path else None
+        self._format = fmt
+        if service:
+            self._service = service
+        self.enabled = bool(path)
+        if path:
+            trace_dir = os.path.dirname(self._path)
+            if trace_dir:
+                os.makedirs(trace_dir, exist_ok=True)
+
+    def configure_from_env(self, service: Optional[str] = None) -> None:
+        """Apply OCTOPUS_TRACE_FILE/OCTOPUS_TRACE_FORMAT and adopt OCTOPUS_TRACEPARENT."""
+        path = os.environ.get(TRACE_FILE_ENV)
+        if path:
+            self.configure(path, os.environ.get(TRACE_FORMAT_ENV, "chrome"), service)
+            self.attach(os.environ.get(TRACEPARENT_ENV))
+
+    def attach(self, traceparent: Optional[str]) -> None:
+        """Continue a trace started elsewhere (W3C traceparent format)."""
+        if not traceparent:
+            return
+        parts = traceparent.split("-")
+        if len(parts) == 4 and len(parts[1]) == 32 and len(parts[2]) == 16:
+            _current.set(_RemoteParent(parts[1], parts[2]))
+
+    def current(self) -> Optional[Span]:
+        """Innermost active span in this context, if any."""
+        span = _current.get()
+        return span if isinstance(span, Span) else None
+
+    def child_env(self) -> Dict[str, str]:
+        """Environment variables that let a subprocess join the current trace."""
+        if not self.enabled:
+            return {}
+        env = {TRACE_FILE_ENV: self._path, TRACE_FORMAT_ENV: self._format}
+        span = self.current()
+        if span:
+            env[TRACEPARENT_ENV] = span.traceparent
+        return env
+
+    def span(self, name: str, **attrs):
+        """
+        Context manager timing a block as a child of the current span.
+
+        Returns a shared no-op context when tracing is disabled.
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return self._span(name, attrs)
+
+    @contextmanager
+    def _span(self, name: str, attrs: Dict[str, Any]):
+        parent = _current.get()
+        trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        span = Span(name, trace_id, parent.span_id if parent else None, attrs)
+        token = _current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.end_ns = time.time_ns()
+            _current.reset(token)
+            with self._lock:
+                self._buffer.append(span)
+                pending = len(self._buffer)
+            # Outermost local span: write the trace out
+            if not isinstance(parent, Span) or pending >= MAX_BUFFERED_SPANS:
+                self.flush()
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # Export
+    # ─────────────────────────────────────────────────────────────────────────
+
+    def flush(self) -> None:
+        """Append buffered spans to the trace file."""
+        with self._lock:
+            spans, self._buffer = self._buffer, []
+        if not spans or not self._path:
+            return
+        try:
+            if self._format == "otlp":
+                text = json.dumps(self._to_otlp(spans), default=str) + "\n"
+            else:
+                text = self._to_chrome(spans)
+            with open(self._path, "a", encoding="utf-8") as f:
+                f.write(text)
+        except OSError as e:
+            log.error(f"Trace export failed: {e}")
+
+    def _to_chrome(self, spans: List[Span]) -> str:
+        pid = os.getpid()
+        events = []
+        if not self._announced:
+            events.append({"name": "process_name", "ph": "M", "pid": pid,
+                           "args": {"name": f"{self._service} ({pid})"}})
+            self._announced = True
+        for s in spans:
+            args = dict(s.attrs, trace_id=s.trace_id, span_id=s.span_id, parent_id=s.parent_id)
+            if s.error:
+                args["error"] = s.error
+            events.append({
+                "name": s.name, "cat": "octopus", "ph": "X",
+                "ts": s.start_ns / 1000, "dur": (s.end_ns - s.start_ns) / 1000,
+                "pid": pid, "tid": s.tid, "args": args,
+            })
+        # JSON Array Format: viewers accept a missing closing bracket, so
+        # concurrent processes can simply append ",\n"-terminated events
+        prefix = "[\n" if not os.path.exists(self._path) or os.path.getsize(self._path) == 0 else ""
+        return prefix + "".join(json.dumps(e, default=str) + ",\n" for e in events)
+
+    def _to_otlp(self, spans: List[Span]) -> Dict[str, Any]:
+        def attr(key, value):
+            if isinstance(value, bool):
+                return {"key": key, "value": {"boolValue": value}}
+            if isinstance(value, int):
+                return {"key": key, "value": {"intValue": str(value)}}
+            if isinstance(value, float):
+                return {"key": key, "value": {"doubleValue": value}}
+            return {"key": key, "value": {"stringValue": str(value)}}
+
+        otlp_spans = []
+        for s in spans:
+            item = {
+                "traceId": s.trace_id,
+                "spanId": s.span_id,
+                "name": s.name,
+                "kind": 1,
+                "startTimeUnixNano": str(s.start_ns),
+                "endTimeUnixNano": str(s.end_ns),
+                "attributes": [attr(k, v) for k, v in s.attrs.items()] + [attr("thread.id", s.tid)],
+                "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+            }
+            if s.parent_id:
+                item["parentSpanId"] = s.parent_id
+            otlp_spans.append(item)
+        return {"resourceSpans": [{
+            "resource": {"attributes": [attr("service.name", self._service),
+                                        attr("process.pid", os.getpid())]},
+            "scopeSpans": [{"scope": {"name": "octopus"}, "spans": otlp_spans}],
+        }]}
+
+
+TRACER = Tracer()
+TRACER.configure_from_env()
+span = TRACER.span
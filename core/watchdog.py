@@ -0,0 +1,122 @@
+"""
+Octopus Watchdog
+================
+Runs handlers on reusable worker threads with a time budget.
+
+When a handler overruns, the caller gets WatchdogTimeout immediately and
+the worker is abandoned: it finishes (or hangs) on its own and then exits
+instead of returning to the pool, and a fresh worker takes its place. A
+hung network call or process query therefore cannot stall the actions
+queued behind it.
+
+Python threads cannot be killed, so abandoned handlers keep whatever side
+effects they eventually produce; `abandoned` reports how many are still
+running.
+
+Author: Octopus Contributors
+License: MIT
+"""
+
+import queue
+import logging
+import threading
+from typing import Any, Callable, List
+
+log = logging.getLogger("octopus.watchdog")
+
+
+class WatchdogTimeout(Exception):
+    """Raised when a handler exceeds its time budget."""
+
+
+class _Job:
+    __slots__ = ("fn", "done", "result", "error", "abandoned", "lock")
+
+    def __init__(self, fn: Callable[[], Any]):
+        self.fn = fn
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.abandoned = False
+        self.lock = threading.Lock()
+
+
+class Watchdog:
+    """
+    Pool of daemon worker threads enforcing per-call timeouts.
+
+    Attributes:
+        abandoned: Timed-out handlers that have not returned yet
+        timeouts: Total calls that exceeded their budget
+    """
+
+    def __init__(self, max_idle: int = 4):
+        """
+        Args:
+            max_idle: Idle workers kept for reuse; extra ones exit
+        """
+        self._max_idle = max_idle
+        self._idle: List[queue.SimpleQueue] = []
+        self._lock = threading.Lock()
+        self._spawned = 0
+        self.abandoned = 0
+        self.timeouts = 0
+
+    def _acquire(self) -> queue.SimpleQueue:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+            self._spawned += 1
+            name = f"watchdog-{self._spawned}"
+        inbox: queue.SimpleQueue = queue.SimpleQueue()
+        threading.Thread(target=self._work, args=(inbox,), daemon=True, name=name).start()
+        return inbox
+
+    def _work(self, inbox: queue.SimpleQueue) -> None:
+        while True:
+            job = inbox.get()
+            try:
+                result, error = job.fn(), None
+            except BaseException as e:
+                result, error = None, e
+            with job.lock:
+                job.result, job.error = result, error
+                job.done.set()
+                abandoned = job.abandoned
+            job = None
+
+            if abandoned:
+                with self._lock:
+                    self.abandoned -= 1
+                log.info(f"Abandoned handler finished on {threading.current_thread().name}")
+                return
+            with self._lock:
+                if len(self._idle) >= self._max_idle:
+                    return
+                self._idle.append(inbox)
+
+    def run(self, fn: Callable[[], Any], timeout: float) -> Any:
+        """
+        Call fn on a worker thread and wait at most `timeout` seconds.
+
+        Returns:
+            fn's return value (its exceptions are re-raised here)
+
+        Raises:
+            WatchdogTimeout: If fn did not finish in time
+        """
+        job = _Job(fn)
+        self._acquire().put(job)
+        if not job.done.wait(timeout):
+            with job.lock:
+                # The handler may have finished between wait() and the lock
+                if not job.done.is_set():
+                    job.abandoned = True
+                    with self._lock:
+                        self.abandoned += 1
+                        self.timeouts += 1
+            if job.abandoned:
+                raise WatchdogTimeout(f"Handler exceeded {timeout}s")
+        if job.error is not None:
+            raise job.error
+        return job.result
@@ -11,5 +11,6 @@ from skills.mouse import MouseSkill
 from skills.keyboard import KeyboardSkill
 from skills.file import FileSkill
 from skills.system import SystemSkill
+from skills.module_skill import ModuleSkill, MODULE_SKILLS
 
-__all__ = ["MouseSkill", "KeyboardSkill", "FileSkill", "SystemSkill"]
+__all__ = ["MouseSkill", "KeyboardSkill", "FileSkill", "SystemSkill", "ModuleSkill", "MODULE_SKILLS"]
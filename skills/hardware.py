@@ -1,30 +1,218 @@
+import os
+import time
 import logging
+import platform
+import threading
+from array import array
+from typing import Dict, Any, List, Optional, Sequence
+
 import psutil
-from typing import Dict, Any
 
 log = logging.getLogger("octopus.skill.hardware")
 
+INTERVAL_ENV_VAR = "OCTOPUS_HW_SAMPLE_INTERVAL"
+DEFAULT_INTERVAL = 1.0
+# One hour of history at the default rate
+DEFAULT_CAPACITY = 3600
+# Windows (seconds) summarized by hardware.usage
+DEFAULT_WINDOWS = (10, 60, 300)
+# Scalar series; rates are per second since the previous sample
+FIELDS = ("cpu_percent", "ram_percent", "disk_percent",
+          "disk_read_bps", "disk_write_bps", "net_sent_bps", "net_recv_bps")
+
+
+class HardwareSampler:
+    """
+    Background thread sampling CPU, per-core CPU, RAM, disk and network I/O
+    into fixed-size ring buffers.
+
+    Every series is a preallocated array('d') indexed by sample slot, so a
+    sample costs a handful of float stores and the memory footprint never
+    grows. Readers copy out the slots they need under the lock.
+    """
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL, capacity: int = DEFAULT_CAPACITY):
+        """
+        Args:
+            interval: Seconds between samples
+            capacity: Samples kept per series
+        """
+        self.interval = interval
+        self.capacity = capacity
+        self.cores = psutil.cpu_count() or 1
+        self._times = array("d", bytes(8 * capacity))
+        self._series = {name: array("d", bytes(8 * capacity)) for name in FIELDS}
+        # Core c of slot i lives at i * cores + c
+        self._per_core = array("d", bytes(8 * capacity * self.cores))
+        self._head = 0
+        self._count = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._first = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_io = None
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # Sampling
+    # ─────────────────────────────────────────────────────────────────────────
+
+    def start(self) -> "HardwareSampler":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True, name="hw-sampler")
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval + 1)
+
+    def _io(self):
+        disk, net = psutil.disk_io_counters(), psutil.net_io_counters()
+        return (time.monotonic(),
+                disk.read_bytes if disk else 0.0, disk.write_bytes if disk else 0.0,
+                net.bytes_sent if net else 0.0, net.bytes_recv if net else 0.0)
+
+    def _run(self) -> None:
+        # cpu_percent(None) measures since the previous call: prime it, then
+        # take the first sample after a short delay instead of a full interval
+        psutil.cpu_percent(percpu=True)
+        self._last_io = self._io()
+        delay = min(self.interval, 0.1)
+        while not self._stop.wait(delay):
+            try:
+                self.sample()
+            except Exception as e:
+                log.error(f"Hardware sample failed: {e}")
+            self._first.set()
+            delay = self.interval
+
+    def sample(self) -> None:
+        """Take one sample (called by the sampler thread)."""
+        cores = psutil.cpu_percent(percpu=True)
+        io = self._io()
+        elapsed = max(io[0] - self._last_io[0], 1e-6)
+        rates = [(now - before) / elapsed for now, before in zip(io[1:], self._last_io[1:])]
+        self._last_io = io
+        values = (sum(cores) / len(cores) if cores else 0.0,
+                  psutil.virtual_memory().percent,
+                  psutil.disk_usage(os.path.abspath(os.sep)).percent,
+                  *rates)
+
+        with self._lock:
+            slot = self._head
+            self._times[slot] = time.time()
+            for name, value in zip(FIELDS, values):
+                self._series[name][slot] = value
+            base = slot * self.cores
+            for c, value in enumerate(cores[:self.cores]):
+                self._per_core[base + c] = value
+            self._head = (slot + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+
+    def wait_ready(self, timeout: float) -> bool:
+        """Block until the first sample exists (at most `timeout` seconds)."""
+        return self._first.wait(timeout)
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # Reading
+    # ─────────────────────────────────────────────────────────────────────────
+
+    def _slots(self, seconds: Optional[float]) -> List[int]:
+        """Slots of the samples within the last `seconds`, oldest first (lock held)."""
+        n = self._count
+        if seconds is not None:
+            n = min(n, max(1, int(round(seconds / self.interval))))
+        return [(self._head - n + i) % self.capacity for i in range(n)]
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        """Most recent sample, or None before the first one."""
+        with self._lock:
+            if not self._count:
+                return None
+            slot = (self._head - 1) % self.capacity
+            base = slot * self.cores
+            return dict({name: round(self._series[name][slot], 2) for name in FIELDS},
+                        time=self._times[slot],
+                        per_core=[round(v, 1) for v in self._per_core[base:base + self.cores]])
+
+    def stats(self, windows: Sequence[float] = DEFAULT_WINDOWS,
+              fields: Sequence[str] = FIELDS) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """min/avg/max of each field over each window: {'60s': {'cpu_percent': {...}}}"""
+        out = {}
+        with self._lock:
+            for window in windows:
+                slots = self._slots(window)
+                if not slots:
+                    continue
+                summary = {}
+                for name in fields:
+                    series = self._series[name]
+                    values = [series[s] for s in slots]
+                    summary[name] = {"min": round(min(values), 2),
+                                     "avg": round(sum(values) / len(values), 2),
+                                     "max": round(max(values), 2)}
+                out[f"{window:g}s"] = dict(summary, samples=len(slots))
+        return out
+
+    def series(self, seconds: Optional[float] = None, fields: Sequence[str] = FIELDS,
+               per_core: bool = False) -> Dict[str, Any]:
+        """Raw samples within the last `seconds` (all if None), as parallel lists."""
+        with self._lock:
+            slots = self._slots(seconds)
+            out: Dict[str, Any] = {"interval": self.interval,
+                                   "time": [self._times[s] for s in slots]}
+            for name in fields:
+                out[name] = [self._series[name][s] for s in slots]
+            if per_core:
+                out["per_core"] = [list(self._per_core[s * self.cores:(s + 1) * self.cores]) for s in slots]
+        return out
+
+
+_sampler: Optional[HardwareSampler] = None
+_sampler_lock = threading.Lock()
+
+
+def get_sampler() -> HardwareSampler:
+    """Process-wide sampler, started on first use (rate from OCTOPUS_HW_SAMPLE_INTERVAL)."""
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None:
+            interval = float(os.environ.get(INTERVAL_ENV_VAR) or DEFAULT_INTERVAL)
+            _sampler = HardwareSampler(interval=interval).start()
+    return _sampler
+
+
 def execute(params: Dict[str, Any]) -> Dict[str, Any]:
     """
     Monitor system hardware resources.
     Actions: usage, specs
+    Params (usage):
+        windows: seconds to summarize as min/avg/max (default [10, 60, 300])
     """
     action = params.get("action", "usage").lower()
-    
+
     if action == "usage":
-        cpu = psutil.cpu_percent(interval=1)
-        ram = psutil.virtual_memory().percent
-        disk = psutil.disk_usage('/').percent
+        sampler = get_sampler()
+        # Only the very first call waits, for the sampler's first reading
+        sampler.wait_ready(1.0)
+        latest = sampler.latest()
+        if latest is None:
+            return {"status": "error", "message": "No hardware sample available yet"}
+        cpu, ram, disk = latest["cpu_percent"], latest["ram_percent"], latest["disk_percent"]
         return {
             "status": "ok",
             "cpu_percent": cpu,
             "ram_percent": ram,
             "disk_percent": disk,
+            "per_core": latest["per_core"],
+            "io": {name: latest[name] for name in FIELDS[3:]},
+            "windows": sampler.stats(params.get("windows", DEFAULT_WINDOWS)),
             "message": f"CPU: {cpu}%, RAM: {ram}%, Disk: {disk}%"
         }
-    
+
     elif action == "specs":
-        import platform
         return {
             "status": "ok",
             "processor": platform.processor(),
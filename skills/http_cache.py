@@ -0,0 +1,314 @@
+"""
+Octopus HTTP Cache
+==================
+Client-side response cache for the network skill (opt-in per request with
+"cache": true).
+
+Responses to GET are stored according to their Cache-Control / Expires
+headers in two size-bounded LRU tiers: memory, and a directory on disk that
+survives restarts (OCTOPUS_HTTP_CACHE_DIR, default logs/http-cache in the
+project, readable by its owner only). A fresh entry is served without
+touching the network. A stale entry that carries an ETag or Last-Modified
+is revalidated with a conditional request, so an unchanged resource costs a
+304 instead of the full body.
+
+Responses to requests with an Authorization header are private: they stay
+in memory only and are served only for the same Authorization value.
+
+Author: Octopus Contributors
+License: MIT
+"""
+
+import os
+import time
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Optional, Mapping
+
+log = logging.getLogger("octopus.skill.http_cache")
+
+CACHE_DIR_ENV_VAR = "OCTOPUS_HTTP_CACHE_DIR"
+DEFAULT_MEMORY_BYTES = 16 * 1024 * 1024
+DEFAULT_DISK_BYTES = 256 * 1024 * 1024
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs", "http-cache")
+
+
+def parse_cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+    """'max-age=60, no-cache' -> {'max-age': '60', 'no-cache': None}"""
+    directives: Dict[str, Optional[str]] = {}
+    for part in (value or "").split(","):
+        name, _, arg = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = arg.strip('"') if arg else None
+    return directives
+
+
+def _http_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def freshness(headers: Mapping[str, str], now: float) -> Optional[float]:
+    """
+    Absolute time until which a response may be served without revalidation.
+
+    Returns:
+        Expiry timestamp (<= now means revalidate first), or None if the
+        response must not be stored
+    """
+    cc = parse_cache_control(headers.get("cache-control"))
+    if "no-store" in cc or headers.get("vary", "").strip() == "*":
+        return None
+    if "no-cache" in cc:
+        return now
+    try:
+        age = float(headers.get("age", 0))
+    except ValueError:
+        age = 0.0
+    if cc.get("max-age") is not None:
+        try:
+            return now + int(cc["max-age"]) - age
+        except ValueError:
+            return now
+    expires = _http_date(headers.get("expires"))
+    if expires is not None:
+        date = _http_date(headers.get("date")) or now
+        return now + (expires - date) - age
+    return now
+
+
+class HttpCache:
+    """
+    Two-tier LRU cache of GET responses.
+
+    Entries are dicts with url, code, headers, encoding, expires, vary and
+    body (bytes). Both tiers evict least recently used entries once their
+    byte budget is exceeded.
+
+    Attributes:
+        stats: Counts of hits, revalidated, misses, stores and evictions
+    """
+
+    def __init__(self, directory: Optional[str] = None,
+                 memory_bytes: int = DEFAULT_MEMORY_BYTES,
+                 disk_bytes: int = DEFAULT_DISK_BYTES):
+        """
+        Args:
+            directory: Disk tier location ('' disables the disk tier)
+            memory_bytes: Budget of response bodies held in memory
+            disk_bytes: Budget of the disk tier
+        """
+        if directory is None:
+            directory = os.environ.get(CACHE_DIR_ENV_VAR) or DEFAULT_DIR
+        self._dir = directory
+        self._memory_bytes = memory_bytes
+        self._disk_bytes = disk_bytes
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._memory_used = 0
+        # key -> body size, least recently used first
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_used = 0
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0, "stores": 0, "evictions": 0}
+        if self._dir:
+            self._load_index()
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # Keys
+    # ─────────────────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def key(url: str) -> str:
+        return hashlib.sha256(f"GET {url}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _matches(entry: Dict[str, Any], request_headers: Mapping[str, str]) -> bool:
+        lowered = {k.lower(): v for k, v in request_headers.items()}
+        return all(lowered.get(name) == value for name, value in entry["vary"].items())
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # Lookup and update
+    # ─────────────────────────────────────────────────────────────────────────
+
+    def lookup(self, url: str, request_headers: Mapping[str, str]) -> Optional[Dict[str, Any]]:
+        """Stored entry for url whose Vary headers match, fresh or stale."""
+        key = self.key(url)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+            elif key in self._disk:
+                entry = self._read_disk(key)
+                if entry is not None:
+                    self._remember(key, entry)
+        if entry is None or not self._matches(entry, request_headers):
+            return None
+        return entry
+
+    @staticmethod
+    def is_fresh(entry: Dict[str, Any], request_headers: Mapping[str, str]) -> bool:
+        cc = parse_cache_control({k.lower(): v for k, v in request_headers.items()}.get("cache-control"))
+        return "no-cache" not in cc and entry["expires"] > time.time()
+
+    @staticmethod
+    def conditional_headers(entry: Dict[str, Any]) -> Dict[str, str]:
+        """Validators for revalidating a stale entry (empty if it has none)."""
+        headers = {}
+        if entry["headers"].get("etag"):
+            headers["If-None-Match"] = entry["headers"]["etag"]
+        if entry["headers"].get("last-modified"):
+            headers["If-Modified-Since"] = entry["headers"]["last-modified"]
+        return headers
+
+    def store(self, url: str, code: int, headers: Mapping[str, str], body: bytes,
+              encoding: Optional[str], request_headers: Mapping[str, str]) -> bool:
+        """Store a 200 response if its headers allow it. Returns True if stored."""
+        headers = {k.lower(): v for k, v in headers.items()}
+        expires = freshness(headers, time.time())
+        if expires is None or code != 200:
+            return False
+        if expires <= time.time() and not ("etag" in headers or "last-modified" in headers):
+            return False  # Could never be reused
+        lowered = {k.lower(): v for k, v in request_headers.items()}
+        vary = {name.strip().lower(): lowered.get(name.strip().lower())
+                for name in headers.get("vary", "").split(",") if name.strip()}
+        private = "authorization" in lowered
+        if private:
+            # Only ever served back to the same credentials, never written to disk
+            vary["authorization"] = lowered["authorization"]
+        entry = {"url": url, "code": code, "headers": headers, "encoding": encoding,
+                 "expires": expires, "vary": vary, "private": private, "body": body}
+        key = self.key(url)
+        with self._lock:
+            self._remember(key, entry)
+            if self._dir and not private:
+                self._write_disk(key, entry)
+            self.stats["stores"] += 1
+        return True
+
+    def refresh(self, entry: Dict[str, Any], headers: Mapping[str, str]) -> Dict[str, Any]:
+        """Apply the headers of a 304 to a stored entry and extend its lifetime."""
+        updated = dict(entry["headers"])
+        updated.update({k.lower(): v for k, v in headers.items()
+                        if k.lower() not in ("content-length", "content-encoding", "transfer-encoding")})
+        entry = dict(entry, headers=updated, expires=freshness(updated, time.time()) or time.time())
+        key = self.key(entry["url"])
+        with self._lock:
+            self._remember(key, entry)
+            if self._dir and not entry.get("private"):
+                self._write_disk(key, entry)
+        return entry
+
+    def count(self, outcome: str) -> None:
+        with self._lock:
+            self.stats[outcome] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters plus tier sizes."""
+        with self._lock:
+            return dict(self.stats, memory_entries=len(self._memory), memory_bytes=self._memory_used,
+                        disk_entries=len(self._disk), disk_bytes=self._disk_used)
+
+    def clear(self) -> None:
+        """Drop every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            self._memory_used = 0
+            for key in list(self._disk):
+                self._remove_disk(key)
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # Tiers (callers hold the lock)
+    # ─────────────────────────────────────────────────────────────────────────
+
+    def _remember(self, key: str, entry: Dict[str, Any]) -> None:
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_used -= len(old["body"])
+        # Bodies larger than a quarter of the budget only live on disk
+        if len(entry["body"]) > self._memory_bytes // 4:
+            return
+        self._memory[key] = entry
+        self._memory_used += len(entry["body"])
+        while self._memory_used > self._memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_used -= len(evicted["body"])
+            self.stats["evictions"] += 1
+
+    def _paths(self, key: str):
+        return os.path.join(self._dir, f"{key}.json"), os.path.join(self._dir, f"{key}.body")
+
+    def _load_index(self) -> None:
+        try:
+            os.makedirs(self._dir, mode=0o700, exist_ok=True)
+            if hasattr(os, "getuid"):
+                st = os.stat(self._dir)
+                if st.st_uid != os.getuid():
+                    raise OSError(f"{self._dir} is owned by another user")
+                if st.st_mode & 0o077:
+                    os.chmod(self._dir, 0o700)
+            found = []
+            for name in os.listdir(self._dir):
+                if name.endswith(".body"):
+                    st = os.stat(os.path.join(self._dir, name))
+                    found.append((st.st_mtime, name[:-5], st.st_size))
+        except OSError as e:
+            log.warning(f"HTTP cache directory unusable, disk tier disabled: {e}")
+            self._dir = ""
+            return
+        for _, key, size in sorted(found):
+            self._disk[key] = size
+            self._disk_used += size
+
+    def _read_disk(self, key: str) -> Optional[Dict[str, Any]]:
+        meta_path, body_path = self._paths(key)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            with open(body_path, "rb") as f:
+                entry["body"] = f.read()
+            os.utime(body_path)
+        except (OSError, ValueError) as e:
+            log.debug(f"Dropping unreadable cache entry {key}: {e}")
+            self._remove_disk(key)
+            return None
+        self._disk.move_to_end(key)
+        return entry
+
+    def _write_disk(self, key: str, entry: Dict[str, Any]) -> None:
+        if len(entry["body"]) > self._disk_bytes:
+            return
+        meta_path, body_path = self._paths(key)
+        meta = {k: v for k, v in entry.items() if k != "body"}
+        try:
+            # Body first, then metadata: a reader never sees metadata without a body
+            with open(body_path + ".tmp", "wb") as f:
+                f.write(entry["body"])
+            os.replace(body_path + ".tmp", body_path)
+            with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(meta_path + ".tmp", meta_path)
+        except OSError as e:
+            log.warning(f"HTTP cache write failed: {e}")
+            return
+        self._disk_used += len(entry["body"]) - self._disk.pop(key, 0)
+        self._disk[key] = len(entry["body"])
+        while self._disk_used > self._disk_bytes and len(self._disk) > 1:
+            self._remove_disk(next(iter(self._disk)))
+            self.stats["evictions"] += 1
+
+    def _remove_disk(self, key: str) -> None:
+        self._disk_used -= self._disk.pop(key, 0)
+        for path in self._paths(key):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -49,11 +49,12 @@ class KeyboardSkill:
         """
         return self._executor.keyboard_press(key)
 
-    def hotkey(self, *keys):
+    def hotkey(self, *args, keys=None):
         """
         Execute key combination.
         
         Args:
-            *keys: Keys to press simultaneously (e.g., 'ctrl', 'c')
+            *args: Keys to press simultaneously (e.g., 'ctrl', 'c')
+            keys: Same as a list, for actions ({"keys": ["ctrl", "c"]})
         """
-        return self._executor.keyboard_hotkey(*keys)
+        return self._executor.keyboard_hotkey(*args, *(keys or []))
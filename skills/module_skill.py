@@ -0,0 +1,72 @@
+"""
+Octopus Module Skill Adapter
+============================
+Exposes function-style skill modules (a module-level execute(params), as in
+skills/network.py) through the Dispatcher's 'skill.method' routing.
+
+Modules are imported on first use, so an optional dependency that is not
+installed (httpx, psutil, pyperclip) only fails the actions that need it.
+A module that sets USES_EXECUTOR = True is called as execute(params,
+executor=...) so it can use the workspace sandbox and the halt event.
+
+Author: Octopus Contributors
+License: MIT
+"""
+
+import importlib
+from typing import Dict, Any, List
+
+# skill name -> method -> params fixed by the method name
+MODULE_SKILLS: Dict[str, Dict[str, Dict[str, Any]]] = {
+    "network": {"request": {}, "get": {"method": "GET"}, "post": {"method": "POST"},
+                "put": {"method": "PUT"}, "patch": {"method": "PATCH"},
+                "delete": {"method": "DELETE"}, "head": {"method": "HEAD"},
+                "options": {"method": "OPTIONS"}, "batch": {"action": "batch"},
+                "download": {"action": "download"},
+                "cache_stats": {"action": "cache_stats"}, "cache_clear": {"action": "cache_clear"}},
+    "process": {"list": {"action": "list"}, "find": {"action": "find"}, "kill": {"action": "kill"}},
+    "hardware": {"usage": {"action": "usage"}, "specs": {"action": "specs"}},
+    "clipboard": {"read": {"action": "read"}, "write": {"action": "write"},
+                  "clear": {"action": "clear"}},
+}
+
+
+class ModuleSkill:
+    """
+    Skill object backed by skills.<name>.execute.
+
+    'process.kill' with params {"pid": 42} calls
+    skills.process.execute({"pid": 42, "action": "kill"}).
+    """
+
+    def __init__(self, name: str, methods: Dict[str, Dict[str, Any]], executor=None):
+        """
+        Args:
+            name: Module name under the skills package
+            methods: Method name -> params it fixes
+            executor: HumanExecutor handed to modules that ask for it
+        """
+        self._name = name
+        self._methods = methods
+        self._executor = executor
+        self._module = None
+
+    def __dir__(self) -> List[str]:
+        return list(self._methods)
+
+    def __getattr__(self, method: str):
+        methods = self.__dict__.get("_methods", {})
+        if method not in methods:
+            raise AttributeError(method)
+
+        def handler(**params) -> Dict[str, Any]:
+            try:
+                if self._module is None:
+                    self._module = importlib.import_module(f"skills.{self._name}")
+            except ImportError as e:
+                return {"status": "error", "message": f"Skill '{self._name}' unavailable: {e}"}
+            if getattr(self._module, "USES_EXECUTOR", False):
+                return self._module.execute(dict(params, **methods[method]), executor=self._executor)
+            return self._module.execute(dict(params, **methods[method]))
+
+        return handler
@@ -1,49 +1,359 @@
+import os
+import json
+import time
+import atexit
+import hashlib
 import logging
-import httpx
+import threading
+import importlib.util
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, Optional
 
+import httpx
+
+from core import codec
+from skills.http_cache import HttpCache
+
 log = logging.getLogger("octopus.skill.network")
 
-def execute(params: Dict[str, Any]) -> Dict[str, Any]:
+DEFAULT_TIMEOUT = 10.0
+# Concurrency of network.batch: overall and per host (browsers use ~6 per host)
+BATCH_WORKERS = 16
+BATCH_PER_HOST = 6
+METHODS = ("GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS")
+DOWNLOAD_CHUNK = 64 * 1024
+# Seconds between download progress log lines
+PROGRESS_INTERVAL = 2.0
+# network.download receives the executor for workspace paths and halts
+USES_EXECUTOR = True
+# HTTP/2 needs the optional 'h2' package (pip install httpx[http2])
+HTTP2 = importlib.util.find_spec("h2") is not None
+
+_client: Optional[httpx.Client] = None
+_client_lock = threading.Lock()
+_cache: Optional[HttpCache] = None
+
+
+def get_client() -> httpx.Client:
     """
-    Execute network requests.
-    Params:
-        method: GET, POST, etc.
-        url: target URL
-        data: payload for POST (optional)
-        headers: dict of headers (optional)
+    Shared client: connections (and their DNS/TCP/TLS setup) are kept alive
+    and reused across calls. httpx.Client is safe to use from many threads.
     """
-    method = params.get("method", "GET").upper()
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = httpx.Client(
+                    timeout=DEFAULT_TIMEOUT,
+                    http2=HTTP2,
+                    limits=httpx.Limits(max_connections=100, max_keepalive_connections=20,
+                                        keepalive_expiry=30.0),
+                )
+                log.debug(f"HTTP client pool created (http2={HTTP2})")
+    return _client
+
+
+def get_cache() -> HttpCache:
+    """Shared response cache, created on first use of "cache": true."""
+    global _cache
+    if _cache is None:
+        with _client_lock:
+            if _cache is None:
+                _cache = HttpCache()
+    return _cache
+
+
+@atexit.register
+def close() -> None:
+    """Close the shared client and its pooled connections."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+def _request(params: Dict[str, Any]) -> Dict[str, Any]:
+    method = str(params.get("method", "GET")).upper()
     url = params.get("url")
     data = params.get("data")
     headers = params.get("headers", {})
 
     if not url:
         return {"status": "error", "message": "URL is required"}
+    if method not in METHODS:
+        return {"status": "error", "message": f"Unsupported method: {method}. Available: {list(METHODS)}"}
+
+    body = {}
+    if isinstance(data, (dict, list)):
+        body["json"] = data
+    elif data is not None:
+        body["content"] = data if isinstance(data, bytes) else str(data)
+
+    if params.get("cache") and method == "GET":
+        return _cached_get(url, params.get("query"), headers)
 
     try:
-        with httpx.Client(timeout=10.0) as client:
-            if method == "GET":
-                response = client.get(url, headers=headers)
-            elif method == "POST":
-                response = client.post(url, json=data, headers=headers)
-            else:
-                return {"status": "error", "message": f"Unsupported method: {method}"}
-            
-            response.raise_for_status()
-            
-            # Try to parse JSON, else return raw text
-            try:
-                content = response.json()
-            except:
-                content = response.text[:1000] # Cap text length
-                
-            return {
-                "status": "ok",
-                "message": f"Request {method} {url} successful",
-                "content": content,
-                "code": response.status_code
-            }
+        response = get_client().request(method, url, headers=headers,
+                                        params=params.get("query"), **body)
+        response.raise_for_status()
+    except httpx.HTTPStatusError as e:
+        log.error(f"Network error: {e}")
+        return {"status": "error", "message": str(e), "code": e.response.status_code}
     except Exception as e:
         log.error(f"Network error: {e}")
         return {"status": "error", "message": str(e)}
+
+    return _result(method, url, response.status_code, response.content, response.encoding,
+                   response.http_version)
+
+
+def _result(method: str, url: str, code: int, body: bytes, encoding: Optional[str],
+            http_version: Optional[str]) -> Dict[str, Any]:
+    # Try to parse JSON, else return raw text
+    try:
+        content = codec.loads(body)
+    except ValueError:
+        content = body.decode(encoding or "utf-8", errors="replace")[:1000]  # Cap text length
+
+    return {
+        "status": "ok",
+        "message": f"Request {method} {url} successful",
+        "content": content,
+        "code": code,
+        "http_version": http_version,
+    }
+
+
+def _cached_get(url: str, query: Optional[Dict[str, Any]], headers: Dict[str, str]) -> Dict[str, Any]:
+    """GET through the response cache; the result's 'cache' field tells what happened."""
+    cache = get_cache()
+    full_url = str(httpx.URL(url, params=query))
+    entry = cache.lookup(full_url, headers)
+    if entry is not None and cache.is_fresh(entry, headers):
+        cache.count("hits")
+        outcome = "hit"
+    else:
+        conditional = cache.conditional_headers(entry) if entry is not None else {}
+        try:
+            response = get_client().get(full_url, headers={**headers, **conditional})
+            if response.status_code != 304:
+                response.raise_for_status()
+        except httpx.HTTPStatusError as e:
+            log.error(f"Network error: {e}")
+            return {"status": "error", "message": str(e), "code": e.response.status_code}
+        except Exception as e:
+            log.error(f"Network error: {e}")
+            return {"status": "error", "message": str(e)}
+
+        if response.status_code == 304 and entry is not None:
+            entry = cache.refresh(entry, response.headers)
+            cache.count("revalidated")
+            outcome = "revalidated"
+        else:
+            cache.count("misses")
+            cache.store(full_url, response.status_code, response.headers, response.content,
+                        response.encoding, headers)
+            result = _result("GET", url, response.status_code, response.content,
+                             response.encoding, response.http_version)
+            return dict(result, cache="miss", cache_stats=cache.snapshot())
+
+    result = _result("GET", url, entry["code"], entry["body"], entry["encoding"], None)
+    return dict(result, cache=outcome, cache_stats=cache.snapshot())
+
+
+def _batch(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Run many requests concurrently; results keep the order of 'requests'."""
+    requests = params.get("requests")
+    if not isinstance(requests, list) or not requests:
+        return {"status": "error", "message": "'requests' must be a non-empty list"}
+    try:
+        per_host = max(1, int(params.get("per_host", BATCH_PER_HOST)))
+        workers = max(1, min(int(params.get("max_workers", BATCH_WORKERS)), len(requests)))
+    except (TypeError, ValueError):
+        return {"status": "error", "message": "'per_host' and 'max_workers' must be integers"}
+
+    # Normalized once: a bad entry fails on its own instead of the whole batch
+    entries = []
+    for r in requests:
+        if isinstance(r, str):
+            r = {"url": r}
+        if not isinstance(r, dict) or not isinstance(r.get("url"), str) or not r["url"]:
+            r = None
+        entries.append(r)
+    hosts: Dict[str, threading.Semaphore] = {}
+    for r in filter(None, entries):
+        hosts.setdefault(urlsplit(r["url"]).netloc, threading.Semaphore(per_host))
+
+    def run(r: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        if r is None:
+            return {"status": "error", "message": "Each request must be a URL or an object with a 'url'"}
+        with hosts[urlsplit(r["url"]).netloc]:
+            return _request(r)
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="network") as pool:
+        results = list(pool.map(run, entries))
+    ok = sum(1 for r in results if r["status"] == "ok")
+    return {
+        "status": "ok" if ok == len(results) else "error",
+        "message": f"{ok}/{len(results)} requests successful",
+        "results": results,
+    }
+
+
+def _hash_file(path: str, digest: "hashlib._Hash") -> None:
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK), b""):
+            digest.update(chunk)
+
+
+def _download(params: Dict[str, Any], executor) -> Dict[str, Any]:
+    """
+    Stream a URL into the workspace in fixed-size chunks.
+
+    The body goes to '<path>.part' and is renamed on success. An interrupted
+    download (error, timeout or halt) leaves the .part file plus the
+    validators it was fetched with, and the next call resumes it with a
+    Range request; If-Range makes the server send the whole body instead if
+    the resource changed meanwhile.
+    """
+    url = params.get("url")
+    if not url:
+        return {"status": "error", "message": "URL is required"}
+    if executor is None:
+        return {"status": "error", "message": "network.download needs a workspace"}
+    path = params.get("path") or os.path.basename(httpx.URL(url).path.rstrip("/")) or "download"
+    expected = str(params.get("sha256", "")).lower() or None
+    try:
+        dest = executor._check_path(path)
+    except PermissionError as e:
+        return {"status": "error", "message": str(e)}
+    partial, meta_path = dest + ".part", dest + ".part.json"
+    os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+
+    # Resume only what was fetched from the same URL
+    offset, validator = 0, None
+    if params.get("resume", True) and os.path.exists(partial):
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("url") == url:
+                offset, validator = os.path.getsize(partial), meta.get("validator")
+        except (OSError, ValueError):
+            pass
+    headers = dict(params.get("headers", {}), **{"Accept-Encoding": "identity"})
+    if offset:
+        headers["Range"] = f"bytes={offset}-"
+        if validator:
+            headers["If-Range"] = validator
+
+    started = time.monotonic()
+    written = 0
+    digest = None
+    try:
+        with get_client().stream("GET", url, headers=headers) as response:
+            if response.status_code == 416 and offset:
+                # Nothing left to fetch: the .part file is already complete
+                total = offset
+            else:
+                response.raise_for_status()
+                if response.status_code != 206:
+                    offset = 0
+                length = response.headers.get("content-length")
+                total = offset + int(length) if length and length.isdigit() else None
+                validator = response.headers.get("etag") or response.headers.get("last-modified")
+                with open(meta_path, "w", encoding="utf-8") as f:
+                    json.dump({"url": url, "validator": validator}, f)
+
+                digest = hashlib.sha256() if expected else None
+                if digest and offset:
+                    _hash_file(partial, digest)
+                last_report = started
+                with open(partial, "ab" if offset else "wb") as f:
+                    for chunk in response.iter_bytes(int(params.get("chunk_size", DOWNLOAD_CHUNK))):
+                        if executor.halt_event.is_set():
+                            return {"status": "halted", "bytes": offset + written, "total": total,
+                                    "message": f"Download halted at {offset + written} bytes (resumable)"}
+                        f.write(chunk)
+                        if digest:
+                            digest.update(chunk)
+                        written += len(chunk)
+                        now = time.monotonic()
+                        if now - last_report >= PROGRESS_INTERVAL:
+                            last_report = now
+                            done = f"{offset + written}/{total}" if total else str(offset + written)
+                            log.info(f"Downloading {path}: {done} bytes")
+    except httpx.HTTPStatusError as e:
+        log.error(f"Download error: {e}")
+        return {"status": "error", "message": str(e), "code": e.response.status_code}
+    except Exception as e:
+        log.error(f"Download error: {e}")
+        return {"status": "error", "message": f"{e} (resumable from {offset + written} bytes)",
+                "bytes": offset + written}
+
+    size = os.path.getsize(partial) if os.path.exists(partial) else 0
+    if total is not None and size != total:
+        return {"status": "error", "bytes": size, "total": total,
+                "message": f"Incomplete download: {size}/{total} bytes (resumable)"}
+    if expected:
+        if digest is None:
+            digest = hashlib.sha256()
+            _hash_file(partial, digest)
+        if digest.hexdigest() != expected:
+            os.remove(partial)
+            os.remove(meta_path)
+            return {"status": "error", "message": f"Checksum mismatch for {path}: got {digest.hexdigest()}"}
+    os.replace(partial, dest)
+    try:
+        os.remove(meta_path)
+    except OSError:
+        pass
+
+    elapsed = time.monotonic() - started
+    return {
+        "status": "ok",
+        "message": f"Downloaded {url} to {path}",
+        "path": path,
+        "bytes": size,
+        "resumed_from": offset,
+        "seconds": round(elapsed, 3),
+        "bytes_per_sec": round(written / elapsed) if elapsed > 0 else None,
+        "sha256": digest.hexdigest() if expected else None,
+    }
+
+
+def execute(params: Dict[str, Any], executor=None) -> Dict[str, Any]:
+    """
+    Execute network requests.
+    Params:
+        action: 'request' (default), 'batch', 'download', 'cache_stats' or 'cache_clear'
+        method: GET, POST, PUT, PATCH, DELETE, HEAD or OPTIONS
+        url: target URL
+        data: payload (objects and lists are sent as JSON, anything else as the body)
+        query: dict of query string parameters (optional)
+        headers: dict of headers (optional)
+        cache: serve GETs from the response cache and revalidate stale
+            entries (optional, see skills.http_cache)
+        requests: for batch, a list of URLs or request param dicts
+        per_host: for batch, concurrent requests per host (default 6)
+        max_workers: for batch, concurrent requests overall (default 16)
+        path: for download, workspace-relative target (default: URL file name)
+        sha256: for download, expected hex digest (optional)
+        resume: for download, continue a previous partial download (default true)
+
+    Args:
+        params: Action params as above
+        executor: HumanExecutor whose workspace and halt event downloads use
+    """
+    action = params.get("action", "request")
+    if action == "batch":
+        return _batch(params)
+    if action == "download":
+        return _download(params, executor)
+    if action == "cache_stats":
+        return {"status": "ok", "message": "HTTP cache statistics", "stats": get_cache().snapshot()}
+    if action == "cache_clear":
+        get_cache().clear()
+        return {"status": "ok", "message": "HTTP cache cleared"}
+    return _request(params)
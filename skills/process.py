@@ -1,40 +1,180 @@
+import re
+import time
 import logging
+import threading
 import psutil
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
 
 log = logging.getLogger("octopus.skill.process")
 
+# Seconds a process snapshot is reused before the process table is walked again
+SNAPSHOT_TTL = 2.0
+DEFAULT_LIMIT = 20
+DEFAULT_ATTRS = ("pid", "name", "username")
+# Attributes fetched in bulk by process_iter; callers pick a subset with 'attrs'
+ATTRS = ("pid", "name", "username", "status", "cpu_percent", "memory_percent",
+         "num_threads", "create_time", "exe", "cmdline")
+# Always fetched, so typical list/sort/kill calls share one snapshot
+BASE_ATTRS = {"pid", "name", "username", "cpu_percent", "memory_percent"}
+SORT_KEYS = {"cpu": "cpu_percent", "memory": "memory_percent"}
+NUMERIC_ATTRS = {"pid", "cpu_percent", "memory_percent", "num_threads", "create_time"}
+
+
+class _Snapshot:
+    """One walk of the process table with a lower-cased name -> PIDs index."""
+
+    def __init__(self, attrs: Tuple[str, ...]):
+        self.attrs = set(attrs)
+        self.taken = time.monotonic()
+        self.rows: List[Dict[str, Any]] = []
+        for p in psutil.process_iter(list(attrs)):
+            self.rows.append(p.info)
+        self.by_name: Dict[str, List[int]] = {}
+        for row in self.rows:
+            self.by_name.setdefault((row.get("name") or "").lower(), []).append(row["pid"])
+
+    def age(self) -> float:
+        return time.monotonic() - self.taken
+
+
+_snapshots: List[_Snapshot] = []
+_lock = threading.Lock()
+
+
+def snapshot(attrs: Tuple[str, ...] = DEFAULT_ATTRS, max_age: float = SNAPSHOT_TTL) -> _Snapshot:
+    """
+    Fresh enough snapshot holding at least `attrs` (BASE_ATTRS are always included).
+
+    Any snapshot younger than max_age with a superset of the attributes is reused.
+    """
+    wanted = set(attrs) | BASE_ATTRS
+    with _lock:
+        _snapshots[:] = [s for s in _snapshots if s.age() < SNAPSHOT_TTL * 4]
+        for snap in _snapshots:
+            if snap.age() <= max_age and wanted <= snap.attrs:
+                return snap
+        snap = _Snapshot(tuple(sorted(wanted)))
+        _snapshots.append(snap)
+        return snap
+
+
+def invalidate() -> None:
+    """Drop cached snapshots (after killing processes)."""
+    with _lock:
+        _snapshots.clear()
+
+
+def _query(params: Dict[str, Any]) -> Dict[str, Any]:
+    attrs = params.get("attrs") or list(DEFAULT_ATTRS)
+    unknown = set(attrs) - set(ATTRS)
+    if unknown:
+        return {"status": "error", "message": f"Unknown attributes {sorted(unknown)}. Available: {list(ATTRS)}"}
+    sort = params.get("sort")
+    sort_attr = SORT_KEYS.get(sort, sort)
+    if sort_attr and sort_attr not in ATTRS:
+        return {"status": "error", "message": f"Cannot sort by '{sort}'. Use cpu, memory or an attribute"}
+    try:
+        pattern = re.compile(params["regex"], re.IGNORECASE) if params.get("regex") else None
+    except re.error as e:
+        return {"status": "error", "message": f"Invalid regex: {e}"}
+
+    needed = set(attrs) | ({sort_attr} if sort_attr else set()) | ({"username"} if params.get("user") else set())
+    snap = snapshot(tuple(needed), float(params.get("max_age", SNAPSHOT_TTL)))
+    rows = snap.rows
+
+    name = str(params.get("name", "")).lower()
+    if name:
+        # Filter on the index: distinct names are far fewer than processes
+        pids = {pid for key, found in snap.by_name.items() if name in key for pid in found}
+        rows = [r for r in rows if r["pid"] in pids]
+    if pattern:
+        rows = [r for r in rows if pattern.search(r.get("name") or "")]
+    if params.get("user"):
+        user = str(params["user"]).lower()
+        rows = [r for r in rows if (r.get("username") or "").lower() == user]
+    if sort_attr:
+        descending = params.get("descending", sort_attr in SORT_KEYS.values())
+        if sort_attr in NUMERIC_ATTRS:
+            key = lambda r: r.get(sort_attr) or 0
+        else:
+            key = lambda r: str(r.get(sort_attr) or "").lower()
+        rows = sorted(rows, key=key, reverse=bool(descending))
+
+    offset = max(0, int(params.get("offset", 0)))
+    limit = max(0, int(params.get("limit", DEFAULT_LIMIT)))
+    page = [{k: r.get(k) for k in attrs} for r in rows[offset:offset + limit]]
+    return {
+        "status": "ok",
+        "processes": page,
+        "total": len(rows),
+        "offset": offset,
+        "snapshot_age": round(snap.age(), 3),
+        "message": f"Processes listed ({len(page)} of {len(rows)} matching)",
+    }
+
+
+def _pids_for(name: str, exact: bool, max_age: float = SNAPSHOT_TTL) -> List[int]:
+    """PIDs by name; a miss in a reused snapshot is confirmed with a fresh scan."""
+    name = name.lower()
+
+    def match(snap: _Snapshot) -> List[int]:
+        if exact:
+            return list(snap.by_name.get(name, []))
+        return [pid for key, pids in snap.by_name.items() if name in key for pid in pids]
+
+    pids = match(snapshot(max_age=max_age))
+    if not pids and max_age > 0:
+        pids = match(snapshot(max_age=0))
+    return pids
+
+
 def execute(params: Dict[str, Any]) -> Dict[str, Any]:
     """
     Manage system processes.
     Params:
-        action: list, kill, start
-        name: process name (for kill/start)
+        action: list, find, kill
+        name: process name substring (list, find, kill)
+        exact: match the whole name instead of a substring (find, kill)
         pid: process ID (for kill)
+        user: only processes of this user (list)
+        regex: case-insensitive pattern on the name (list)
+        attrs: attributes to return (list, default pid, name, username)
+        sort: cpu, memory or an attribute name (list)
+        descending: sort order (default true for cpu and memory)
+        limit / offset: page of results (list, default first 20)
+        max_age: reuse a process snapshot up to this many seconds old (default 2)
     """
     action = params.get("action", "list").lower()
-    
+
     if action == "list":
-        procs = []
-        for p in psutil.process_iter(['pid', 'name', 'username']):
-            try:
-                procs.append(p.info)
-            except:
-                continue
-        # Return top 20 processes to avoid bloat
-        return {"status": "ok", "processes": procs[:20], "message": "Processes listed (top 20)"}
+        return _query(params)
+
+    elif action == "find":
+        name = params.get("name")
+        if not name:
+            return {"status": "error", "message": "name is required"}
+        pids = _pids_for(str(name), bool(params.get("exact")))
+        return {"status": "ok", "pids": pids, "message": f"Found {len(pids)} processes"}
 
     elif action == "kill":
         pid = params.get("pid")
         name = params.get("name")
+        if not pid and not name:
+            return {"status": "error", "message": "pid or name is required"}
+        # Never act on a stale snapshot: the target may have started since
+        pids = [int(pid)] if pid else _pids_for(str(name), bool(params.get("exact")), max_age=0)
+        if not pids:
+            return {"status": "error", "message": f"No process matching '{name}'"}
         killed = 0
-        for p in psutil.process_iter(['pid', 'name']):
-            if (pid and p.info['pid'] == pid) or (name and name.lower() in p.info['name'].lower()):
-                try:
-                    p.terminate()
-                    killed += 1
-                except:
-                    continue
+        for target in pids:
+            try:
+                psutil.Process(target).terminate()
+                killed += 1
+            except (psutil.NoSuchProcess, psutil.AccessDenied) as e:
+                log.debug(f"Cannot terminate {target}: {e}")
+        if not killed:
+            return {"status": "error", "message": f"Could not terminate {pid or name} (not running or access denied)"}
+        invalidate()
         return {"status": "ok", "message": f"Killed {killed} processes"}
 
     return {"status": "error", "message": f"Unknown action: {action}"}
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Tests never drive the real mouse and keyboard
+os.environ.setdefault("OCTOPUS_INPUT_BACKEND", "null")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,13 @@
+from core.action_log import RotatingWriter
+
+
+def test_rotation_counts_bytes_not_characters(tmp_path):
+    path = tmp_path / "actions.jsonl"
+    writer = RotatingWriter(str(path), max_bytes=1000, rotate_seconds=0, backup_count=5, compress=False)
+    line = "日本語" * 30 + "\n"  # 91 characters, 271 bytes
+    for _ in range(4):
+        writer.write_lines([line])
+    writer.close()
+    segments = list(tmp_path.glob("actions.jsonl.*"))
+    assert len(segments) == 1
+    assert segments[0].stat().st_size == 4 * len(line.encode("utf-8"))
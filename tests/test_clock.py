@@ -0,0 +1,55 @@
+import json
+import threading
+
+from core.agent import Agent
+from core.clock import VirtualClock
+
+
+def test_virtual_clock_sleep_advances_instantly():
+    clock = VirtualClock(start=100.0)
+    clock.sleep(30)
+    assert clock.time() == 130.0
+    assert clock.monotonic() == 30.0
+    assert clock.slept == 30.0
+
+
+def test_virtual_clock_wait_returns_at_once():
+    clock = VirtualClock()
+    event = threading.Event()
+    assert clock.wait(event, 5) is False
+    assert clock.slept == 5
+    event.set()
+    assert clock.wait(event, 5) is True
+    assert clock.slept == 5
+
+
+def _agent(tmp_path, clock):
+    workspace = tmp_path / "workspace"
+    workspace.mkdir()
+    return Agent({
+        "workspace": str(workspace),
+        "log_file": str(tmp_path / "logs" / "agent.log"),
+        "adapter": "file",
+        "input_backend": "null",
+    }, clock=clock)
+
+
+def _instruct(tmp_path, actions):
+    (tmp_path / "workspace" / "instruction.json").write_text(json.dumps({"intent": "test", "actions": actions}))
+
+
+def test_run_until_idle_can_be_called_again(tmp_path):
+    clock = VirtualClock()
+    agent = _agent(tmp_path, clock)
+    try:
+        _instruct(tmp_path, [{"type": "file.write", "params": {"path": "a.txt", "content": "1"}}])
+        assert agent.run_until_idle() == 1
+        _instruct(tmp_path, [{"type": "file.write", "params": {"path": "b.txt", "content": "2"}},
+                             {"type": "system.sleep", "params": {"seconds": 60}}])
+        assert agent.run_until_idle() == 2
+    finally:
+        agent.close()
+        agent.close()
+    assert (tmp_path / "workspace" / "b.txt").read_text() == "2"
+    # The 60 s sleep and the idle polls took no real time
+    assert clock.slept >= 60
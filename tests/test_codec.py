@@ -0,0 +1,53 @@
+import pytest
+
+from core import codec
+
+
+def test_round_trip_keeps_unicode():
+    data = {"text": "章鱼 🐙", "n": [1, 2.5, None, True]}
+    assert codec.loads(codec.dumps(data)) == data
+    assert "章鱼" in codec.dumps(data)
+
+
+def test_valid_reply_is_not_repaired():
+    assert codec.parse_lenient('{"actions": []}') == ({"actions": []}, False)
+
+
+def test_fenced_reply_with_prose():
+    reply = 'Here is the plan:\n```json\n{"intent": "x", "actions": []}\n```\nDone.'
+    assert codec.parse_lenient(reply) == ({"intent": "x", "actions": []}, False)
+
+
+def test_trailing_commas_are_dropped():
+    value, repaired = codec.parse_lenient('{"actions": [{"type": "a"},],}')
+    assert value == {"actions": [{"type": "a"}]}
+    assert repaired
+
+
+def test_truncated_reply_keeps_complete_actions():
+    reply = '{"intent": "x", "actions": [{"type": "a", "params": {}}, {"type": "b", "par'
+    value, repaired = codec.parse_lenient(reply)
+    assert repaired
+    assert value == {"intent": "x", "actions": [{"type": "a", "params": {}}]}
+
+
+def test_unrecoverable_reply_raises():
+    with pytest.raises(codec.DecodeError):
+        codec.parse_lenient("I cannot help with that.")
+
+
+def test_backticks_inside_a_string_are_kept():
+    reply = '{"actions": [{"type": "file.write", "params": {"content": "```py\\nprint(1)\\n```"}}]}'
+    value, repaired = codec.parse_lenient(reply)
+    assert not repaired
+    assert value["actions"][0]["params"]["content"] == "```py\nprint(1)\n```"
+
+
+def test_fence_after_prose_with_brackets():
+    reply = 'Plan [v2]:\n```json\n{"actions": [1, 2,]}\n```'
+    assert codec.parse_lenient(reply) == ({"actions": [1, 2]}, True)
+
+
+def test_truncated_fenced_reply():
+    reply = '```json\n{"actions": [{"type": "a"}, {"type": "b"}, {"ty'
+    assert codec.parse_lenient(reply) == ({"actions": [{"type": "a"}, {"type": "b"}]}, True)
@@ -0,0 +1,39 @@
+import time
+
+import pytest
+
+from core.dispatcher import Dispatcher
+from core.executor.human_executor import HumanExecutor
+
+
+@pytest.fixture
+def dispatcher(tmp_path):
+    return Dispatcher(HumanExecutor(str(tmp_path), backend="null"))
+
+
+@pytest.mark.parametrize("action_type", ["mouse.move", "keyboard.type", "system.sleep"])
+def test_timeout_is_rejected_on_inline_actions(dispatcher, action_type):
+    result = dispatcher.dispatch({"type": action_type, "params": {}, "timeout": 1})
+    assert result["status"] == "error"
+    assert "not supported" in result["message"]
+
+
+def test_configured_budgets_skip_inline_skills(tmp_path):
+    dispatcher = Dispatcher(HumanExecutor(str(tmp_path), backend="null"),
+                            {"keyboard": 1.0, "system.sleep": 1.0, "file": 2.0})
+    assert dispatcher.timeout_for({"type": "keyboard.type"}) is None
+    assert dispatcher.timeout_for({"type": "system.sleep"}) is None
+    assert dispatcher.timeout_for({"type": "file.read"}) == 2.0
+
+
+def test_overrun_returns_timeout(dispatcher, monkeypatch):
+    file_skill = dispatcher._skills["file"]
+    monkeypatch.setattr(file_skill, "read", lambda **params: time.sleep(1), raising=False)
+    result = dispatcher.dispatch({"type": "file.read", "params": {"path": "x"}, "timeout": 0.05})
+    assert result["status"] == "timeout"
+
+
+@pytest.mark.parametrize("timeout", [0, -1, "soon"])
+def test_invalid_timeout(dispatcher, timeout):
+    result = dispatcher.dispatch({"type": "file.read", "params": {"path": "x"}, "timeout": timeout})
+    assert result["status"] == "error"
@@ -0,0 +1,71 @@
+import threading
+import time
+
+import pytest
+
+from core.clock import VirtualClock
+from core.executor.human_executor import HumanExecutor
+from core.executor.null_backend import NullBackend
+
+# A halt must land within a few HALT_CHECK_SEC steps, not at the end of the action
+MAX_LATENCY = 0.25
+HALT_AFTER = 0.05
+
+
+class _TrackingBackend(NullBackend):
+    def __init__(self):
+        super().__init__()
+        self.held = set()
+
+    def mouseDown(self, x=None, y=None, button="left", **kwargs):
+        self.held.add(button)
+
+    def mouseUp(self, x=None, y=None, button="left", **kwargs):
+        self.held.discard(button)
+
+
+def _halt_during(executor, call):
+    timer = threading.Timer(HALT_AFTER, executor.halt_event.set)
+    timer.start()
+    try:
+        started = time.monotonic()
+        result = call()
+        latency = time.monotonic() - started - HALT_AFTER
+    finally:
+        timer.cancel()
+    return result, latency
+
+
+@pytest.fixture
+def executor(tmp_path):
+    executor = HumanExecutor(str(tmp_path), backend=_TrackingBackend(), halt_event=threading.Event())
+    executor.min_interval = 0.0
+    return executor
+
+
+@pytest.mark.parametrize("call", [
+    lambda ex: ex.mouse_move(10, 10, duration=60),
+    lambda ex: ex.mouse_drag(10, 10, duration=60),
+    lambda ex: ex.keyboard_type("z" * 10240, interval=0.01),
+    lambda ex: ex.system_sleep(60),
+], ids=["mouse_move", "mouse_drag", "keyboard_type", "system_sleep"])
+def test_halt_interrupts_long_actions(executor, call):
+    result, latency = _halt_during(executor, lambda: call(executor))
+    assert result["status"] == "halted"
+    assert latency < MAX_LATENCY
+
+
+def test_halted_glide_stops_short_and_releases_the_button(executor):
+    result, _ = _halt_during(executor, lambda: executor.mouse_drag(10, 10, duration=60))
+    assert result["status"] == "halted"
+    assert executor._gui.position() != (10, 10)
+    assert not executor._gui.held
+
+
+def test_halt_set_before_a_virtual_sleep(tmp_path):
+    clock = VirtualClock()
+    executor = HumanExecutor(str(tmp_path), backend="null", clock=clock, halt_event=threading.Event())
+    executor.halt_event.set()
+    assert executor.system_sleep(60)["status"] == "halted"
+    assert executor.mouse_move(10, 10, duration=60)["status"] == "halted"
+    assert clock.slept == 0
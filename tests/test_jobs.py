@@ -0,0 +1,123 @@
+import json
+import threading
+import time
+
+import pytest
+
+from core.dispatcher import Dispatcher
+from core.executor.human_executor import HumanExecutor
+from core.jobs import JobManager, QueueFull
+from core.tracing import TRACER, span
+
+
+def _recorder(order, gate=None):
+    def make(name):
+        def fn(job):
+            if gate is not None:
+                gate.wait(2)
+            order.append(name)
+            return {"status": "ok"}
+        return fn
+    return make
+
+
+def _wait_started(manager, job):
+    deadline = time.monotonic() + 2
+    while manager.position(job) is not None:
+        assert time.monotonic() < deadline, "job did not start"
+        time.sleep(0.001)
+
+
+def test_sessions_are_served_round_robin():
+    manager = JobManager(workers=1, max_queued=64, max_per_session=32)
+    gate, order = threading.Event(), []
+    make = _recorder(order, gate)
+    jobs = [manager.submit("t", make("A"), "a")]
+    _wait_started(manager, jobs[0])
+    jobs += [manager.submit("t", make("A"), "a") for _ in range(19)]
+    jobs += [manager.submit("t", make("B"), "b") for _ in range(3)]
+    gate.set()
+    for job in jobs:
+        assert job.done.wait(2)
+    manager.stop()
+    assert "".join(order) == "AABABAB" + "A" * 16
+
+
+def test_weights_give_consecutive_turns():
+    manager = JobManager(workers=1, max_per_session=32, weight=lambda s: 2 if s == "a" else 1)
+    gate, order = threading.Event(), []
+    make = _recorder(order, gate)
+    blocker = manager.submit("t", make("-"), "c")
+    jobs = [manager.submit("t", make(s.upper()), s) for s in "aaaabb"]
+    gate.set()
+    for job in [blocker] + jobs:
+        assert job.done.wait(2)
+    manager.stop()
+    assert "".join(order) == "-AABAAB"
+
+
+def test_per_session_cap():
+    manager = JobManager(workers=1, max_queued=10, max_per_session=2)
+    gate = threading.Event()
+    fn = _recorder([], gate)("x")
+    _wait_started(manager, manager.submit("t", fn, "a"))
+    manager.submit("t", fn, "a")
+    manager.submit("t", fn, "a")
+    with pytest.raises(QueueFull):
+        manager.submit("t", fn, "a")
+    manager.submit("t", fn, "b")
+    gate.set()
+    manager.stop()
+
+
+def test_shared_jobs_pass_a_waiting_exclusive_job():
+    manager = JobManager(workers=2)
+    gate, order = threading.Event(), []
+    make = _recorder(order)
+    first = manager.submit("t", lambda job: (gate.wait(2), order.append("X1")), "a", exclusive=True)
+    second = manager.submit("t", make("X2"), "b", exclusive=True)
+    shared = manager.submit("t", make("S"), "c")
+    assert shared.done.wait(2)
+    assert not second.done.is_set()
+    gate.set()
+    assert second.done.wait(2) and first.done.is_set()
+    manager.stop()
+    assert order == ["S", "X1", "X2"]
+
+
+def test_blocked_worker_hands_on_its_slot():
+    manager = JobManager(workers=1)
+    gate = threading.Event()
+
+    def blocked(job):
+        with manager.waiting():
+            gate.wait(2)
+        return {"status": "ok"}
+
+    first = manager.submit("t", blocked, "a")
+    second = manager.submit("t", lambda job: {"status": "ok"}, "b")
+    assert second.done.wait(2)
+    assert not first.done.is_set()
+    gate.set()
+    assert first.done.wait(2)
+    manager.stop()
+
+
+def test_jobs_continue_the_submitters_trace(tmp_path):
+    trace = tmp_path / "trace.json"
+    TRACER.configure(str(trace))
+    try:
+        dispatcher = Dispatcher(HumanExecutor(str(tmp_path), backend="null"))
+        manager = JobManager(workers=1)
+        with span("http POST /action") as request:
+            job = manager.submit("action", lambda job: dispatcher.dispatch(
+                {"type": "file.list", "params": {"path": "."}}))
+            assert job.done.wait(2)
+        manager.stop()
+    finally:
+        TRACER.configure(None)
+    assert job.result["status"] == "ok"
+    events = [json.loads(line.rstrip(",")) for line in trace.read_text().splitlines()[1:]]
+    dispatch = next(e for e in events if e["name"] == "dispatch")
+    assert dispatch["args"]["parent_id"] == request.span_id
+    assert dispatch["args"]["trace_id"] == request.trace_id
@@ -0,0 +1,46 @@
+import os
+
+import pytest
+
+from core.dispatcher import Dispatcher
+from core.executor.human_executor import HumanExecutor
+
+
+@pytest.fixture
+def dispatcher(tmp_path):
+    return Dispatcher(HumanExecutor(str(tmp_path), backend="null"))
+
+
+def _read(dispatcher, path="notes.txt"):
+    return dispatcher.dispatch({"type": "file.read", "params": {"path": path}})
+
+
+def test_repeated_read_is_served_from_memo(dispatcher):
+    dispatcher.dispatch({"type": "file.write", "params": {"path": "notes.txt", "content": "one"}})
+    assert _read(dispatcher)["content"] == "one"
+    assert _read(dispatcher)["content"] == "one"
+    assert dispatcher.memo.snapshot()["hits"] == 1
+
+
+def test_write_through_dispatcher_invalidates(dispatcher):
+    dispatcher.dispatch({"type": "file.write", "params": {"path": "notes.txt", "content": "one"}})
+    _read(dispatcher)
+    dispatcher.dispatch({"type": "file.append", "params": {"path": "notes.txt", "content": " two"}})
+    assert _read(dispatcher)["content"] == "one two"
+    assert dispatcher.memo.snapshot()["invalidations"] >= 1
+
+
+def test_outside_change_makes_entry_stale(dispatcher, tmp_path):
+    target = tmp_path / "notes.txt"
+    target.write_text("one")
+    _read(dispatcher)
+    target.write_text("changed")
+    os.utime(target, ns=(0, 1))
+    assert _read(dispatcher)["content"] == "changed"
+    assert dispatcher.memo.snapshot()["stale"] == 1
+
+
+def test_cached_result_is_a_copy(dispatcher):
+    dispatcher.dispatch({"type": "file.write", "params": {"path": "notes.txt", "content": "one"}})
+    _read(dispatcher)["content"] = "mutated"
+    assert _read(dispatcher)["content"] == "one"
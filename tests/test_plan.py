@@ -0,0 +1,95 @@
+import pytest
+
+from core.plan import PlanError, PlanRunner, as_plan, uses_plan_features, validate_plan
+
+
+def test_plain_batch_is_not_a_plan():
+    assert not uses_plan_features([{"type": "file.read", "params": {"path": "a.txt"}}])
+
+
+def test_ids_and_control_nodes_make_a_plan():
+    assert uses_plan_features([{"id": "r", "type": "file.read", "params": {"path": "a.txt"}}])
+    assert uses_plan_features([{"type": "control.repeat",
+                                "params": {"times": 2, "actions": [{"type": "system.sleep"}]}}])
+
+
+def test_validate_counts_steps():
+    plan = [
+        {"id": "files", "type": "file.list", "params": {}},
+        {"type": "control.repeat", "params": {"times": 3, "actions": [
+            {"type": "file.read", "params": {"path": "${files.files.0}"}}]}},
+    ]
+    assert validate_plan(plan) == 1 + 1 + 3
+
+
+@pytest.mark.parametrize("plan, message", [
+    ([{"params": {}}], "needs a 'type'"),
+    ([{"type": "file.read", "params": []}], "'params' must be an object"),
+    ([{"type": "file.read", "params": {"path": {"$ref": "missing.path"}}}], "unknown result"),
+    ([{"type": "control.loop", "params": {}}], "unknown control node"),
+    ([{"type": "control.repeat", "params": {"times": 2}}], "non-empty 'actions'"),
+    ([{"id": "not an id", "type": "file.read"}], "'id' must be an identifier"),
+    ([{"type": "file.read", "depends_on": ["x"]}], "only allowed inside control.dag"),
+])
+def test_validate_rejects(plan, message):
+    with pytest.raises(PlanError, match=message):
+        validate_plan(plan)
+
+
+def test_step_budget():
+    plan = [{"type": "control.repeat", "params": {"times": 50, "actions": [{"type": "system.sleep"}]}}]
+    with pytest.raises(PlanError, match="step budget"):
+        validate_plan(plan, max_steps=10)
+
+
+def test_runner_resolves_references():
+    seen = []
+
+    def dispatch(action):
+        seen.append(action)
+        return {"status": "ok", "message": "done", "value": action["params"].get("value", 7)}
+
+    plan = as_plan([
+        {"id": "first", "type": "test.echo", "params": {}},
+        {"type": "test.echo", "params": {"value": {"$ref": "first.value"}}},
+        {"type": "test.echo", "params": {"value": "got ${first.value}"}},
+    ])
+    summary = PlanRunner(dispatch).run(plan)
+    assert summary["status"] == "ok"
+    assert seen[1]["params"]["value"] == 7
+    assert seen[2]["params"]["value"] == "got 7"
+
+
+def _run(plan):
+    seen = []
+
+    def dispatch(action):
+        seen.append(action["params"])
+        return {"status": "ok", "message": "done", "path": "a.txt"}
+
+    return PlanRunner(dispatch).run(plan), seen
+
+
+def test_undeclared_template_is_plain_text():
+    plan = [{"type": "file.write", "params": {"path": "run.sh", "content": "echo ${HOME}"}}]
+    assert not uses_plan_features(plan)
+    plan = [{"id": "w", "type": "file.write", "params": {"path": "run.sh", "content": "echo ${HOME}"}},
+            {"type": "file.read", "params": {"path": "${w.path} ${PATH}"}}]
+    assert validate_plan(plan) == 2
+    summary, seen = _run(plan)
+    assert summary["status"] == "ok"
+    assert seen == [{"path": "run.sh", "content": "echo ${HOME}"}, {"path": "a.txt ${PATH}"}]
+
+
+def test_escaped_template_is_literal():
+    plan = [{"id": "w", "type": "file.write", "params": {"content": "$${w.path}"}},
+            {"type": "file.write", "params": {"content": "$${w.path} ${w.path}"}}]
+    _, seen = _run(plan)
+    assert seen == [{"content": "${w.path}"}, {"content": "${w.path} a.txt"}]
+
+
+def test_declared_name_used_too_early_is_rejected():
+    plan = [{"type": "file.read", "params": {"path": "${later.path}"}},
+            {"id": "later", "type": "file.list", "params": {}}]
+    with pytest.raises(PlanError, match="unknown result"):
+        validate_plan(plan)
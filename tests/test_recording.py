@@ -0,0 +1,34 @@
+from core.recording import RunRecorder, RunReplayer
+
+
+def _record(path, events):
+    with RunRecorder(str(path)) as recorder:
+        for action, result in events:
+            recorder.record_action(action, result, recorder.offset(), 0.0)
+
+
+def test_side_effects_are_skipped_by_default(tmp_path):
+    recording = tmp_path / "run.jsonl"
+    _record(recording, [
+        ({"type": "network.get", "params": {"url": "http://127.0.0.1:9/"}},
+         {"status": "ok", "message": "Request GET http://127.0.0.1:9/ successful"}),
+        ({"type": "file.write", "params": {"path": "out.txt", "content": "x"}},
+         {"status": "ok", "message": "File written"}),
+        ({"type": "file.exists", "params": {"path": "out.txt"}}, {"status": "ok"}),
+    ])
+    report = RunReplayer(str(recording), workspace=str(tmp_path / "ws"), compare=("status",)).run()
+    assert report["skipped"] == 2
+    assert report["actions"] == 3
+    assert report["matched"] + report["mismatched"] == 1
+    assert not (tmp_path / "ws" / "out.txt").exists()
+
+
+def test_side_effects_run_when_opted_in(tmp_path):
+    recording = tmp_path / "run.jsonl"
+    _record(recording, [({"type": "file.write", "params": {"path": "out.txt", "content": "x"}},
+                         {"status": "ok"})])
+    report = RunReplayer(str(recording), workspace=str(tmp_path / "ws"), compare=("status",),
+                         side_effects=["file"]).run()
+    assert report["skipped"] == 0
+    assert report["status"] == "ok"
+    assert (tmp_path / "ws" / "out.txt").read_text() == "x"
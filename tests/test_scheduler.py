@@ -0,0 +1,77 @@
+import threading
+import time
+
+import pytest
+
+from core.scheduler import LeaseCancelled, SessionScheduler, parse_weights, uses_input
+
+
+def test_uses_input_looks_inside_plans():
+    assert uses_input([{"type": "mouse.click", "params": {}}])
+    assert uses_input([{"type": "control.repeat",
+                        "params": {"times": 2, "actions": [{"type": "keyboard.type"}]}}])
+    assert not uses_input([{"type": "file.read", "params": {"path": "a"}}])
+
+
+def test_parse_weights():
+    assert parse_weights("alice=3, bob=1,bad=x,") == {"alice": 3, "bob": 1}
+
+
+def _wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_input_lease_is_granted_round_robin():
+    scheduler = SessionScheduler({"a": 2})
+    order = []
+    scheduler.acquire("holder", True)
+
+    def worker(session):
+        with scheduler.lease(session, True):
+            order.append(session)
+
+    threads = []
+    for session in ["a", "a", "a", "b", "b", "c"]:
+        t = threading.Thread(target=worker, args=(session,))
+        t.start()
+        threads.append(t)
+        # Queue the waiters in a known order
+        _wait_until(lambda: scheduler.snapshot()["waiting"] == len(threads))
+    scheduler.release("holder", True)
+    for t in threads:
+        t.join(2)
+    assert order == ["a", "a", "b", "c", "a", "b"]
+
+
+def test_shared_leases_do_not_wait_for_input():
+    scheduler = SessionScheduler()
+    scheduler.acquire("a", True)
+    assert scheduler.acquire("b", False) == 0.0
+    scheduler.release("b", False)
+    scheduler.release("a", True)
+    assert scheduler.holder is None
+
+
+def test_cancel_while_waiting():
+    scheduler = SessionScheduler()
+    scheduler.acquire("a", True)
+    cancel = threading.Event()
+    errors = []
+
+    def waiter():
+        try:
+            scheduler.acquire("b", True, cancel)
+        except LeaseCancelled as e:
+            errors.append(e)
+
+    t = threading.Thread(target=waiter)
+    t.start()
+    _wait_until(lambda: scheduler.snapshot()["waiting"] == 1)
+    cancel.set()
+    t.join(2)
+    assert errors and scheduler.snapshot()["waiting"] == 0
+    scheduler.release("a", True)
+    assert scheduler.holder is None